@@ -1,15 +1,102 @@
 import os
 import time
+import threading
+import httpx
 import streamlit as st
-from groq import Groq
-import assemblyai as aai
-from typing import Optional
+from groq import Groq, APIConnectionError
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+from cache import get_transcript_cache, transcript_cache_key, get_response_cache, response_cache_key
+from chunking import chunk_text
+from audio_preprocess import preprocess_audio, ffmpeg_available, PREPROCESS_SETTINGS
+from segmented_transcription import transcribe_segmented, probe_duration
+from rate_limiter import get_groq_scheduler, current_priority, priority, is_rate_limited, retry_delay
+from prompt_compression import compress_prompt, estimate_tokens, PROMPT_COMPRESSION
+from keyword_engine import extract_keywords_local
+from tracing import span, attach, current_span
+
+# Settings sent with every transcript request; also part of the transcript cache key
+TRANSCRIPTION_SETTINGS = {
+    "speech_models": ["universal-3-pro"],
+    "language_code": "en",
+    "punctuate": True,
+    "format_text": True,
+}
+
+# Recordings longer than this are transcribed as parallel segments
+SEGMENTED_MIN_SECONDS = float(os.getenv("LECTUREAI_SEGMENTED_MIN_SECONDS", "1800"))
+SEGMENTED_WORKERS = int(os.getenv("LECTUREAI_SEGMENTED_WORKERS", "4"))
+
+# "llm" asks Groq for keywords, "local" uses the offline TF-IDF/TextRank engine
+KEYWORD_ENGINES = ("llm", "local")
+KEYWORD_ENGINE = os.getenv("LECTUREAI_KEYWORD_ENGINE", "llm")
+
+# Alternative API endpoints, e.g. the local stand-ins in loadtest/fake_services.py
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+ASSEMBLYAI_API_URL = ASSEMBLYAI_BASE_URL or "https://api.assemblyai.com"
+
+# Poll a transcript after this fraction of the time spent in its current status, within bounds
+POLL_MIN_SECONDS = float(os.getenv("LECTUREAI_POLL_MIN_SECONDS", "1"))
+POLL_MAX_SECONDS = float(os.getenv("LECTUREAI_POLL_MAX_SECONDS", "15"))
+POLL_FRACTION = 0.1
+
+# Bytes read from disk per upload chunk
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Connection pool settings for the shared HTTP client
+HTTP_MAX_CONNECTIONS = int(os.getenv("LECTUREAI_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LECTUREAI_HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LECTUREAI_HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Attempts _groq_chat repeats after a 429, 5xx or connection error. The SDK's
+# own retries are disabled so every attempt passes through the rate limiter.
+GROQ_MAX_RETRIES = int(os.getenv("LECTUREAI_GROQ_MAX_RETRIES", "2"))
+
+# Process-wide registry of credentials and clients, shared by all sessions and threads
+_registry_lock = threading.Lock()
+_api_keys = {}
+_groq_client = None
+_assemblyai_client = None
+_client_metrics = {'http_requests': 0, 'http_new_connections': 0}
+
+class _ConnectionCountingTransport(httpx.HTTPTransport):
+    """HTTP transport that records whether each request opened a new connection"""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        opened = []
+        previous_trace = request.extensions.get("trace")
+
+        def trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                opened.append(True)
+            if previous_trace:
+                previous_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return super().handle_request(request)
+        finally:
+            with _registry_lock:
+                _client_metrics['http_requests'] += 1
+                _client_metrics['http_new_connections'] += len(opened)
 
 def get_api_key(key_name: str) -> str:
     """
     Retrieve API key from Streamlit secrets or environment
     Priority: st.secrets (for deployment) > environment variables (for local)
+    Resolved keys are cached for the lifetime of the process (see reset_clients)
     """
+    cached = _api_keys.get(key_name)
+    if cached:
+        return cached
+    
+    key = _resolve_api_key(key_name)
+    with _registry_lock:
+        _api_keys[key_name] = key
+    return key
+
+def _resolve_api_key(key_name: str) -> str:
     # Try Streamlit secrets first (works for both local .streamlit/secrets.toml and Cloud deployment)
     try:
         return st.secrets[key_name]
@@ -23,81 +110,323 @@ def get_api_key(key_name: str) -> str:
     
     raise ValueError(f"API key '{key_name}' not found in Streamlit secrets or environment variables")
 
-def transcribe_audio(audio_path: str, max_retries: int = 3) -> Optional[str]:
+def http_limits() -> httpx.Limits:
+    """Connection pool limits shared by every HTTP client, sync or async"""
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+def get_groq_client() -> Groq:
     """
-    Transcribe audio file using AssemblyAI with retry logic
+    Return the shared Groq client, creating it on first use
+    
+    The client is thread-safe and keeps a pool of keep-alive connections, so
+    concurrent calls from any session reuse the same TLS connections.
+    """
+    global _groq_client
+    if _groq_client is not None:
+        return _groq_client
+    
+    api_key = get_api_key("GROQ_API_KEY")
+    with _registry_lock:
+        if _groq_client is None:
+            limits = http_limits()
+            http_client = httpx.Client(transport=_ConnectionCountingTransport(limits=limits), limits=limits)
+            _groq_client = Groq(api_key=api_key, http_client=http_client, base_url=GROQ_BASE_URL, max_retries=0)
+        return _groq_client
+
+def get_assemblyai_client() -> httpx.Client:
+    """
+    Return the shared AssemblyAI REST client, creating it on first use
+    
+    Like the Groq client it is thread-safe and keeps its connections alive
+    across requests from every session.
+    """
+    global _assemblyai_client
+    if _assemblyai_client is not None:
+        return _assemblyai_client
+    
+    api_key = get_api_key("ASSEMBLYAI_API_KEY")
+    with _registry_lock:
+        if _assemblyai_client is None:
+            limits = http_limits()
+            _assemblyai_client = httpx.Client(**assemblyai_client_options(api_key),
+                                              transport=_ConnectionCountingTransport(limits=limits))
+        return _assemblyai_client
+
+def assemblyai_client_options(api_key: str) -> dict:
+    """Base URL, credentials, pool limits and timeouts of an AssemblyAI HTTP client"""
+    return {
+        "base_url": ASSEMBLYAI_API_URL,
+        "headers": {"authorization": api_key},
+        "limits": http_limits(),
+        "timeout": httpx.Timeout(60.0, read=300.0),
+    }
+
+def client_metrics() -> dict:
+    """
+    Report how often pooled connections and clients were reused
+    
+    Returns:
+        Dictionary of counters plus the HTTP connection reuse rate
+    """
+    with _registry_lock:
+        metrics = dict(_client_metrics)
+    
+    requests = metrics['http_requests']
+    metrics['http_reused_connections'] = requests - metrics['http_new_connections']
+    metrics['http_reuse_rate'] = metrics['http_reused_connections'] / requests if requests else 0.0
+    return metrics
+
+def reset_clients():
+    """Drop cached credentials and clients, e.g. after rotating API keys"""
+    global _groq_client, _assemblyai_client
+    with _registry_lock:
+        if _groq_client is not None:
+            _groq_client.close()
+        if _assemblyai_client is not None:
+            _assemblyai_client.close()
+        _groq_client = None
+        _assemblyai_client = None
+        _api_keys.clear()
+
+def poll_interval(seconds_in_status: float) -> float:
+    """
+    Seconds to wait before the next transcript status poll
+    
+    Short jobs are picked up quickly; long ones are polled less and less
+    often, up to POLL_MAX_SECONDS.
+    """
+    return min(POLL_MAX_SECONDS, max(POLL_MIN_SECONDS, seconds_in_status * POLL_FRACTION))
+
+class TranscriptPoll:
+    """Status of a submitted transcript between polls, shared by the sync and async drivers"""
+
+    def __init__(self, transcript: dict):
+        self.transcript = transcript
+        self.status = transcript["status"]
+        self.status_since = time.monotonic()
+        self.polls = 0
+
+    @property
+    def url(self) -> str:
+        return f"/v2/transcript/{self.transcript['id']}"
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "error")
+
+    def next_delay(self) -> float:
+        return poll_interval(time.monotonic() - self.status_since)
+
+    def update(self, transcript: dict):
+        self.transcript = transcript
+        self.polls += 1
+        if transcript["status"] != self.status:
+            self.status, self.status_since = transcript["status"], time.monotonic()
+
+    def text(self) -> str:
+        """Text of the finished transcript; raises if it failed or came back empty"""
+        if self.status == "error":
+            raise Exception(f"Transcription failed: {self.transcript.get('error') or 'Unknown error'}")
+        if not self.transcript.get("text"):
+            raise Exception("Transcription returned empty text")
+        return self.transcript["text"]
+
+def _upload_headers(file_bytes: int) -> dict:
+    # The body is streamed in chunks, so its length has to be given up front
+    return {"content-length": str(file_bytes)}
+
+def _transcript_request(upload_url: str) -> dict:
+    return {"audio_url": upload_url, **TRANSCRIPTION_SETTINGS}
+
+def _response_json(response: httpx.Response) -> dict:
+    response.raise_for_status()
+    return response.json()
+
+def _file_chunks(path: str) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+def _retry_wait(error: Exception, attempt: int, max_retries: int, label: str, request_span) -> float:
+    """
+    Log a failed attempt and return the delay before the next one
+    
+    Raises:
+        Exception: "<label> failed after <max_retries> attempts" once none are left
+    """
+    if attempt >= max_retries - 1:
+        raise Exception(f"{label} failed after {max_retries} attempts: {str(error)}")
+    
+    wait_time = retry_delay(error, attempt)
+    request_span.add('retries')
+    print(f"{label} attempt {attempt + 1} failed: {str(error)}. Retrying in {wait_time:.1f}s...")
+    return wait_time
+
+def _transcribe_file(audio_path: str, max_retries: int) -> Optional[str]:
+    """
+    Upload, submit and poll one file over the AssemblyAI REST API, retrying on failure
     
     Args:
         audio_path: Path to the audio file
         max_retries: Maximum number of retry attempts
         
     Returns:
-        Transcribed text or None if failed
+        Transcribed text
     """
-    try:
-        api_key = get_api_key("ASSEMBLYAI_API_KEY")
-        aai.settings.api_key = api_key
-        
-        config = aai.TranscriptionConfig(
-            speech_models=["universal-3-pro"],
-            language_code="en",
-            punctuate=True,
-            format_text=True,
-        )
-        
-        transcriber = aai.Transcriber(config=config)
-        
+    client = get_assemblyai_client()
+    file_bytes = os.path.getsize(audio_path)
+    
+    with span("assemblyai.transcribe_file", file_bytes=file_bytes) as file_span:
         for attempt in range(max_retries):
+            file_span.set(attempts=attempt + 1)
             try:
-                # Upload and transcribe
-                transcript = transcriber.transcribe(audio_path)
+                # Upload, submit and wait as separate steps so each is timed on its own
+                with span("assemblyai.upload", bytes_uploaded=file_bytes):
+                    upload = _response_json(client.post("/v2/upload", content=_file_chunks(audio_path),
+                                                        headers=_upload_headers(file_bytes)))
+                file_span.add('bytes_uploaded', file_bytes)
                 
-                # Check status
-                if transcript.status == aai.TranscriptStatus.error:
-                    error_msg = transcript.error if hasattr(transcript, 'error') else "Unknown error"
-                    raise Exception(f"Transcription failed: {error_msg}")
+                with span("assemblyai.submit") as submit_span:
+                    transcript = _response_json(client.post("/v2/transcript",
+                                                            json=_transcript_request(upload["upload_url"])))
+                    submit_span.set(transcript_id=transcript["id"])
                 
-                # Return text if successful
-                if transcript.text:
-                    return transcript.text
-                else:
-                    raise Exception("Transcription returned empty text")
+                # Queueing and transcription on AssemblyAI's side
+                with span("assemblyai.wait", transcript_id=transcript["id"]) as wait_span:
+                    poll = TranscriptPoll(transcript)
+                    while not poll.done:
+                        time.sleep(poll.next_delay())
+                        poll.update(_response_json(client.get(poll.url)))
+                    wait_span.set(status=poll.status, polls=poll.polls)
+                
+                return poll.text()
                     
             except Exception as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2  # Exponential backoff
-                    print(f"Transcription attempt {attempt + 1} failed: {str(e)}. Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
-                else:
-                    raise Exception(f"Transcription failed after {max_retries} attempts: {str(e)}")
-        
-        return None
-        
+                time.sleep(_retry_wait(e, attempt, max_retries, "Transcription", file_span))
+    
+    return None
+
+def _should_segment(audio_path: str) -> bool:
+    """Segment recordings longer than SEGMENTED_MIN_SECONDS when ffmpeg is available"""
+    if not ffmpeg_available():
+        return False
+    try:
+        return probe_duration(audio_path) > SEGMENTED_MIN_SECONDS
     except Exception as e:
-        print(f"Error in transcription: {str(e)}")
-        raise
+        print(f"Could not determine audio duration: {str(e)}")
+        return False
 
-def generate_notes(transcript: str, max_retries: int = 3) -> Optional[str]:
+def _cached_transcript(audio_path: str, preprocess: bool, transcribe_span,
+                       file_hash: Optional[str] = None) -> Tuple[str, Optional[str]]:
     """
-    Generate structured notes from transcript using Groq
+    Look a recording up in the transcript cache
+    
+    Returns:
+        Tuple of (cache key, cached transcript or None)
+    """
+    settings = {**TRANSCRIPTION_SETTINGS, 'preprocess': PREPROCESS_SETTINGS if preprocess else None}
+    cache_key = transcript_cache_key(audio_path, settings, file_hash)
+    cached = get_transcript_cache().get(cache_key)
+    if cached:
+        transcribe_span.add('cache_hits')
+    return cache_key, cached
+
+def _preprocess(audio_path: str) -> dict:
+    """Run preprocess_audio under its own span and log what it saved"""
+    with span("audio.preprocess") as preprocess_span:
+        prepared = preprocess_audio(audio_path)
+        preprocess_span.set(original_bytes=prepared['original_bytes'], output_bytes=prepared['output_bytes'])
+    print(f"Audio preprocessing: {prepared['original_bytes']} -> {prepared['output_bytes']} bytes "
+          f"({prepared['bytes_saved']} saved) in {prepared['seconds']:.1f}s")
+    return prepared
+
+def _discard_prepared(prepared: Optional[dict]):
+    """Remove the compressed copy _preprocess made, if any"""
+    if prepared and prepared['compressed']:
+        os.remove(prepared['path'])
+
+def transcribe_audio(audio_path: str, max_retries: int = 3, use_cache: bool = True,
+                     preprocess: bool = True, segmented: Optional[bool] = None,
+                     file_hash: Optional[str] = None) -> Optional[str]:
+    """
+    Transcribe audio file using AssemblyAI with retry logic
     
     Args:
-        transcript: The transcribed text
+        audio_path: Path to the audio file
         max_retries: Maximum number of retry attempts
+        use_cache: Look up and store the transcript in the on-disk cache
+        preprocess: Extract and compress the audio track with ffmpeg before upload
+        segmented: Split at silences and transcribe segments in parallel;
+            None decides automatically based on duration
+        file_hash: SHA-256 of the file if already known, so the cache
+            lookup does not hash it again
         
     Returns:
-        Generated notes or None if failed
+        Transcribed text or None if failed
     """
     try:
-        api_key = get_api_key("GROQ_API_KEY")
-        client = Groq(api_key=api_key)
-        
-        # Truncate transcript if too long (Groq has token limits)
-        max_chars = 30000  # Conservative limit
-        if len(transcript) > max_chars:
-            transcript = transcript[:max_chars] + "\n\n[Transcript truncated due to length]"
+        with span("transcribe_audio", preprocess=preprocess) as transcribe_span:
+            # Identical recordings with identical settings never need a second round trip
+            cache_key = None
+            if use_cache:
+                cache_key, cached = _cached_transcript(audio_path, preprocess, transcribe_span, file_hash)
+                if cached:
+                    return cached
+            
+            prepared = None
+            try:
+                if preprocess:
+                    prepared = _preprocess(audio_path)
+                upload_path = prepared['path'] if prepared else audio_path
+                
+                if segmented is None:
+                    segmented = _should_segment(upload_path)
+                transcribe_span.set(segmented=segmented)
+                
+                if segmented:
+                    def transcribe_segment(path: str) -> Optional[str]:
+                        # Segment workers do not inherit the caller's context
+                        with attach(transcribe_span):
+                            return _transcribe_file(path, 1)
+                    
+                    # Retries happen per segment, so each attempt is a single request
+                    text = transcribe_segmented(upload_path, transcribe_segment,
+                                                max_workers=SEGMENTED_WORKERS, max_retries=max_retries)
+                else:
+                    text = _transcribe_file(upload_path, max_retries)
+            finally:
+                _discard_prepared(prepared)
+            
+            if text and cache_key:
+                get_transcript_cache().set(cache_key, text)
+            return text
         
-        system_prompt = """You are an expert academic note-taker and learning scientist. Your task is to transform lecture transcripts into comprehensive, well-structured study notes.
+    except Exception as e:
+        print(f"Error in transcription: {str(e)}")
+        raise
+
+# Transcripts up to this length are summarized in a single request
+NOTES_MAX_CHARS = 30000
+
+# Map-reduce settings for longer transcripts
+NOTES_CHUNK_CHARS = 12000
+NOTES_CHUNK_OVERLAP = 500
+NOTES_MAP_CONCURRENCY = 4
+
+# Completion limit of each map and condense request
+CHUNK_MAX_TOKENS = 3000
+
+# Yielded by stream_notes when a failed attempt is retried from scratch
+STREAM_RESET = None
+
+NOTES_SYSTEM_PROMPT = """You are an expert academic note-taker and learning scientist. Your task is to transform lecture transcripts into comprehensive, well-structured study notes.
 
 Create notes that include:
 
@@ -125,7 +454,221 @@ Create notes that include:
 
 Format the notes using clear markdown with proper headings, bullet points, and emphasis where appropriate. Make the notes scannable and easy to review."""
 
-        user_prompt = f"""Please create comprehensive study notes from the following lecture transcript:
+CHUNK_SYSTEM_PROMPT = """You are an expert academic note-taker. You will receive one consecutive part of a longer lecture transcript.
+
+Write detailed markdown notes for this part only:
+- Key concepts and definitions, with the examples given
+- Important details, explanations, numerical data and statistics
+- Methodologies, processes or procedures discussed
+- Real-world applications or case studies mentioned
+
+Do not write an overview, takeaways or review questions; the notes will be merged with notes from the other parts."""
+
+MERGE_USER_PROMPT = """The following are partial notes, in lecture order, taken from consecutive parts of one lecture:
+
+{partials}
+
+Merge them into a single set of comprehensive study notes following the format specified. Remove repetition caused by overlapping parts, keep every distinct concept, detail and example, and write the OVERVIEW, KEY TAKEAWAYS and QUESTIONS FOR REVIEW for the lecture as a whole."""
+
+# Request parameters shared by the sync and async APIs, so both hit the same cache entries
+NOTES_PARAMS = {"model": "llama-3.3-70b-versatile", "temperature": 0.3, "top_p": 0.9}
+KEYWORDS_PARAMS = {"model": "llama-3.3-70b-versatile", "temperature": 0.2, "max_tokens": 200}
+SUMMARY_PARAMS = {"model": "llama-3.3-70b-versatile", "temperature": 0.3, "max_tokens": 500}
+
+def _estimate_request_tokens(messages: List[dict], max_tokens: int) -> int:
+    """Tokens a chat request may consume: prompt estimate plus the completion limit"""
+    return sum(estimate_tokens(m["content"]) for m in messages) + max_tokens
+
+def _groq_chat(client: Groq, messages: List[dict], max_tokens: int, **params):
+    """
+    Send one chat completion through the process-wide rate limiter
+    
+    Blocks until the requests-per-minute and tokens-per-minute budgets allow
+    the request (interactive callers first), reserves the completion limit
+    and refunds what was not used once the response reports its usage. A
+    429 pauses every caller for the server's Retry-After; 429s, 5xx and
+    connection errors are retried up to GROQ_MAX_RETRIES times, each retry
+    queueing in the scheduler again.
+    
+    Args:
+        client: Groq client
+        messages: Chat messages
+        max_tokens: Completion token limit
+        **params: Other arguments for chat.completions.create
+        
+    Returns:
+        The completion, or the chunk stream if stream=True (streamed usage
+        is settled by the caller with record_usage)
+    """
+    scheduler = get_groq_scheduler()
+    estimated = _estimate_request_tokens(messages, max_tokens)
+    
+    with span("groq.chat", model=params.get('model'), stream=bool(params.get('stream')),
+              max_tokens=max_tokens, estimated_tokens=estimated) as chat_span:
+        for attempt in range(GROQ_MAX_RETRIES + 1):
+            _log_rate_wait(scheduler.acquire(estimated), scheduler, chat_span)
+            
+            try:
+                response = client.chat.completions.create(messages=messages, max_tokens=max_tokens, **params)
+                break
+            except Exception as e:
+                wait_time = _groq_retry_wait(e, attempt, scheduler, chat_span)
+                if wait_time is None:
+                    raise
+                time.sleep(wait_time)
+        
+        if not params.get('stream'):
+            _record_chat_usage(response, estimated, scheduler, chat_span)
+        return response
+
+def _log_rate_wait(waited: float, scheduler, chat_span):
+    chat_span.add('rate_limit_wait', waited)
+    if waited > 1:
+        print(f"Groq rate limit: waited {waited:.1f}s (queue depth {scheduler.stats()['queue_depth']})")
+
+def _record_chat_usage(response, estimated: int, scheduler, chat_span):
+    """Settle a completion's reservation with the usage it reports"""
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        chat_span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens,
+                      total_tokens=usage.total_tokens)
+        scheduler.record_usage(estimated, usage.total_tokens)
+
+def _groq_transient(error: Exception) -> bool:
+    """Whether a Groq error is worth retrying: 429, 5xx or a failed connection"""
+    if is_rate_limited(error) or isinstance(error, APIConnectionError):
+        return True
+    status = getattr(error, 'status_code', None)
+    return status is not None and status >= 500
+
+def _groq_retry_wait(error: Exception, attempt: int, scheduler, chat_span) -> Optional[float]:
+    """
+    Handle a failed Groq attempt
+    
+    Returns:
+        Seconds to sleep before the next attempt (0 after a 429, whose pause
+        the scheduler enforces), or None when the error should be raised
+    """
+    if is_rate_limited(error):
+        chat_span.set(rate_limited=True)
+        scheduler.pause(retry_delay(error, attempt))
+    if attempt >= GROQ_MAX_RETRIES or not _groq_transient(error):
+        return None
+    
+    chat_span.add('retries')
+    if is_rate_limited(error):
+        return 0.0
+    return retry_delay(error, attempt)
+
+def _notes_valid(notes: Optional[str]) -> bool:
+    """The minimum-length check generated notes must pass"""
+    return bool(notes) and len(notes.strip()) > 100
+
+def _checked_notes(notes: Optional[str]) -> str:
+    if not _notes_valid(notes):
+        raise Exception("Generated notes are too short or empty")
+    return notes
+
+def _notes_messages(system_prompt: str, user_prompt: str) -> List[dict]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _chat_text(client: Groq, messages: List[dict], use_cache: bool = True,
+               validate: Callable[[str], bool] = bool, **params) -> Optional[str]:
+    """
+    Text of one chat completion, answered from the response cache when possible
+    
+    Args:
+        client: Groq client
+        messages: Chat messages
+        use_cache: Look up and store the response in the on-disk cache
+        validate: Only responses passing this check are cached
+        **params: model, temperature, max_tokens, top_p (see _groq_chat)
+        
+    Returns:
+        Response text
+    """
+    cache_key, cached = _cached_response(messages, params, use_cache)
+    if cached:
+        return cached
+    
+    chat_completion = _groq_chat(client, messages=messages, **params)
+    text = chat_completion.choices[0].message.content
+    _store_response(cache_key, text, validate)
+    return text
+
+def _cached_response(messages: List[dict], params: dict, use_cache: bool) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Look a chat request up in the response cache
+    
+    Returns:
+        Tuple of (cache key or None when caching is off, cached text or None)
+    """
+    if not use_cache:
+        return None, None
+    
+    cache_key = response_cache_key(params.get('model'), messages, params.get('temperature'),
+                                   params.get('max_tokens'), params.get('top_p'))
+    cached = get_response_cache().get(cache_key)
+    if cached:
+        parent = current_span()
+        if parent:
+            parent.add('cache_hits')
+    return cache_key, cached
+
+def _store_response(cache_key: Optional[str], text: Optional[str], validate: Callable[[str], bool] = bool):
+    if cache_key and text and validate(text):
+        get_response_cache().set(cache_key, text)
+
+def rate_limit_stats() -> dict:
+    """
+    Report Groq scheduler queue depth, wait times and 429 pauses
+    
+    Returns:
+        Dictionary of scheduler statistics
+    """
+    return get_groq_scheduler().stats()
+
+def _complete_notes(client: Groq, system_prompt: str, user_prompt: str, max_retries: int,
+                    max_tokens: int = 8000, label: str = "Note generation",
+                    use_cache: bool = True) -> Optional[str]:
+    """
+    Run one notes completion with retries and the minimum-length check
+    
+    Args:
+        client: Groq client
+        system_prompt: System message
+        user_prompt: User message
+        max_retries: Maximum number of retry attempts
+        max_tokens: Completion token limit
+        label: Name used in log and error messages
+        use_cache: Reuse and store validated responses in the response cache
+        
+    Returns:
+        Generated notes or None if failed
+    """
+    with span("notes.complete", label=label) as notes_span:
+        for attempt in range(max_retries):
+            notes_span.set(attempts=attempt + 1)
+            try:
+                return _checked_notes(_chat_text(
+                    client,
+                    messages=_notes_messages(system_prompt, user_prompt),
+                    use_cache=use_cache,
+                    validate=_notes_valid,
+                    max_tokens=max_tokens,
+                    **NOTES_PARAMS,
+                ))
+                    
+            except Exception as e:
+                time.sleep(_retry_wait(e, attempt, max_retries, label, notes_span))
+    
+    return None
+
+def _notes_user_prompt(transcript: str) -> str:
+    return f"""Please create comprehensive study notes from the following lecture transcript:
 
 ---
 {transcript}
@@ -133,116 +676,353 @@ Format the notes using clear markdown with proper headings, bullet points, and e
 
 Generate well-structured, academic-quality notes following the format specified."""
 
-        for attempt in range(max_retries):
-            try:
-                chat_completion = client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    model="llama-3.3-70b-versatile",
-                    temperature=0.3,
-                    max_tokens=8000,
-                    top_p=0.9,
-                )
-                
-                notes = chat_completion.choices[0].message.content
+def _chunk_user_prompt(index: int, total: int, chunk: str) -> str:
+    return f"""Part {index + 1} of {total} of the lecture transcript:
+
+---
+{chunk}
+---"""
+
+def _condense_user_prompt(pair: List[str]) -> str:
+    return "Combine these notes from two consecutive parts of a lecture into one set of notes, removing repetition:\n\n" + "\n\n---\n\n".join(pair)
+
+def _chunk_requests(transcript: str) -> List[Tuple[str, str]]:
+    """User prompt and label of the map request for every chunk of a long transcript"""
+    chunks = chunk_text(transcript, NOTES_CHUNK_CHARS, NOTES_CHUNK_OVERLAP)
+    return [(_chunk_user_prompt(i, len(chunks), chunk), f"Chunk {i + 1} note generation")
+            for i, chunk in enumerate(chunks)]
+
+def _condense_pairs(partials: List[str]) -> List[List[str]]:
+    """Neighbouring partial notes to merge; an odd one out is carried over as it is"""
+    return [partials[i:i + 2] for i in range(0, len(partials), 2)]
+
+def _needs_condensing(partials: List[str]) -> bool:
+    # Condense neighbouring partials until the merge input fits one request
+    return len(partials) > 1 and len(_merge_prompt(partials)) > NOTES_MAX_CHARS
+
+def _map_chunk_notes(client: Groq, transcript: str, max_retries: int, use_cache: bool = True) -> List[str]:
+    """
+    Generate partial notes for every chunk of a long transcript in parallel
+    
+    Args:
+        client: Groq client
+        transcript: The full transcript
+        max_retries: Maximum number of retry attempts per chunk
+        use_cache: Reuse cached responses for chunks seen before
+        
+    Returns:
+        Partial notes in transcript order
+    """
+    requests = _chunk_requests(transcript)
+    
+    # Worker threads do not inherit the caller's context, so carry its priority and span over
+    level = current_priority()
+    
+    with span("notes.map", chunks=len(requests)) as map_span:
+        def note_chunk(request: Tuple[str, str]) -> str:
+            user_prompt, label = request
+            with priority(level), attach(map_span):
+                return _complete_notes(client, CHUNK_SYSTEM_PROMPT, user_prompt, max_retries,
+                                       max_tokens=CHUNK_MAX_TOKENS, label=label, use_cache=use_cache)
+        
+        with ThreadPoolExecutor(max_workers=NOTES_MAP_CONCURRENCY) as executor:
+            return list(executor.map(note_chunk, requests))
+
+def _merge_prompt(partials: List[str]) -> str:
+    """
+    Build the user prompt for the merge pass
+    
+    Args:
+        partials: Partial notes in lecture order
+        
+    Returns:
+        User prompt for the merge pass
+    """
+    joined = "\n\n---\n\n".join(f"### Part {i + 1}\n{p}" for i, p in enumerate(partials))
+    return MERGE_USER_PROMPT.format(partials=joined)
+
+def _condense_partials(client: Groq, partials: List[str], max_retries: int, use_cache: bool = True) -> List[str]:
+    """
+    Merge neighbouring pairs of partial notes in parallel, halving their count
+    
+    Args:
+        client: Groq client
+        partials: Partial notes in lecture order
+        max_retries: Maximum number of retry attempts per pair
+        use_cache: Reuse cached responses for pairs seen before
+        
+    Returns:
+        Condensed partial notes in lecture order
+    """
+    level = current_priority()
+    
+    with span("notes.condense", partials=len(partials)) as condense_span:
+        def condense(pair: List[str]) -> str:
+            if len(pair) == 1:
+                return pair[0]
+            with priority(level), attach(condense_span):
+                return _complete_notes(client, CHUNK_SYSTEM_PROMPT, _condense_user_prompt(pair), max_retries,
+                                       max_tokens=CHUNK_MAX_TOKENS, label="Partial notes condensing",
+                                       use_cache=use_cache)
+        
+        with ThreadPoolExecutor(max_workers=NOTES_MAP_CONCURRENCY) as executor:
+            return list(executor.map(condense, _condense_pairs(partials)))
+
+def _prepare_notes_prompts(client: Groq, transcript: str, max_retries: int, mode: str,
+                           compress: bool = PROMPT_COMPRESSION, use_cache: bool = True) -> Tuple[str, str, str]:
+    """
+    Build the final notes request, running the map phase first for long transcripts
+    
+    Args:
+        client: Groq client
+        transcript: The transcribed text
+        max_retries: Maximum number of retry attempts
+        mode: "single", "map_reduce" or "auto"
+        compress: Strip fillers and repeated sentences first (see prompt_compression)
+        use_cache: Reuse cached responses in the map phase
+        
+    Returns:
+        Tuple of (system prompt, user prompt, label) for the final request
+    """
+    transcript = _compress_transcript(transcript, compress)
+    if _resolve_notes_mode(transcript, mode) != "map_reduce":
+        return _single_notes_prompts(transcript)
+    
+    partials = _map_chunk_notes(client, transcript, max_retries, use_cache)
+    while _needs_condensing(partials):
+        partials = _condense_partials(client, partials, max_retries, use_cache)
+    
+    return _merge_notes_prompts(partials)
+
+def _compress_transcript(transcript: str, compress: bool) -> str:
+    # Compress first, so more of the lecture fits before chunking or truncation
+    with span("prompt.compress", label="Notes transcript") as compress_span:
+        compressed = compress_prompt(transcript, "Notes transcript", enabled=compress)
+        compress_span.set(input_tokens=compressed['input_tokens'], output_tokens=compressed['output_tokens'])
+    return compressed['text']
+
+def _resolve_notes_mode(transcript: str, mode: str) -> str:
+    if mode == "auto":
+        return "map_reduce" if len(transcript) > NOTES_MAX_CHARS else "single"
+    return mode
+
+def _single_notes_prompts(transcript: str) -> Tuple[str, str, str]:
+    # Truncate transcript if too long (Groq has token limits)
+    if len(transcript) > NOTES_MAX_CHARS:
+        transcript = transcript[:NOTES_MAX_CHARS] + "\n\n[Transcript truncated due to length]"
+    
+    return NOTES_SYSTEM_PROMPT, _notes_user_prompt(transcript), "Note generation"
+
+def _merge_notes_prompts(partials: List[str]) -> Tuple[str, str, str]:
+    return NOTES_SYSTEM_PROMPT, _merge_prompt(partials), "Note merging"
+
+def generate_notes(transcript: str, max_retries: int = 3, mode: str = "auto", stream: bool = False,
+                   compress: bool = PROMPT_COMPRESSION, use_cache: bool = True):
+    """
+    Generate structured notes from transcript using Groq
+    
+    Args:
+        transcript: The transcribed text
+        max_retries: Maximum number of retry attempts
+        mode: "single" truncates to one request, "map_reduce" notes chunks in
+            parallel and merges them, "auto" picks map_reduce for long transcripts
+        stream: Return a generator of text deltas instead (see stream_notes)
+        compress: Strip fillers and repeated sentences before sending
+        use_cache: Reuse and store validated responses in the on-disk
+            response cache; False always sends fresh requests
+        
+    Returns:
+        Generated notes or None if failed
+    """
+    if stream:
+        return stream_notes(transcript, max_retries=max_retries, mode=mode, compress=compress, use_cache=use_cache)
+    
+    try:
+        with span("generate_notes", mode=mode, transcript_chars=len(transcript)):
+            client = get_groq_client()
+            
+            system_prompt, user_prompt, label = _prepare_notes_prompts(client, transcript, max_retries, mode,
+                                                                       compress, use_cache)
+            return _complete_notes(client, system_prompt, user_prompt, max_retries, label=label, use_cache=use_cache)
+        
+    except Exception as e:
+        print(f"Error in note generation: {str(e)}")
+        raise
+
+def stream_notes(transcript: str, max_retries: int = 3, mode: str = "auto",
+                 compress: bool = PROMPT_COMPRESSION, use_cache: bool = True) -> Iterator[Optional[str]]:
+    """
+    Generate structured notes as a stream of text deltas
+    
+    Retries and the minimum-length check work as in generate_notes. When an
+    attempt fails after text was already streamed, STREAM_RESET is yielded
+    before the next attempt so the consumer can discard its buffer. Notes
+    found in the response cache are yielded as a single delta.
+    
+    Args:
+        transcript: The transcribed text
+        max_retries: Maximum number of retry attempts
+        mode: "single", "map_reduce" or "auto" (see generate_notes)
+        compress: Strip fillers and repeated sentences before sending
+        use_cache: Reuse and store validated notes in the response cache
+        
+    Yields:
+        Text deltas, or STREAM_RESET when a retry starts over
+    """
+    try:
+        # The consumer runs between yields in this same context, so the span is
+        # not made current; calls that should nest under it attach it explicitly
+        with span("stream_notes", activate=False, mode=mode, transcript_chars=len(transcript)) as stream_span:
+            client = get_groq_client()
+            
+            with attach(stream_span):
+                system_prompt, user_prompt, label = _prepare_notes_prompts(client, transcript, max_retries, mode,
+                                                                           compress, use_cache)
                 
-                if notes and len(notes.strip()) > 100:
-                    return notes
-                else:
-                    raise Exception("Generated notes are too short or empty")
+                # Same key as the non-streamed request, so either path can reuse the other's notes
+                messages = _notes_messages(system_prompt, user_prompt)
+                params = {**NOTES_PARAMS, "max_tokens": 8000}
+                cache_key, cached = _cached_response(messages, params, use_cache)
+            if cached:
+                yield cached
+                return
+            
+            scheduler = get_groq_scheduler()
+            for attempt in range(max_retries):
+                stream_span.set(attempts=attempt + 1)
+                received = []
+                try:
+                    with attach(stream_span):
+                        stream = _groq_chat(client, messages=messages, stream=True, **params)
                     
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    print(f"Note generation attempt {attempt + 1} failed: {str(e)}. Retrying in {wait_time}s...")
+                    for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            if 'first_token_seconds' not in stream_span.attributes:
+                                stream_span.set(first_token_seconds=stream_span.elapsed())
+                            received.append(delta)
+                            yield delta
+                    
+                    notes = "".join(received)
+                    # Streams carry no usage summary; refund the unused part of the reservation
+                    completion_tokens = estimate_tokens(notes)
+                    stream_span.set(completion_tokens=completion_tokens)
+                    scheduler.record_usage(_estimate_request_tokens(messages, 8000),
+                                           _estimate_request_tokens(messages, completion_tokens))
+                    _store_response(cache_key, _checked_notes(notes))
+                    return
+                        
+                except Exception as e:
+                    wait_time = _retry_wait(e, attempt, max_retries, label, stream_span)
+                    if received:
+                        yield STREAM_RESET
                     time.sleep(wait_time)
-                else:
-                    raise Exception(f"Note generation failed after {max_retries} attempts: {str(e)}")
-        
-        return None
         
     except Exception as e:
         print(f"Error in note generation: {str(e)}")
         raise
 
-def extract_keywords(text: str, max_keywords: int = 10) -> list:
+def extract_keywords(text: str, max_keywords: int = 10, compress: bool = PROMPT_COMPRESSION,
+                     engine: str = KEYWORD_ENGINE, use_cache: bool = True) -> list:
     """
     Extract key terms and concepts from text
     
     Args:
         text: Input text
         max_keywords: Maximum number of keywords to extract
+        compress: Strip fillers and repeated sentences before sending
+        engine: "llm" (Groq) or "local" (keyword_engine, no network)
+        use_cache: Reuse and store the response in the response cache
         
     Returns:
         List of keywords
     """
-    try:
-        api_key = get_api_key("GROQ_API_KEY")
-        client = Groq(api_key=api_key)
-        
-        # Truncate if too long
-        if len(text) > 10000:
-            text = text[:10000]
+    if engine not in KEYWORD_ENGINES:
+        raise ValueError(f"Unknown keyword engine '{engine}', expected one of {', '.join(KEYWORD_ENGINES)}")
+    
+    with span("extract_keywords", engine=engine) as keywords_span:
+        if engine == "local":
+            return extract_keywords_local(text, max_keywords)
         
-        prompt = f"""Extract the {max_keywords} most important keywords, terms, or concepts from this text. 
+        try:
+            client = get_groq_client()
+            prompt = _keywords_prompt(text, max_keywords, compress, keywords_span)
+            
+            keywords_str = _chat_text(
+                client,
+                messages=[{"role": "user", "content": prompt}],
+                use_cache=use_cache,
+                **KEYWORDS_PARAMS,
+            )
+            return _parse_keywords(keywords_str, max_keywords)
+            
+        except Exception as e:
+            keywords_span.fail(e)
+            print(f"Error extracting keywords: {str(e)}")
+            return []
+
+def _keywords_prompt(text: str, max_keywords: int, compress: bool, request_span) -> str:
+    compressed = compress_prompt(text, "Keywords text", enabled=compress)
+    request_span.set(input_tokens=compressed['input_tokens'], output_tokens=compressed['output_tokens'])
+    text = compressed['text']
+    
+    # Truncate if too long
+    if len(text) > 10000:
+        text = text[:10000]
+    
+    return f"""Extract the {max_keywords} most important keywords, terms, or concepts from this text. 
 Return only the keywords as a comma-separated list, nothing else.
 
 Text:
 {text}"""
 
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.2,
-            max_tokens=200,
-        )
-        
-        keywords_str = chat_completion.choices[0].message.content.strip()
-        keywords = [k.strip() for k in keywords_str.split(',') if k.strip()]
-        
-        return keywords[:max_keywords]
-        
-    except Exception as e:
-        print(f"Error extracting keywords: {str(e)}")
-        return []
+def _parse_keywords(response: str, max_keywords: int) -> list:
+    keywords = [k.strip() for k in response.strip().split(',') if k.strip()]
+    return keywords[:max_keywords]
 
-def summarize_text(text: str, max_length: int = 200) -> str:
+def summarize_text(text: str, max_length: int = 200, compress: bool = PROMPT_COMPRESSION,
+                   use_cache: bool = True) -> str:
     """
     Create a concise summary of text
     
     Args:
         text: Input text
         max_length: Maximum words in summary
+        compress: Strip fillers and repeated sentences before sending
+        use_cache: Reuse and store the response in the response cache
         
     Returns:
         Summary text
     """
-    try:
-        api_key = get_api_key("GROQ_API_KEY")
-        client = Groq(api_key=api_key)
-        
-        # Truncate if too long
-        if len(text) > 15000:
-            text = text[:15000]
-        
-        prompt = f"""Create a concise summary (maximum {max_length} words) of the following text. 
+    with span("summarize_text", max_length=max_length) as summary_span:
+        try:
+            client = get_groq_client()
+            prompt = _summary_prompt(text, max_length, compress, summary_span)
+            
+            summary = _chat_text(
+                client,
+                messages=[{"role": "user", "content": prompt}],
+                use_cache=use_cache,
+                **SUMMARY_PARAMS,
+            ).strip()
+            return summary
+            
+        except Exception as e:
+            summary_span.fail(e)
+            print(f"Error creating summary: {str(e)}")
+            return "Summary generation failed"
+
+def _summary_prompt(text: str, max_length: int, compress: bool, request_span) -> str:
+    compressed = compress_prompt(text, "Summary text", enabled=compress)
+    request_span.set(input_tokens=compressed['input_tokens'], output_tokens=compressed['output_tokens'])
+    text = compressed['text']
+    
+    # Truncate if too long
+    if len(text) > 15000:
+        text = text[:15000]
+    
+    return f"""Create a concise summary (maximum {max_length} words) of the following text. 
 Focus on the main points and key information.
 
 Text:
 {text}"""
-
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=500,
-        )
-        
-        summary = chat_completion.choices[0].message.content.strip()
-        return summary
-        
-    except Exception as e:
-        print(f"Error creating summary: {str(e)}")
-        return "Summary generation failed"
@@ -1,11 +1,34 @@
 import streamlit as st
 import os
-from pathlib import Path
-import tempfile
-from api_models import transcribe_audio, generate_notes, extract_keywords
-from formatter import format_notes, extract_sections
+from api_models import transcribe_audio, stream_notes, extract_keywords, STREAM_RESET
+from pipeline import run_post_transcription, DEFAULT_TIMEOUTS
+from formatter import format_notes, extract_sections, parse_notes, build_note_tree
+from job_queue import enqueue_job, get_job, start_workers, JOB_WORKERS
+from lecture_store import save_lecture, get_lecture, find_by_hash, search_lectures, count_lectures
+from spool import spool_upload, discard, SpoolFullError
+from tracing import span, attach, read_spans, stage_latencies, start_metrics_server, METRICS_PORT, TRACE_PATH
 import traceback
 import time
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+
+# Stream notes onto the results page instead of waiting for the full completion
+STREAM_NOTES = True
+
+# Hand uploads to background worker processes instead of processing in the script thread
+BACKGROUND_JOBS = os.getenv("LECTUREAI_BACKGROUND_JOBS", "1") == "1"
+
+# Show the stage latency panel (from the span log) on the upload page
+ADMIN_PANEL = os.getenv("LECTUREAI_ADMIN_PANEL", "0") == "1"
+
+# Labels for job stages shown while polling
+JOB_STAGE_LABELS = {
+    'queued': "⏳ Waiting for a worker...",
+    'transcribing': "🎧 Transcribing audio...",
+    'analyzing': "🧠 Extracting keywords and generating notes...",
+    'done': "Done!",
+}
 
 # Page configuration
 st.set_page_config(
@@ -114,29 +137,193 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_section_cards(notes_hash, _notes):
+    """Card header HTML and body markdown for every section, cached per notes hash"""
+    sections = extract_sections(parse_notes(_notes))
+    return [
+        (f'<div class="note-card"><span class="section-tag">MODULE {i+1}</span><h2>{title}</h2>', content)
+        for i, (title, content) in enumerate(sections.items())
+    ]
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_keyword_pills(keywords_hash, _keywords):
+    """Keyword pill HTML, cached per keyword list hash"""
+    kw_html = "".join([f'<span class="keyword-pill">{kw}</span>' for kw in _keywords])
+    return f'<div style="line-height:2;">{kw_html}</div>'
+
+def state_hash(key):
+    """Content hash of a session_state value, recomputed only when the value is replaced"""
+    value = st.session_state[key]
+    hashes = st.session_state.setdefault('_hashes', {})
+    cached = hashes.get(key)
+    if cached is None or cached[0] is not value:
+        cached = (value, hashlib.sha1(repr(value).encode('utf-8')).hexdigest())
+        hashes[key] = cached
+    return cached[1]
+
 def initialize_session_state():
     for key, val in {'page': 'upload', 'transcript': None, 'notes': None, 'keywords': [], 'file_info': {}}.items():
         if key not in st.session_state: st.session_state[key] = val
 
-def process_audio_logic(path, name):
+def show_results(transcript, keywords, notes, name, file_hash=None, save=False, file_size=None):
+    word_count = len(transcript.split())
+    st.session_state.update({
+        'transcript': transcript, 'keywords': keywords, 'notes': notes,
+        'file_info': {
+            'name': name, 'words': word_count, 
+            'time': f"{max(1, round(word_count/200))} min",
+            'hash': file_hash,
+            'size': file_size,
+        },
+        'page': 'results'
+    })
+    if save and notes:
+        save_lecture(name, transcript, notes, keywords, file_hash=file_hash, file_size=file_size)
+
+def open_stored_lecture(lecture):
+    show_results(lecture['transcript'], lecture['keywords'], lecture['notes'], lecture['name'], lecture['file_hash'],
+                 file_size=lecture['file_size'])
+    st.rerun()
+
+def write_upload(uploaded_file):
+    """Copy an upload into the spool in fixed-size chunks; returns the path and its content hash"""
+    with span("upload.write", bytes=uploaded_file.size):
+        return spool_upload(uploaded_file, uploaded_file.name, uploaded_file.size)
+
+@st.cache_resource
+def ensure_job_workers():
+    """Start the background worker processes once per server process"""
+    return start_workers(JOB_WORKERS)
+
+@st.cache_resource
+def keyword_executor():
+    """Threads extracting keywords while the results page streams the notes"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="keywords")
+
+def start_keywords(transcript, parent):
+    def task():
+        with attach(parent):
+            return extract_keywords(transcript)
+    st.session_state.keywords_future = keyword_executor().submit(task)
+
+def collect_keywords(keywords_slot, wait=False):
+    """Show the keywords extracted alongside the notes stream once they are ready"""
+    future = st.session_state.get('keywords_future')
+    if future is None or not (wait or future.done()):
+        return
+    try:
+        st.session_state.keywords = future.result(timeout=DEFAULT_TIMEOUTS['keywords']) or []
+    except Exception as e:
+        print(f"Keyword extraction failed: {str(e)}")
+        st.session_state.keywords = []
+    st.session_state.pop('keywords_future')
+    keywords_slot.markdown(render_keyword_pills(state_hash('keywords'), st.session_state.keywords), unsafe_allow_html=True)
+
+@st.cache_resource
+def ensure_metrics_server():
+    """Serve this process's span metrics on LECTUREAI_METRICS_PORT, if set"""
+    return start_metrics_server(METRICS_PORT) if METRICS_PORT else None
+
+def submit_job(uploaded_file):
+    # The upload must outlive this script run; the worker removes it when the job ends
+    path, file_hash = write_upload(uploaded_file)
+
+    # Recordings processed before are served from the lecture store
+    existing = find_by_hash(file_hash)
+    if existing:
+        discard(path)
+        open_stored_lecture(existing)
+
+    try:
+        ensure_job_workers()
+        job_id = enqueue_job(path, uploaded_file.name, file_hash)
+    except Exception:
+        discard(path)
+        raise
+    st.query_params["job"] = job_id
+    st.session_state.update({'job_id': job_id, 'page': 'job'})
+    st.rerun()
+
+def job_page():
+    """Poll a background job, showing stage progress and any notes streamed so far"""
+    job = get_job(st.session_state.job_id)
+    if job is None:
+        st.error("This job no longer exists.")
+        if st.button("New Scan"):
+            start_new_scan()
+        return
+
+    if job['status'] == 'done':
+        show_results(job['transcript'], job['keywords'], job['notes'], job['name'], job['file_hash'])
+        st.rerun()
+
+    st.markdown(f"<h1 style='margin:0;'>📖 {job['name']}</h1>", unsafe_allow_html=True)
+
+    if job['status'] == 'failed':
+        st.error(f"Processing failed: {job['error']}")
+        if st.button("New Scan"):
+            start_new_scan()
+        return
+
+    st.progress(job['progress'], text=JOB_STAGE_LABELS.get(job['stage'], job['stage']))
+    st.caption(f"Job `{job['id']}` keeps running if you close this tab; reopen this page's link to reattach.")
+
+    if job['partial_notes']:
+        sections = extract_sections(build_note_tree(job['partial_notes']))
+        for i, (title, content) in enumerate(sections.items()):
+            render_section_card(i, title, content)
+
+    time.sleep(1)
+    st.rerun()
+
+def start_new_scan():
+    st.query_params.clear()
+    st.session_state.page = 'upload'
+    st.session_state.pop('job_id', None)
+    st.session_state.pop('keywords_future', None)
+    st.rerun()
+
+def process_audio_logic(path, name, file_hash=None):
     with st.status("🔮 Analyzing...", expanded=True) as status:
-        transcript = transcribe_audio(path)
-        keywords = extract_keywords(transcript)
-        notes = generate_notes(transcript)
+        file_size = os.path.getsize(path)
+        with span("lecture", file_bytes=file_size) as lecture_span:
+            st.write("🎧 Transcribing audio...")
+            transcript = transcribe_audio(path, file_hash=file_hash)
+            lecture_span.set(words=len(transcript.split()) if transcript else 0)
+            
+            # Keywords and notes only depend on the transcript, so run them side by side;
+            # streamed notes start on the results page while keywords are still extracted
+            st.write("🧠 Extracting keywords and generating notes...")
+            if STREAM_NOTES:
+                start_keywords(transcript, lecture_span)
+            else:
+                stage = run_post_transcription(transcript)
         
-        word_count = len(transcript.split())
-        st.session_state.update({
-            'transcript': transcript, 'keywords': keywords, 'notes': notes,
-            'file_info': {
-                'name': name, 'words': word_count, 
-                'time': f"{max(1, round(word_count/200))} min"
-            },
-            'page': 'results'
-        })
+        if STREAM_NOTES:
+            show_results(transcript, [], None, name, file_hash, file_size=file_size)
+        elif stage['notes'] is None:
+            status.update(label="Note generation failed", state="error")
+            st.error(f"Could not generate notes: {stage['errors'].get('notes', 'unknown error')}")
+            return
+        else:
+            show_results(transcript, stage['keywords'] or [], stage['notes'], name, file_hash, save=True,
+                         file_size=file_size)
         status.update(label="Done!", state="complete")
         time.sleep(0.5)
         st.rerun()
 
+def process_upload(uploaded_file):
+    """Process an upload in the script thread, deleting the spooled copy however it ends"""
+    path, file_hash = write_upload(uploaded_file)
+    try:
+        existing = find_by_hash(file_hash)
+        if existing:
+            open_stored_lecture(existing)
+        process_audio_logic(path, uploaded_file.name, file_hash)
+    finally:
+        discard(path)
+
 def upload_page():
     st.markdown('<h1 style="text-align:center; font-weight:800; background:linear-gradient(135deg, #FF6B6B 0%, #FF8E72 100%); -webkit-background-clip:text; -webkit-text-fill-color:transparent; font-size:3.5rem; margin-top:2rem;">LectureAI</h1>', unsafe_allow_html=True)
     st.markdown('<p style="text-align:center; color:#64748B; margin-bottom:3rem;">Smart Knowledge Extraction</p>', unsafe_allow_html=True)
@@ -147,17 +334,101 @@ def upload_page():
         if uploaded_file:
             st.markdown(f"<div style='text-align:center; padding: 1rem;'>📄 <b>{uploaded_file.name}</b></div>", unsafe_allow_html=True)
             if st.button("🚀 Analyze Lecture", use_container_width=True):
-                with tempfile.NamedTemporaryFile(delete=False, suffix=Path(uploaded_file.name).suffix) as tmp:
-                    tmp.write(uploaded_file.getvalue())
-                    process_audio_logic(tmp.name, uploaded_file.name)
+                try:
+                    if BACKGROUND_JOBS:
+                        submit_job(uploaded_file)
+                    else:
+                        process_upload(uploaded_file)
+                except SpoolFullError as e:
+                    st.error(str(e))
+
+        st.markdown("<div style='height:1rem;'></div>", unsafe_allow_html=True)
+        if st.button(f"🔎 Search {count_lectures()} past lectures", use_container_width=True):
+            st.session_state.page = 'search'
+            st.rerun()
+
+        if ADMIN_PANEL and st.button("📊 Stage latencies", use_container_width=True):
+            st.session_state.page = 'admin'
+            st.rerun()
+
+def search_page():
+    c1, c2 = st.columns([5, 1.2])
+    with c1: st.markdown("<h1 style='margin:0;'>🔎 Search Lectures</h1>", unsafe_allow_html=True)
+    with c2:
+        if st.button("Back", use_container_width=True):
+            start_new_scan()
+
+    query = st.text_input("Search", placeholder="e.g. gradient descent", label_visibility="collapsed")
+    if not query:
+        return
+
+    start = time.perf_counter()
+    results = search_lectures(query)
+    st.caption(f"{len(results)} results in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for result in results:
+        st.markdown(f'<div class="note-card"><h2>{result["name"]}</h2>', unsafe_allow_html=True)
+        st.markdown(result['snippet'])
+        if st.button("Open", key=f"open-{result['id']}"):
+            open_stored_lecture(get_lecture(result['id']))
+        st.markdown('</div>', unsafe_allow_html=True)
+
+def admin_page():
+    """Per-stage latency statistics and recent traces from the span log"""
+    c1, c2 = st.columns([5, 1.2])
+    with c1: st.markdown("<h1 style='margin:0;'>📊 Stage Latencies</h1>", unsafe_allow_html=True)
+    with c2:
+        if st.button("Back", use_container_width=True):
+            start_new_scan()
+
+    limit = st.select_slider("Recent spans", options=[500, 2000, 5000, 20000], value=2000)
+    spans = read_spans(TRACE_PATH, limit)
+    if not spans:
+        st.info(f"No spans recorded in {TRACE_PATH} yet.")
+        return
+
+    stats = stage_latencies(spans)
+    st.subheader("Stages")
+    st.dataframe([
+        {'stage': name, 'count': s['count'], 'errors': s['errors'], 'p50 s': round(s['p50'], 2),
+         'p95 s': round(s['p95'], 2), 'max s': round(s['max'], 2), 'total s': round(s['total'], 1)}
+        for name, s in stats.items()
+    ], hide_index=True, use_container_width=True)
+
+    st.subheader("Latency histograms")
+    st.caption("Spans per duration bucket")
+    st.dataframe([{'stage': name, **s['histogram']} for name, s in stats.items()],
+                 hide_index=True, use_container_width=True)
+
+    st.subheader("Recent traces")
+    roots = [s for s in spans if s['parent_id'] is None][::-1][:20]
+    labels = {f"{time.strftime('%H:%M:%S', time.localtime(s['start']))} {s['name']} "
+              f"({s['duration']:.1f}s, {s['status']})": s['trace_id'] for s in roots}
+    choice = st.selectbox("Trace", list(labels))
+    if choice:
+        trace = sorted((s for s in spans if s['trace_id'] == labels[choice]), key=lambda s: s['start'])
+        depth = {}
+        rows = []
+        for s in trace:
+            depth[s['span_id']] = depth.get(s['parent_id'], -1) + 1
+            rows.append({
+                'span': "  " * depth[s['span_id']] + s['name'],
+                'offset s': round(s['start'] - trace[0]['start'], 2),
+                'duration s': round(s['duration'], 2),
+                'status': s['status'],
+                'attributes': json.dumps(s['attributes']),
+            })
+        st.dataframe(rows, hide_index=True, use_container_width=True)
 
 def results_page():
+    render_start = time.perf_counter()
+
     # Top Header
     c1, c2 = st.columns([5, 1.2])
     with c1: st.markdown(f"<h1 style='margin:0;'>📖 {st.session_state.file_info['name']}</h1>", unsafe_allow_html=True)
     with c2: 
         if st.button("New Scan", use_container_width=True):
-            st.session_state.page = 'upload'; st.rerun()
+            start_new_scan()
 
     # Metrics
     st.markdown(f"""
@@ -170,35 +441,118 @@ def results_page():
 
     col_main, col_side = st.columns([2.5, 1], gap="large")
 
-    with col_main:
-        sections = extract_sections(st.session_state.notes)
-        for i, (title, content) in enumerate(sections.items()):
-            # Custom container for card styling
-            st.markdown(f'<div class="note-card"><span class="section-tag">MODULE {i+1}</span><h2>{title}</h2>', unsafe_allow_html=True)
-            # st.markdown here correctly handles the **Bold** and list items
-            st.markdown(content)
-            st.markdown('</div>', unsafe_allow_html=True)
-
     with col_side:
         # Sidebar fix: Using standard Streamlit headers to avoid the ## raw text issue
         st.subheader("🏷️ Key Concepts")
-        kw_html = "".join([f'<span class="keyword-pill">{kw}</span>' for kw in st.session_state.keywords])
-        st.markdown(f'<div style="line-height:2;">{kw_html}</div>', unsafe_allow_html=True)
+        keywords_slot = st.empty()
+        if 'keywords_future' in st.session_state:
+            keywords_slot.caption("Extracting key concepts...")
+        else:
+            keywords_slot.markdown(render_keyword_pills(state_hash('keywords'), st.session_state.keywords), unsafe_allow_html=True)
         
         st.divider()
         
         st.subheader("📥 Actions")
-        st.download_button("Download .MD", st.session_state.notes, file_name="notes.md", use_container_width=True)
+        st.download_button("Download .MD", st.session_state.notes or "", file_name="notes.md",
+                           use_container_width=True, disabled=st.session_state.notes is None)
         
         with st.expander("📜 Transcript"):
             st.caption(st.session_state.transcript)
 
+        render_time_slot = st.empty()
+
+    with col_main:
+        if st.session_state.notes is None:
+            stream_notes_into_page(keywords_slot)
+            return
+
+        # Pre-rendered once per distinct notes text, not on every rerun
+        for header_html, content in render_section_cards(state_hash('notes'), st.session_state.notes):
+            emit_section_card(header_html, content)
+
+    render_ms = (time.perf_counter() - render_start) * 1000
+    render_time_slot.caption(f"⏱️ Rendered in {render_ms:.0f} ms")
+
+def emit_section_card(header_html, content):
+    # Custom container for card styling
+    st.markdown(header_html, unsafe_allow_html=True)
+    # st.markdown here correctly handles the **Bold** and list items
+    st.markdown(content)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def render_section_card(i, title, content):
+    emit_section_card(f'<div class="note-card"><span class="section-tag">MODULE {i+1}</span><h2>{title}</h2>', content)
+
+def stream_notes_into_page(keywords_slot):
+    """Render note sections as soon as each one is complete while the notes stream in"""
+    completed_area = st.empty()
+    live_area = st.empty()
+    buffer = ""
+    completed = 0
+    last_live_update = 0.0
+
+    try:
+        for delta in stream_notes(st.session_state.transcript):
+            if delta is STREAM_RESET:
+                # A failed attempt is being retried from scratch
+                buffer, completed = "", 0
+                completed_area.empty()
+                live_area.empty()
+                continue
+
+            buffer += delta
+            # Section boundaries only move when a line or header starts, so re-parse
+            # then, or when the live card is due for a refresh
+            live_due = time.monotonic() - last_live_update > 0.25
+            if not (live_due or '\n' in delta or '#' in delta):
+                continue
+            collect_keywords(keywords_slot)
+            sections = list(extract_sections(build_note_tree(buffer)).items())
+
+            # Every section except the last one has seen its closing header
+            if len(sections) - 1 > completed:
+                completed = len(sections) - 1
+                with completed_area.container():
+                    for i, (title, content) in enumerate(sections[:completed]):
+                        render_section_card(i, title, content)
+
+            if sections and live_due:
+                last_live_update = time.monotonic()
+                title, content = sections[-1]
+                with live_area.container():
+                    render_section_card(len(sections) - 1, title, content)
+    except Exception as e:
+        collect_keywords(keywords_slot)
+        st.error(f"Could not generate notes: {str(e)}")
+        return
+
+    collect_keywords(keywords_slot, wait=True)
+    st.session_state.notes = buffer
+    save_lecture(st.session_state.file_info['name'], st.session_state.transcript, buffer,
+                 st.session_state.keywords, file_hash=st.session_state.file_info.get('hash'),
+                 file_size=st.session_state.file_info.get('size'))
+    st.rerun()
+
 def main():
     initialize_session_state()
+    ensure_metrics_server()
+
+    # Reattach to a background job after a refresh or from a shared link
+    job_id = st.query_params.get("job")
+    if job_id and st.session_state.page == 'upload':
+        st.session_state.update({'job_id': job_id, 'page': 'job'})
+
     if st.session_state.page == 'upload':
         upload_page()
+    elif st.session_state.page == 'job':
+        job_page()
+    elif st.session_state.page == 'search':
+        search_page()
+    elif st.session_state.page == 'admin':
+        admin_page()
     else:
-        results_page()
+        with span("render.results", streaming=st.session_state.notes is None):
+            results_page()
 
 if __name__ == "__main__":
     main()
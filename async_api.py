@@ -0,0 +1,495 @@
+"""
+Async counterparts of the api_models entry points
+
+transcribe_audio_async, generate_notes_async, extract_keywords_async and
+summarize_text_async behave like their api_models namesakes. Their waits
+(rate limiting, retries, AssemblyAI polling) are awaits instead of blocking
+sleeps, so one event loop can drive dozens of lectures at once:
+
+    results = await asyncio.gather(*(process_lecture_async(path) for path in paths))
+
+Every call accepts a timeout and can be cancelled; a cancelled or timed-out
+call gives up its place in the Groq queue and stops polling. Only the
+waiting differs: prompts, request parameters, validation, retry decisions,
+transcript polling, caches, the rate limiter and tracing all come from
+api_models, so both APIs send the same requests, record the same spans and
+reuse each other's cached responses.
+"""
+import os
+import shutil
+import asyncio
+import tempfile
+import threading
+import weakref
+import httpx
+from groq import AsyncGroq
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from api_models import (
+    get_api_key, http_limits, assemblyai_client_options, SEGMENTED_WORKERS, KEYWORD_ENGINES, KEYWORD_ENGINE,
+    GROQ_BASE_URL, NOTES_PARAMS, KEYWORDS_PARAMS, SUMMARY_PARAMS, NOTES_MAP_CONCURRENCY, CHUNK_MAX_TOKENS,
+    CHUNK_SYSTEM_PROMPT, GROQ_MAX_RETRIES, UPLOAD_CHUNK_BYTES, TranscriptPoll,
+    _upload_headers, _transcript_request, _response_json, _retry_wait, _should_segment, _cached_transcript,
+    _preprocess, _discard_prepared, _estimate_request_tokens, _log_rate_wait, _record_chat_usage,
+    _groq_retry_wait, _notes_valid, _checked_notes, _notes_messages, _cached_response, _store_response,
+    _chunk_requests, _condense_pairs, _needs_condensing, _condense_user_prompt, _merge_notes_prompts,
+    _compress_transcript, _resolve_notes_mode, _single_notes_prompts, _keywords_prompt, _parse_keywords,
+    _summary_prompt,
+)
+from cache import get_transcript_cache
+from segmented_transcription import split_recording, segment_retry_wait, join_segments
+from rate_limiter import get_groq_scheduler
+from prompt_compression import PROMPT_COMPRESSION
+from keyword_engine import extract_keywords_local
+from tracing import span
+
+# Default time budgets in seconds (None waits indefinitely)
+TRANSCRIBE_TIMEOUT = 3600
+NOTES_TIMEOUT = 600
+KEYWORDS_TIMEOUT = 60
+SUMMARY_TIMEOUT = 120
+
+# Clients bind their connections to the event loop they were first used on
+_clients_lock = threading.Lock()
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+def _loop_clients() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        return _clients.setdefault(loop, {})
+
+def get_async_groq_client() -> AsyncGroq:
+    """Return the AsyncGroq client of the running event loop, creating it on first use"""
+    clients = _loop_clients()
+    if 'groq' not in clients:
+        clients['groq'] = AsyncGroq(api_key=get_api_key("GROQ_API_KEY"), base_url=GROQ_BASE_URL,
+                                    http_client=httpx.AsyncClient(limits=http_limits()), max_retries=0)
+    return clients['groq']
+
+def get_assemblyai_client() -> httpx.AsyncClient:
+    """Return the AssemblyAI REST client of the running event loop, creating it on first use"""
+    clients = _loop_clients()
+    if 'assemblyai' not in clients:
+        clients['assemblyai'] = httpx.AsyncClient(**assemblyai_client_options(get_api_key("ASSEMBLYAI_API_KEY")))
+    return clients['assemblyai']
+
+async def close_async_clients():
+    """Close the running event loop's clients, e.g. before the loop shuts down"""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _clients.pop(loop, {})
+    if 'groq' in clients:
+        await clients['groq'].close()
+    if 'assemblyai' in clients:
+        await clients['assemblyai'].aclose()
+
+async def _with_timeout(awaitable, timeout: Optional[float]):
+    if timeout is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout)
+
+async def _file_chunks(path: str) -> AsyncIterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+async def _transcribe_file_async(audio_path: str, max_retries: int) -> Optional[str]:
+    """Upload, submit and poll one file without blocking (see api_models._transcribe_file)"""
+    client = get_assemblyai_client()
+    file_bytes = os.path.getsize(audio_path)
+
+    with span("assemblyai.transcribe_file", file_bytes=file_bytes) as file_span:
+        for attempt in range(max_retries):
+            file_span.set(attempts=attempt + 1)
+            try:
+                with span("assemblyai.upload", bytes_uploaded=file_bytes):
+                    upload = _response_json(await client.post("/v2/upload", content=_file_chunks(audio_path),
+                                                              headers=_upload_headers(file_bytes)))
+                file_span.add('bytes_uploaded', file_bytes)
+
+                with span("assemblyai.submit") as submit_span:
+                    transcript = _response_json(await client.post("/v2/transcript",
+                                                                  json=_transcript_request(upload["upload_url"])))
+                    submit_span.set(transcript_id=transcript["id"])
+
+                with span("assemblyai.wait", transcript_id=transcript["id"]) as wait_span:
+                    poll = TranscriptPoll(transcript)
+                    while not poll.done:
+                        await asyncio.sleep(poll.next_delay())
+                        poll.update(_response_json(await client.get(poll.url)))
+                    wait_span.set(status=poll.status, polls=poll.polls)
+
+                return poll.text()
+
+            except Exception as e:
+                await asyncio.sleep(_retry_wait(e, attempt, max_retries, "Transcription", file_span))
+
+    return None
+
+async def _transcribe_segmented_async(audio_path: str, max_retries: int) -> str:
+    """
+    Split at silences and transcribe up to SEGMENTED_WORKERS segments at a time
+
+    As in segmented_transcription.transcribe_segments, each attempt is a single
+    request per segment and only the segments that failed are retried.
+    """
+    workdir = tempfile.mkdtemp(prefix="lectureai-segments-")
+    try:
+        paths, overlaps = await asyncio.to_thread(split_recording, audio_path, workdir)
+        limit = asyncio.Semaphore(SEGMENTED_WORKERS)
+
+        async def transcribe_segment(path: str) -> str:
+            async with limit:
+                text = await _transcribe_file_async(path, 1)
+            if text is None:
+                raise Exception("Transcription returned no text")
+            return text
+
+        texts: Dict[int, str] = {}
+        pending = list(range(len(paths)))
+        for attempt in range(max_retries):
+            outcomes = await asyncio.gather(*(transcribe_segment(paths[i]) for i in pending),
+                                            return_exceptions=True)
+            errors = {}
+            for index, outcome in zip(pending, outcomes):
+                if isinstance(outcome, Exception):
+                    errors[index] = outcome
+                elif isinstance(outcome, BaseException):
+                    raise outcome
+                else:
+                    texts[index] = outcome
+
+            pending = sorted(errors)
+            if not pending:
+                break
+            await asyncio.sleep(segment_retry_wait(errors, attempt, max_retries))
+
+        return join_segments([texts[i] for i in range(len(paths))], overlaps)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def _discard_preprocessed(preprocessing: asyncio.Future):
+    if not preprocessing.cancelled() and preprocessing.exception() is None:
+        _discard_prepared(preprocessing.result())
+
+async def transcribe_audio_async(audio_path: str, max_retries: int = 3, use_cache: bool = True,
+                                 preprocess: bool = True, segmented: Optional[bool] = None,
+                                 file_hash: Optional[str] = None,
+                                 timeout: Optional[float] = TRANSCRIBE_TIMEOUT) -> Optional[str]:
+    """
+    Transcribe an audio file with AssemblyAI without blocking the event loop
+
+    Args:
+        audio_path: Path to the audio file
+        max_retries: Maximum number of retry attempts
+        use_cache: Look up and store the transcript in the on-disk cache
+        preprocess: Extract and compress the audio track with ffmpeg before upload
+        segmented: Split at silences and transcribe segments concurrently;
+            None decides automatically based on duration
+        file_hash: SHA-256 of the file if already known
+        timeout: Overall time budget in seconds
+
+    Returns:
+        Transcribed text or None if failed
+
+    Raises:
+        asyncio.TimeoutError: If the time budget runs out
+    """
+    async def run() -> Optional[str]:
+        with span("transcribe_audio", preprocess=preprocess, asynchronous=True) as transcribe_span:
+            # Hashing and ffmpeg are blocking work, so they run in worker threads
+            cache_key = None
+            if use_cache:
+                cache_key, cached = await asyncio.to_thread(_cached_transcript, audio_path, preprocess,
+                                                            transcribe_span, file_hash)
+                if cached:
+                    return cached
+
+            # A worker thread cannot be cancelled, so ffmpeg runs on after a timeout
+            # or cancellation; the task is shielded so its output can still be removed
+            preprocessing = None
+            try:
+                if preprocess:
+                    preprocessing = asyncio.ensure_future(asyncio.to_thread(_preprocess, audio_path))
+                    upload_path = (await asyncio.shield(preprocessing))['path']
+                else:
+                    upload_path = audio_path
+
+                use_segments = segmented
+                if use_segments is None:
+                    use_segments = await asyncio.to_thread(_should_segment, upload_path)
+                transcribe_span.set(segmented=use_segments)
+
+                if use_segments:
+                    text = await _transcribe_segmented_async(upload_path, max_retries)
+                else:
+                    text = await _transcribe_file_async(upload_path, max_retries)
+            finally:
+                if preprocessing is not None:
+                    if preprocessing.done():
+                        _discard_preprocessed(preprocessing)
+                    else:
+                        preprocessing.add_done_callback(_discard_preprocessed)
+
+            if text and cache_key:
+                get_transcript_cache().set(cache_key, text)
+            return text
+
+    try:
+        return await _with_timeout(run(), timeout)
+    except Exception as e:
+        print(f"Error in transcription: {str(e) or type(e).__name__}")
+        raise
+
+async def _groq_chat_async(client: AsyncGroq, messages: List[dict], max_tokens: int, **params):
+    """Send one chat completion through the shared rate limiter (see api_models._groq_chat)"""
+    scheduler = get_groq_scheduler()
+    estimated = _estimate_request_tokens(messages, max_tokens)
+
+    with span("groq.chat", model=params.get('model'), stream=False, max_tokens=max_tokens,
+              estimated_tokens=estimated) as chat_span:
+        for attempt in range(GROQ_MAX_RETRIES + 1):
+            _log_rate_wait(await scheduler.acquire_async(estimated), scheduler, chat_span)
+
+            try:
+                response = await client.chat.completions.create(messages=messages, max_tokens=max_tokens, **params)
+                break
+            except Exception as e:
+                wait_time = _groq_retry_wait(e, attempt, scheduler, chat_span)
+                if wait_time is None:
+                    raise
+                await asyncio.sleep(wait_time)
+
+        _record_chat_usage(response, estimated, scheduler, chat_span)
+        return response
+
+async def _chat_text_async(client: AsyncGroq, messages: List[dict], use_cache: bool = True,
+                           validate: Callable[[str], bool] = bool, **params) -> Optional[str]:
+    """Text of one chat completion, answered from the shared response cache when possible"""
+    cache_key, cached = _cached_response(messages, params, use_cache)
+    if cached:
+        return cached
+
+    chat_completion = await _groq_chat_async(client, messages=messages, **params)
+    text = chat_completion.choices[0].message.content
+    _store_response(cache_key, text, validate)
+    return text
+
+async def _complete_notes_async(client: AsyncGroq, system_prompt: str, user_prompt: str, max_retries: int,
+                                max_tokens: int = 8000, label: str = "Note generation",
+                                use_cache: bool = True) -> Optional[str]:
+    """Run one notes completion with retries and the minimum-length check"""
+    with span("notes.complete", label=label) as notes_span:
+        for attempt in range(max_retries):
+            notes_span.set(attempts=attempt + 1)
+            try:
+                return _checked_notes(await _chat_text_async(
+                    client,
+                    messages=_notes_messages(system_prompt, user_prompt),
+                    use_cache=use_cache,
+                    validate=_notes_valid,
+                    max_tokens=max_tokens,
+                    **NOTES_PARAMS,
+                ))
+
+            except Exception as e:
+                await asyncio.sleep(_retry_wait(e, attempt, max_retries, label, notes_span))
+
+    return None
+
+async def _gather_limited(coroutines: List, limit: int) -> List:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return list(await asyncio.gather(*(run(c) for c in coroutines)))
+
+async def _prepare_notes_prompts_async(client: AsyncGroq, transcript: str, max_retries: int, mode: str,
+                                       compress: bool, use_cache: bool) -> Tuple[str, str, str]:
+    """Build the final notes request, running the map phase concurrently for long transcripts"""
+    transcript = _compress_transcript(transcript, compress)
+    if _resolve_notes_mode(transcript, mode) != "map_reduce":
+        return _single_notes_prompts(transcript)
+
+    requests = _chunk_requests(transcript)
+    with span("notes.map", chunks=len(requests)):
+        partials = await _gather_limited([
+            _complete_notes_async(client, CHUNK_SYSTEM_PROMPT, user_prompt, max_retries,
+                                  max_tokens=CHUNK_MAX_TOKENS, label=label, use_cache=use_cache)
+            for user_prompt, label in requests
+        ], NOTES_MAP_CONCURRENCY)
+
+    async def condense(pair: List[str]) -> str:
+        if len(pair) == 1:
+            return pair[0]
+        return await _complete_notes_async(client, CHUNK_SYSTEM_PROMPT, _condense_user_prompt(pair),
+                                           max_retries, max_tokens=CHUNK_MAX_TOKENS,
+                                           label="Partial notes condensing", use_cache=use_cache)
+
+    while _needs_condensing(partials):
+        with span("notes.condense", partials=len(partials)):
+            partials = await _gather_limited([condense(pair) for pair in _condense_pairs(partials)],
+                                             NOTES_MAP_CONCURRENCY)
+
+    return _merge_notes_prompts(partials)
+
+async def generate_notes_async(transcript: str, max_retries: int = 3, mode: str = "auto",
+                               compress: bool = PROMPT_COMPRESSION, use_cache: bool = True,
+                               timeout: Optional[float] = NOTES_TIMEOUT) -> Optional[str]:
+    """
+    Generate structured notes from a transcript (see api_models.generate_notes)
+
+    Args:
+        transcript: The transcribed text
+        max_retries: Maximum number of retry attempts
+        mode: "single", "map_reduce" or "auto"
+        compress: Strip fillers and repeated sentences before sending
+        use_cache: Reuse and store validated responses in the response cache
+        timeout: Overall time budget in seconds
+
+    Returns:
+        Generated notes or None if failed
+
+    Raises:
+        asyncio.TimeoutError: If the time budget runs out
+    """
+    async def run() -> Optional[str]:
+        with span("generate_notes", mode=mode, transcript_chars=len(transcript), asynchronous=True):
+            client = get_async_groq_client()
+            system_prompt, user_prompt, label = await _prepare_notes_prompts_async(
+                client, transcript, max_retries, mode, compress, use_cache)
+            return await _complete_notes_async(client, system_prompt, user_prompt, max_retries,
+                                               label=label, use_cache=use_cache)
+
+    try:
+        return await _with_timeout(run(), timeout)
+    except Exception as e:
+        print(f"Error in note generation: {str(e) or type(e).__name__}")
+        raise
+
+async def extract_keywords_async(text: str, max_keywords: int = 10, compress: bool = PROMPT_COMPRESSION,
+                                 engine: str = KEYWORD_ENGINE, use_cache: bool = True,
+                                 timeout: Optional[float] = KEYWORDS_TIMEOUT) -> list:
+    """
+    Extract key terms and concepts from text (see api_models.extract_keywords)
+
+    Failures and timeouts return an empty list, as in the sync API.
+
+    Args:
+        text: Input text
+        max_keywords: Maximum number of keywords to extract
+        compress: Strip fillers and repeated sentences before sending
+        engine: "llm" (Groq) or "local" (keyword_engine, run in a worker thread)
+        use_cache: Reuse and store the response in the response cache
+        timeout: Time budget in seconds
+
+    Returns:
+        List of keywords
+    """
+    if engine not in KEYWORD_ENGINES:
+        raise ValueError(f"Unknown keyword engine '{engine}', expected one of {', '.join(KEYWORD_ENGINES)}")
+
+    with span("extract_keywords", engine=engine, asynchronous=True) as keywords_span:
+        if engine == "local":
+            return await asyncio.to_thread(extract_keywords_local, text, max_keywords)
+
+        async def run() -> list:
+            client = get_async_groq_client()
+            prompt = _keywords_prompt(text, max_keywords, compress, keywords_span)
+            keywords_str = await _chat_text_async(
+                client,
+                messages=[{"role": "user", "content": prompt}],
+                use_cache=use_cache,
+                **KEYWORDS_PARAMS,
+            )
+            return _parse_keywords(keywords_str, max_keywords)
+
+        try:
+            return await _with_timeout(run(), timeout)
+        except Exception as e:
+            keywords_span.fail(e)
+            print(f"Error extracting keywords: {str(e) or type(e).__name__}")
+            return []
+
+async def summarize_text_async(text: str, max_length: int = 200, compress: bool = PROMPT_COMPRESSION,
+                               use_cache: bool = True, timeout: Optional[float] = SUMMARY_TIMEOUT) -> str:
+    """
+    Create a concise summary of text (see api_models.summarize_text)
+
+    Args:
+        text: Input text
+        max_length: Maximum words in summary
+        compress: Strip fillers and repeated sentences before sending
+        use_cache: Reuse and store the response in the response cache
+        timeout: Time budget in seconds
+
+    Returns:
+        Summary text
+    """
+    with span("summarize_text", max_length=max_length, asynchronous=True) as summary_span:
+        async def run() -> str:
+            client = get_async_groq_client()
+            prompt = _summary_prompt(text, max_length, compress, summary_span)
+            summary = await _chat_text_async(
+                client,
+                messages=[{"role": "user", "content": prompt}],
+                use_cache=use_cache,
+                **SUMMARY_PARAMS,
+            )
+            return summary.strip()
+
+        try:
+            return await _with_timeout(run(), timeout)
+        except Exception as e:
+            summary_span.fail(e)
+            print(f"Error creating summary: {str(e) or type(e).__name__}")
+            return "Summary generation failed"
+
+async def process_lecture_async(audio_path: str, keyword_engine: str = KEYWORD_ENGINE,
+                                include_summary: bool = False, **transcribe_options) -> Dict[str, Any]:
+    """
+    Transcribe a recording, then extract keywords and generate notes concurrently
+
+    Args:
+        audio_path: Path to the audio file
+        keyword_engine: "llm" or "local"
+        include_summary: Also produce a short summary
+        **transcribe_options: Passed to transcribe_audio_async
+
+    Returns:
+        Dictionary with 'transcript', 'keywords', 'notes', 'summary' and 'errors'
+    """
+    with span("lecture", file_bytes=os.path.getsize(audio_path), asynchronous=True):
+        transcript = await transcribe_audio_async(audio_path, **transcribe_options)
+        if not transcript:
+            raise Exception("Transcription returned no text")
+
+        tasks = {
+            'keywords': extract_keywords_async(transcript, engine=keyword_engine),
+            'notes': generate_notes_async(transcript),
+        }
+        if include_summary:
+            tasks['summary'] = summarize_text_async(transcript)
+
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    results, errors = {}, {}
+    for name, outcome in zip(tasks, outcomes):
+        if isinstance(outcome, asyncio.CancelledError):
+            raise outcome
+        if isinstance(outcome, BaseException):
+            errors[name] = str(outcome) or type(outcome).__name__
+        else:
+            results[name] = outcome
+
+    return {
+        'transcript': transcript,
+        'keywords': results.get('keywords'),
+        'notes': results.get('notes'),
+        'summary': results.get('summary'),
+        'errors': errors,
+    }
@@ -0,0 +1,123 @@
+import os
+import time
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Dict, Optional
+
+# Speech only needs a mono 16 kHz track; Opus at low bitrate keeps it intelligible
+PREPROCESS_SETTINGS = {
+    'sample_rate': 16000,
+    'channels': 1,
+    'codec': 'libopus',
+    'bitrate': '24k',
+    'trim_silence': os.getenv("LECTUREAI_TRIM_SILENCE", "0") == "1",
+}
+
+# Leading/trailing silence below this level and longer than this duration is trimmed
+SILENCE_THRESHOLD = "-50dB"
+SILENCE_MIN_SECONDS = 1.0
+
+def ffmpeg_available() -> bool:
+    """Check whether the ffmpeg binary is on PATH"""
+    return shutil.which("ffmpeg") is not None
+
+def build_ffmpeg_command(input_path: str, output_path: str, settings: Dict[str, Any]) -> list:
+    """
+    Build the ffmpeg command that extracts and compresses the audio track
+
+    Args:
+        input_path: Source audio or video file
+        output_path: Destination file (.ogg)
+        settings: Preprocessing settings (see PREPROCESS_SETTINGS)
+
+    Returns:
+        Command as a list of arguments
+    """
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", input_path,
+        "-vn",  # drop any video stream
+        "-ac", str(settings['channels']),
+        "-ar", str(settings['sample_rate']),
+    ]
+
+    if settings.get('trim_silence'):
+        # Trim the start, reverse, trim the (former) end, reverse back
+        trim = (f"silenceremove=start_periods=1:start_duration={SILENCE_MIN_SECONDS}"
+                f":start_threshold={SILENCE_THRESHOLD}")
+        command += ["-af", f"{trim},areverse,{trim},areverse"]
+
+    command += [
+        "-c:a", settings['codec'],
+        "-b:a", settings['bitrate'],
+        "-application", "voip",
+        output_path,
+    ]
+    return command
+
+def preprocess_audio(input_path: str, output_dir: Optional[str] = None,
+                     settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Extract the audio track and re-encode it compactly before upload
+
+    Falls back to the original file when ffmpeg is missing, fails, or the
+    result would not be smaller.
+
+    Args:
+        input_path: Source audio or video file
+        output_dir: Directory for the compressed file (system temp dir by default)
+        settings: Preprocessing settings (defaults to PREPROCESS_SETTINGS)
+
+    Returns:
+        Dictionary with 'path' (file to upload), 'compressed' (whether 'path'
+        is a new temporary file the caller should delete), 'original_bytes',
+        'output_bytes', 'bytes_saved' and 'seconds'
+    """
+    settings = {**PREPROCESS_SETTINGS, **(settings or {})}
+    start = time.perf_counter()
+    original_bytes = os.path.getsize(input_path)
+
+    result = {
+        'path': input_path,
+        'compressed': False,
+        'original_bytes': original_bytes,
+        'output_bytes': original_bytes,
+        'bytes_saved': 0,
+        'seconds': 0.0,
+    }
+
+    if not ffmpeg_available():
+        print("ffmpeg not found; uploading original audio")
+        return result
+
+    fd, output_path = tempfile.mkstemp(suffix=".ogg", dir=output_dir)
+    os.close(fd)
+
+    try:
+        subprocess.run(build_ffmpeg_command(input_path, output_path, settings),
+                       check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Audio preprocessing failed: {e.stderr.strip()}. Uploading original audio")
+        os.remove(output_path)
+        result['seconds'] = time.perf_counter() - start
+        return result
+    except BaseException:
+        # Never leave the temporary output behind, e.g. when interrupted
+        os.remove(output_path)
+        raise
+
+    output_bytes = os.path.getsize(output_path)
+    result['seconds'] = time.perf_counter() - start
+
+    if output_bytes == 0 or output_bytes >= original_bytes:
+        os.remove(output_path)
+        return result
+
+    result.update({
+        'path': output_path,
+        'compressed': True,
+        'output_bytes': output_bytes,
+        'bytes_saved': original_bytes - output_bytes,
+    })
+    return result
@@ -0,0 +1,300 @@
+"""
+Headless batch processing of lecture recordings
+
+Usage:
+    python batch.py lectures/ --output notes_out
+    python batch.py manifest.jsonl --output notes_out --transcribe-workers 2 --llm-workers 4
+
+INPUT is a directory (searched recursively for audio/video files) or a JSONL
+manifest with one {"path": ..., "id": ..., "name": ...} object per line
+("id" and "name" are optional). Progress is checkpointed to
+OUTPUT/manifest.jsonl after every stage, so an interrupted run can be
+restarted with the same arguments and only unfinished work is redone.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Dict, List
+from api_models import transcribe_audio, generate_notes, extract_keywords, rate_limit_stats, KEYWORD_ENGINE, KEYWORD_ENGINES
+from rate_limiter import priority, BATCH
+from formatter import format_notes
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.mp4', '.flac', '.ogg', '.webm'}
+
+def item_id_for(path: Path, root: Path) -> str:
+    """
+    Stable, filesystem-safe identifier for an input file
+
+    Args:
+        path: Input file
+        root: Input directory the file was found in
+
+    Returns:
+        Identifier derived from the relative path
+    """
+    relative = path.relative_to(root).with_suffix('')
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(relative)).strip('_')
+
+def discover_items(source: str) -> List[Dict[str, Any]]:
+    """
+    Build the list of work items from a directory or a JSONL manifest
+
+    Args:
+        source: Directory path or .jsonl manifest path
+
+    Returns:
+        List of items with 'id', 'path' and 'name'
+    """
+    source_path = Path(source)
+    items = []
+
+    if source_path.is_dir():
+        for path in sorted(source_path.rglob('*')):
+            if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS:
+                items.append({'id': item_id_for(path, source_path), 'path': str(path), 'name': path.name})
+    else:
+        with open(source_path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                path = Path(entry['path'])
+                items.append({
+                    'id': entry.get('id') or re.sub(r'[^A-Za-z0-9._-]+', '_', path.stem),
+                    'path': str(path),
+                    'name': entry.get('name') or path.name,
+                })
+
+    ids = [item['id'] for item in items]
+    duplicates = {i for i in ids if ids.count(i) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate item ids: {', '.join(sorted(duplicates))}")
+
+    return items
+
+class Checkpoint:
+    """
+    Resumable progress manifest, rewritten atomically after every update
+
+    Each entry records the item's status ('pending', 'transcribed', 'done'
+    or 'failed'), the last error and per-stage timings.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+        if path.exists():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry['id']] = entry
+
+    def register(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            entry = self.entries.setdefault(item['id'], {**item, 'status': 'pending', 'timings': {}})
+            entry['path'] = item['path']
+        return entry
+
+    def update(self, item_id: str, **changes):
+        with self._lock:
+            entry = self.entries[item_id]
+            timings = changes.pop('timings', None)
+            entry.update(changes)
+            if timings:
+                entry.setdefault('timings', {}).update(timings)
+            self._write()
+
+    def _write(self):
+        tmp_path = self.path.with_suffix('.jsonl.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
+
+class BatchRunner:
+    """
+    Two-stage pipeline: transcription on one pool, keywords and notes on another
+
+    A transcript is handed to the LLM pool as soon as it is ready, so both
+    stages stay busy across the whole batch.
+    """
+
+    def __init__(self, output_dir: str, transcribe_workers: int = 2, llm_workers: int = 4,
+                 keyword_engine: str = KEYWORD_ENGINE):
+        self.output_dir = Path(output_dir)
+        self.keyword_engine = keyword_engine
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoint = Checkpoint(self.output_dir / 'manifest.jsonl')
+        self.transcribe_pool = ThreadPoolExecutor(max_workers=transcribe_workers, thread_name_prefix="batch-transcribe")
+        self.llm_pool = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="batch-llm")
+        self._futures: List[Future] = []
+        self._futures_lock = threading.Lock()
+        self.stats = {'done': 0, 'failed': 0, 'skipped': 0, 'bytes': 0}
+        self._stats_lock = threading.Lock()
+
+    def item_dir(self, item_id: str) -> Path:
+        return self.output_dir / item_id
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def _submit(self, pool: ThreadPoolExecutor, fn, *args):
+        with self._futures_lock:
+            self._futures.append(pool.submit(fn, *args))
+
+    def transcribe_item(self, item: Dict[str, Any]):
+        start = time.perf_counter()
+        try:
+            transcript = transcribe_audio(item['path'])
+            if not transcript:
+                raise Exception("Transcription returned no text")
+
+            item_dir = self.item_dir(item['id'])
+            item_dir.mkdir(parents=True, exist_ok=True)
+            (item_dir / 'transcript.txt').write_text(transcript, encoding='utf-8')
+
+            self._count('bytes', os.path.getsize(item['path']))
+            self.checkpoint.update(item['id'], status='transcribed', error=None,
+                                   timings={'transcribe': time.perf_counter() - start})
+            self._submit(self.llm_pool, self.analyze_item, item, transcript)
+        except Exception as e:
+            print(f"[{item['id']}] transcription failed: {str(e)}")
+            self.checkpoint.update(item['id'], status='failed', error=str(e))
+            self._count('failed')
+
+    def analyze_item(self, item: Dict[str, Any], transcript: str):
+        # Queue behind interactive requests sharing the same Groq budget
+        with priority(BATCH):
+            self._analyze_item(item, transcript)
+
+    def _analyze_item(self, item: Dict[str, Any], transcript: str):
+        try:
+            start = time.perf_counter()
+            keywords = extract_keywords(transcript, engine=self.keyword_engine)
+            keywords_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            notes = generate_notes(transcript)
+            if not notes:
+                raise Exception("Note generation returned no text")
+            notes_time = time.perf_counter() - start
+
+            item_dir = self.item_dir(item['id'])
+            (item_dir / 'keywords.json').write_text(json.dumps(keywords, indent=2), encoding='utf-8')
+            (item_dir / 'notes.md').write_text(format_notes(notes), encoding='utf-8')
+
+            self.checkpoint.update(item['id'], status='done', error=None,
+                                   timings={'keywords': keywords_time, 'notes': notes_time})
+            self._count('done')
+            print(f"[{item['id']}] done")
+        except Exception as e:
+            print(f"[{item['id']}] analysis failed: {str(e)}")
+            self.checkpoint.update(item['id'], status='failed', error=str(e))
+            self._count('failed')
+
+    def run(self, items: List[Dict[str, Any]], retry_failed: bool = False) -> Dict[str, Any]:
+        """
+        Process all items, skipping those already finished
+
+        Args:
+            items: Work items from discover_items
+            retry_failed: Also reprocess items that failed in an earlier run
+
+        Returns:
+            Throughput summary
+        """
+        start = time.perf_counter()
+
+        for item in items:
+            entry = self.checkpoint.register(item)
+            status = entry['status']
+            transcript_path = self.item_dir(item['id']) / 'transcript.txt'
+
+            if status == 'done' or (status == 'failed' and not retry_failed):
+                self._count('skipped')
+            elif status == 'transcribed' and transcript_path.exists():
+                # Resume after the transcription stage
+                self._submit(self.llm_pool, self.analyze_item, item, transcript_path.read_text(encoding='utf-8'))
+            else:
+                self._submit(self.transcribe_pool, self.transcribe_item, item)
+
+        # Wait until no stage has work left (transcriptions enqueue analysis)
+        while True:
+            with self._futures_lock:
+                pending = [f for f in self._futures if not f.done()]
+            if not pending:
+                break
+            for future in pending:
+                future.result()
+
+        self.transcribe_pool.shutdown()
+        self.llm_pool.shutdown()
+
+        elapsed = time.perf_counter() - start
+        timings = [entry.get('timings', {}) for entry in self.checkpoint.entries.values()]
+
+        def mean(stage):
+            values = [t[stage] for t in timings if stage in t]
+            return sum(values) / len(values) if values else 0.0
+
+        rate_limits = rate_limit_stats()
+
+        return {
+            **self.stats,
+            'items': len(items),
+            'seconds': elapsed,
+            'items_per_hour': self.stats['done'] / elapsed * 3600 if elapsed else 0.0,
+            'mb_per_minute': self.stats['bytes'] / 1e6 / elapsed * 60 if elapsed else 0.0,
+            'mean_transcribe_seconds': mean('transcribe'),
+            'mean_keywords_seconds': mean('keywords'),
+            'mean_notes_seconds': mean('notes'),
+            'rate_limit_wait_seconds': rate_limits['total_wait'],
+            'rate_limit_max_queue_depth': rate_limits['max_queue_depth'],
+            'rate_limited_responses': rate_limits['rate_limited'],
+        }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Process a directory or manifest of lectures without the web UI")
+    parser.add_argument('input', help="Directory of recordings or JSONL manifest")
+    parser.add_argument('--output', '-o', default='batch_output', help="Output directory (default: batch_output)")
+    parser.add_argument('--transcribe-workers', type=int, default=2, help="Concurrent transcriptions (default: 2)")
+    parser.add_argument('--llm-workers', type=int, default=4, help="Concurrent keyword/notes jobs (default: 4)")
+    parser.add_argument('--keyword-engine', choices=KEYWORD_ENGINES, default=KEYWORD_ENGINE,
+                        help=f"Keyword extraction engine (default: {KEYWORD_ENGINE})")
+    parser.add_argument('--retry-failed', action='store_true', help="Reprocess items that failed previously")
+    args = parser.parse_args(argv)
+
+    items = discover_items(args.input)
+    if not items:
+        print("No recordings found")
+        return 1
+
+    runner = BatchRunner(args.output, args.transcribe_workers, args.llm_workers, args.keyword_engine)
+    summary = runner.run(items, retry_failed=args.retry_failed)
+
+    print(f"\nProcessed {summary['items']} items in {summary['seconds']:.1f}s: "
+          f"{summary['done']} done, {summary['failed']} failed, {summary['skipped']} skipped")
+    print(f"Throughput: {summary['items_per_hour']:.1f} lectures/hour, {summary['mb_per_minute']:.1f} MB/min")
+    print(f"Mean stage time: transcribe {summary['mean_transcribe_seconds']:.1f}s, "
+          f"keywords {summary['mean_keywords_seconds']:.1f}s, notes {summary['mean_notes_seconds']:.1f}s")
+    print(f"Rate limiting: {summary['rate_limit_wait_seconds']:.1f}s waited, "
+          f"max queue depth {summary['rate_limit_max_queue_depth']}, "
+          f"{summary['rate_limited_responses']} rate-limited responses")
+
+    with open(Path(args.output) / 'summary.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+
+    return 0 if summary['failed'] == 0 else 2
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Per-transcript Counter keywords versus one sparse corpus matrix
+
+Run from the repository root:
+    python -m benchmarks.bench_corpus_analysis [--lectures 40] [--words 8000] [--hash]
+"""
+import random
+import argparse
+import time
+import keyword_utils
+from benchmarks.synthetic import synthetic_transcript, TOPIC_TERMS
+from corpus_analysis import build_corpus, HASH_FEATURES
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lectures', type=int, default=40)
+    parser.add_argument('--words', type=int, default=8000)
+    parser.add_argument('--hash', action='store_true', help="Use feature hashing instead of a vocabulary")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts = [synthetic_transcript(args.words, seed=i, topic_terms=rng.sample(TOPIC_TERMS, 4))
+             for i in range(args.lectures)]
+
+    start = time.perf_counter()
+    for text in texts:
+        keyword_utils.extract_keywords_statistical(keyword_utils.TextAnalysis(text), top_n=10)
+    per_lecture = time.perf_counter() - start
+
+    start = time.perf_counter()
+    corpus = build_corpus(texts, hash_features=HASH_FEATURES if args.hash else None)
+    built = time.perf_counter() - start
+    corpus.top_terms(10)
+    top_terms = time.perf_counter() - start - built
+    similarity = corpus.similarity()
+    total = time.perf_counter() - start
+
+    print(f"{args.lectures} lectures x ~{args.words} words, matrix {corpus.shape[0]} x {corpus.shape[1]}, "
+          f"{corpus.counts.nnz} non-zeros")
+    print(f"per-lecture Counter (frequency only): {per_lecture * 1000:9.1f} ms")
+    print(f"corpus build:                         {built * 1000:9.1f} ms")
+    print(f"  + TF-IDF top terms:                 {top_terms * 1000:9.1f} ms")
+    print(f"  + similarity ({similarity.shape[0]} x {similarity.shape[1]}):  {(total - built - top_terms) * 1000:9.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare the local keyword engine with LLM keyword extraction
+
+Run from the repository root:
+    python -m benchmarks.bench_keyword_engine [--lectures 30] [--words 8000] [--llm]
+
+Synthetic lectures each draw on a few subject terms; quality is the share
+of a lecture's subject terms recovered in the top 10 keywords. With --llm
+(needs GROQ_API_KEY) the Groq extractor is measured on the same lectures
+and the overlap between both keyword lists is reported as well.
+"""
+import os
+import random
+import argparse
+import tempfile
+import statistics
+import time
+from benchmarks.synthetic import synthetic_transcript, TOPIC_TERMS
+from keyword_engine import DocumentFrequencies, extract_keywords_local
+
+TOPICS_PER_LECTURE = 4
+
+def make_lectures(count: int, n_words: int):
+    rng = random.Random(0)
+    lectures = []
+    for i in range(count):
+        topics = rng.sample(TOPIC_TERMS, TOPICS_PER_LECTURE)
+        lectures.append((topics, synthetic_transcript(n_words, seed=i, topic_terms=topics)))
+    return lectures
+
+def matches(keyword: str, term: str) -> bool:
+    # A keyword counts if it shares a word with the term ("gradient" for "gradient descent")
+    return bool(set(keyword.lower().split()) & set(term.lower().split()))
+
+def recall(keywords, topics) -> float:
+    return sum(any(matches(k, t) for k in keywords) for t in topics) / len(topics)
+
+def overlap(keywords, reference) -> float:
+    if not reference:
+        return 0.0
+    return sum(any(matches(k, r) for k in keywords) for r in reference) / len(reference)
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def report(name: str, latencies, recalls):
+    print(f"{name:6} p50 {percentile(latencies, 0.5) * 1000:9.1f} ms  "
+          f"p95 {percentile(latencies, 0.95) * 1000:9.1f} ms  "
+          f"topic recall@10 {statistics.mean(recalls):.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lectures', type=int, default=30)
+    parser.add_argument('--words', type=int, default=8000)
+    parser.add_argument('--llm', action='store_true', help="Also run the Groq extractor")
+    args = parser.parse_args()
+
+    lectures = make_lectures(args.lectures, args.words)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The corpus table starts empty and grows as lectures are processed, as in production
+        df = DocumentFrequencies(os.path.join(tmp, 'df.sqlite3'), legacy_path=None)
+        local_keywords, local_latency = [], []
+        for _, text in lectures:
+            start = time.perf_counter()
+            local_keywords.append(extract_keywords_local(text, 10, df=df))
+            local_latency.append(time.perf_counter() - start)
+
+    print(f"{args.lectures} lectures x ~{args.words} words")
+    report('local', local_latency, [recall(k, t) for k, (t, _) in zip(local_keywords, lectures)])
+
+    if args.llm:
+        from api_models import extract_keywords
+        llm_keywords, llm_latency = [], []
+        for _, text in lectures:
+            start = time.perf_counter()
+            llm_keywords.append(extract_keywords(text, 10, engine="llm"))
+            llm_latency.append(time.perf_counter() - start)
+
+        report('llm', llm_latency, [recall(k, t) for k, (t, _) in zip(llm_keywords, lectures)])
+        agreement = statistics.mean(overlap(l, r) for l, r in zip(local_keywords, llm_keywords))
+        print(f"LLM keywords also found locally: {agreement:.2f}")
+        print(f"speedup: {statistics.median(llm_latency) / statistics.median(local_latency):.0f}x")
+
+    print(f"example: {local_keywords[-1]}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Measure lecture store insertion and search latency at scale
+
+Run from the repository root:
+    python -m benchmarks.bench_lecture_store [--lectures 10000] [--words 1500]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import lecture_store
+from benchmarks.synthetic import synthetic_transcript, TOPIC_TERMS, ACRONYMS, PROPER_NOUNS
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lectures', type=int, default=10000)
+    parser.add_argument('--words', type=int, default=1500, help="Transcript words per lecture")
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="lectureai-bench-"), "lectures.sqlite3")
+    rng = random.Random(0)
+
+    # A handful of distinct transcripts, varied per lecture by seed, keeps generation cheap
+    transcripts = [synthetic_transcript(args.words, seed) for seed in range(50)]
+
+    start = time.perf_counter()
+    for i in range(args.lectures):
+        transcript = transcripts[i % len(transcripts)]
+        keywords = rng.sample(TOPIC_TERMS, 5)
+        notes = "# Overview\n" + ' '.join(f"**{k}**: explained." for k in keywords)
+        lecture_store.save_lecture(f"Lecture {i}.mp3", transcript, notes, keywords,
+                                   file_hash=f"hash-{i}", db_path=db_path)
+    insert_seconds = time.perf_counter() - start
+
+    vocabulary = TOPIC_TERMS + ACRONYMS + PROPER_NOUNS
+    latencies = []
+    for _ in range(args.queries):
+        query = rng.choice(vocabulary)
+        start = time.perf_counter()
+        lecture_store.search_lectures(query, limit=20, db_path=db_path)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    size_mb = os.path.getsize(db_path) / 1e6
+    print(f"{args.lectures} lectures x ~{args.words} words, database {size_mb:.0f} MB")
+    print(f"insert: {insert_seconds:.1f}s total, {insert_seconds / args.lectures * 1000:.2f} ms/lecture")
+    print(f"search (top 20 with snippets): p50 {percentile(latencies, 50):.1f} ms, "
+          f"p95 {percentile(latencies, 95):.1f} ms, max {max(latencies):.1f} ms")
+
+if __name__ == '__main__':
+    main()
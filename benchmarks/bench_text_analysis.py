@@ -0,0 +1,90 @@
+"""
+Compare keyword_utils before and after the shared TextAnalysis
+
+The baseline runs the original per-function implementation, read from git
+history (keyword_utils.py at --baseline-rev) into a throwaway module, on
+the same input.
+
+Run from the repository root:
+    python -m benchmarks.bench_text_analysis [--words 100000] [--baseline-rev REV]
+"""
+import os
+import time
+import types
+import argparse
+import subprocess
+import keyword_utils
+from benchmarks.synthetic import synthetic_transcript
+
+# Last revision before keyword_utils functions shared one TextAnalysis
+BASELINE_REV = "507fbb2^"
+
+KEYWORDS = ['machine learning', 'neural network', 'gradient', 'cpu', 'energy']
+
+def run_all(module, text):
+    return [
+        module.extract_keywords_statistical(text),
+        module.extract_noun_phrases(text),
+        module.identify_technical_terms(text),
+        module.extract_numbers_and_stats(text),
+        *[module.find_related_terms(keyword, text) for keyword in KEYWORDS],
+        module.create_keyword_cloud_data(KEYWORDS, text),
+    ]
+
+def load_baseline(rev: str) -> types.ModuleType:
+    """Load keyword_utils.py as of a git revision without touching the working tree"""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    source = subprocess.run(["git", "show", f"{rev}:keyword_utils.py"], cwd=repo_root,
+                            capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType("keyword_utils_baseline")
+    module.__file__ = f"{rev}:keyword_utils.py"
+    exec(compile(source, module.__file__, "exec"), module.__dict__)
+    return module
+
+def time_baseline(baseline: types.ModuleType, text: str) -> float:
+    start = time.perf_counter()
+    run_all(baseline, text)
+    return time.perf_counter() - start
+
+def time_independent(text: str) -> float:
+    # Every call starts from a fresh analysis
+    start = time.perf_counter()
+    for fn in (
+        lambda t: keyword_utils.extract_keywords_statistical(t),
+        lambda t: keyword_utils.extract_noun_phrases(t),
+        lambda t: keyword_utils.identify_technical_terms(t),
+        lambda t: keyword_utils.extract_numbers_and_stats(t),
+        *[lambda t, k=k: keyword_utils.find_related_terms(k, t) for k in KEYWORDS],
+        lambda t: keyword_utils.create_keyword_cloud_data(KEYWORDS, t),
+    ):
+        fn(keyword_utils.TextAnalysis(text))
+    return time.perf_counter() - start
+
+def time_shared(text: str) -> float:
+    start = time.perf_counter()
+    run_all(keyword_utils, keyword_utils.TextAnalysis(text))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--words', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline-rev', default=BASELINE_REV, help="Git revision of the baseline keyword_utils.py")
+    args = parser.parse_args()
+
+    original = load_baseline(args.baseline_rev)
+    text = synthetic_transcript(args.words)
+    if run_all(original, text) != run_all(keyword_utils, keyword_utils.TextAnalysis(text)):
+        print("warning: outputs differ from the baseline implementation")
+
+    baseline = min(time_baseline(original, text) for _ in range(args.repeat))
+    independent = min(time_independent(text) for _ in range(args.repeat))
+    shared = min(time_shared(text) for _ in range(args.repeat))
+
+    print(f"{len(text.split())} words")
+    print(f"baseline functions: {baseline * 1000:8.1f} ms")
+    print(f"independent passes: {independent * 1000:8.1f} ms  ({baseline / independent:.2f}x)")
+    print(f"shared analysis:    {shared * 1000:8.1f} ms  ({baseline / shared:.2f}x)")
+
+if __name__ == '__main__':
+    main()
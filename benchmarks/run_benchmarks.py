@@ -0,0 +1,191 @@
+"""
+Time every public keyword_utils and formatter function on synthetic input
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --sizes 1k,10k --compare bench.json
+
+Each function runs on a synthetic transcript (keyword_utils, clean_transcript)
+or synthetic notes (formatter) of every requested size. Memoization caches
+(analyze, parse_notes, compiled keyword patterns) are cleared before every
+call, so each timing is a cold call. Peak memory is measured with
+tracemalloc in a separate call. With --compare, functions slower (or using
+more memory) than the baseline by more than --threshold are reported as
+regressions and the exit status is 1; a slowdown must also exceed the
+repeat-to-repeat noise of both runs to count.
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+from typing import Any, Callable, Dict, List
+import keyword_utils
+import formatter
+import highlighter
+from benchmarks.synthetic import synthetic_transcript, synthetic_notes, TOPIC_TERMS
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+KEYWORDS = ['machine learning', 'neural network', 'gradient', 'CPU', 'energy', 'Newton']
+
+# A slowdown only counts once it exceeds this many times the larger run's
+# noise (median minus best of the repeats), whatever the ratio
+NOISE_MULTIPLIER = 3.0
+
+def clear_caches():
+    keyword_utils.analyze.cache_clear()
+    formatter.parse_notes.cache_clear()
+    highlighter.compile_keywords.cache_clear()
+
+def benchmark_cases(transcript: str, notes: str) -> Dict[str, Callable[[], Any]]:
+    """Zero-argument calls of every public function, by qualified name"""
+    flashcards = formatter.create_flashcards(notes)
+    bullets = [line[2:] for line in notes.splitlines() if line.startswith('- ')]
+    return {
+        'keyword_utils.extract_keywords_statistical': lambda: keyword_utils.extract_keywords_statistical(transcript),
+        'keyword_utils.extract_noun_phrases': lambda: keyword_utils.extract_noun_phrases(transcript),
+        'keyword_utils.is_valid_phrase': lambda: [keyword_utils.is_valid_phrase(t) for t in TOPIC_TERMS],
+        'keyword_utils.identify_technical_terms': lambda: keyword_utils.identify_technical_terms(transcript),
+        'keyword_utils.extract_numbers_and_stats': lambda: keyword_utils.extract_numbers_and_stats(transcript),
+        'keyword_utils.create_keyword_cloud_data': lambda: keyword_utils.create_keyword_cloud_data(KEYWORDS, transcript),
+        'keyword_utils.find_related_terms': lambda: keyword_utils.find_related_terms('gradient', transcript),
+        'keyword_utils.categorize_keywords': lambda: keyword_utils.categorize_keywords(TOPIC_TERMS),
+        'keyword_utils.highlight_keywords_in_text': lambda: keyword_utils.highlight_keywords_in_text(transcript, KEYWORDS),
+        'formatter.format_notes': lambda: formatter.format_notes(notes),
+        'formatter.extract_sections': lambda: formatter.extract_sections(notes),
+        'formatter.create_table_of_contents': lambda: formatter.create_table_of_contents(notes),
+        'formatter.highlight_keywords': lambda: formatter.highlight_keywords(notes, KEYWORDS),
+        'formatter.create_summary_box': lambda: formatter.create_summary_box(transcript[:2000]),
+        'formatter.format_bullet_list': lambda: formatter.format_bullet_list(bullets),
+        'formatter.add_page_breaks': lambda: formatter.add_page_breaks(notes),
+        'formatter.create_flashcards': lambda: formatter.create_flashcards(notes),
+        'formatter.export_to_anki_format': lambda: formatter.export_to_anki_format(flashcards),
+        'formatter.clean_transcript': lambda: formatter.clean_transcript(transcript),
+    }
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Best, median and mean wall time over repeat cold calls, plus traced peak memory"""
+    times = []
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    clear_caches()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': min(times),
+        'median_seconds': statistics.median(times),
+        'mean_seconds': sum(times) / len(times),
+        'peak_bytes': peak,
+    }
+
+def noise_seconds(result: Dict[str, float]) -> float:
+    """How far a typical repeat strays above the best one (0 for single calls or old baselines)"""
+    return max(0.0, result.get('median_seconds', result['seconds']) - result['seconds'])
+
+def run(sizes: List[str], repeat: int, only: str = '') -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in sizes:
+        n_words = SIZES[size]
+        transcript = synthetic_transcript(n_words)
+        notes = synthetic_notes(n_words)
+        # Large inputs take long per call; fewer repeats keep the run practical
+        size_repeat = max(1, repeat if n_words <= 100_000 else repeat // 3)
+
+        results[size] = {}
+        for name, fn in benchmark_cases(transcript, notes).items():
+            if only and only not in name:
+                continue
+            results[size][name] = measure(fn, size_repeat)
+            r = results[size][name]
+            print(f"{size:>5} {name:48} {r['seconds'] * 1000:10.2f} ms {r['peak_bytes'] / 1e6:9.2f} MB")
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': time.time(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Find functions that got slower or hungrier than in the baseline
+
+    Args:
+        current: Output of run
+        baseline: Earlier output of run
+        threshold: Allowed relative increase of the best time or peak
+            memory, e.g. 0.2 for 20%; slowdowns must also exceed
+            NOISE_MULTIPLIER times the noisier run's spread
+
+    Returns:
+        Human-readable regression descriptions
+    """
+    regressions = []
+    for size, functions in current['results'].items():
+        for name, now in functions.items():
+            before = baseline['results'].get(size, {}).get(name)
+            if before is None:
+                continue
+
+            noise = NOISE_MULTIPLIER * max(noise_seconds(now), noise_seconds(before))
+            if (now['seconds'] > before['seconds'] * (1 + threshold)
+                    and now['seconds'] - before['seconds'] > noise):
+                regressions.append(f"{size} {name}: {before['seconds'] * 1000:.2f} ms -> {now['seconds'] * 1000:.2f} ms "
+                                   f"(+{(now['seconds'] / before['seconds'] - 1) * 100:.0f}%)")
+            if before['peak_bytes'] and now['peak_bytes'] > before['peak_bytes'] * (1 + threshold):
+                regressions.append(f"{size} {name}: peak {before['peak_bytes'] / 1e6:.2f} MB -> "
+                                   f"{now['peak_bytes'] / 1e6:.2f} MB "
+                                   f"(+{(now['peak_bytes'] / before['peak_bytes'] - 1) * 100:.0f}%)")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(SIZES), help=f"Comma-separated sizes out of {', '.join(SIZES)}")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed calls per function (best is reported)")
+    parser.add_argument('--only', default='', help="Only run functions whose name contains this text")
+    parser.add_argument('--output', '-o', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Baseline JSON file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown before flagging (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip().lower() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    current = run(sizes, args.repeat, args.only)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import random
+from typing import List, Optional
+
+# Vocabulary loosely modelled on an introductory science lecture
+TOPIC_TERMS = [
+    'machine learning', 'neural network', 'gradient descent', 'loss function',
+    'training data', 'decision tree', 'linear regression', 'feature extraction',
+    'activation function', 'hidden layer', 'learning rate', 'overfitting',
+    'cross validation', 'probability distribution', 'random variable',
+    'photosynthesis', 'cell membrane', 'chemical reaction', 'kinetic energy',
+]
+ACRONYMS = ['CPU', 'GPU', 'DNA', 'RNA', 'API', 'SQL', 'NASA', 'HTTP']
+PROPER_NOUNS = ['Newton', 'Darwin', 'Turing', 'Curie', 'Einstein', 'Python', 'Europe']
+FILLERS = ['um', 'uh', 'like', 'you know', 'so', 'basically', 'actually']
+COMMON_WORDS = (
+    'the a of to and in is that it for on with as this was be are by at from '
+    'we can see when which how important because example result model value '
+    'process system method different approach between each other first second '
+    'case point question answer idea study problem change show large small'
+).split()
+NUMBERS = ['42%', '3.5 million', '1998', '2021', '15 kg', '120 cm', '7 billion', '37°C']
+
+def synthetic_sentence(rng: random.Random, topic_terms: List[str] = TOPIC_TERMS) -> str:
+    words: List[str] = []
+    for _ in range(rng.randint(8, 22)):
+        roll = rng.random()
+        if roll < 0.12:
+            words.append(rng.choice(topic_terms))
+        elif roll < 0.15:
+            words.append(rng.choice(ACRONYMS))
+        elif roll < 0.18:
+            words.append(rng.choice(PROPER_NOUNS))
+        elif roll < 0.22:
+            words.append(rng.choice(FILLERS))
+        elif roll < 0.24:
+            words.append(rng.choice(NUMBERS))
+        else:
+            words.append(rng.choice(COMMON_WORDS))
+    sentence = ' '.join(words)
+    return sentence[0].upper() + sentence[1:] + rng.choice(['.', '.', '.', '?', '!'])
+
+def synthetic_transcript(n_words: int, seed: int = 0, topic_terms: Optional[List[str]] = None) -> str:
+    """
+    Generate a deterministic lecture-like transcript of roughly n_words words
+
+    Args:
+        n_words: Approximate number of words
+        seed: Random seed; the same seed always yields the same text
+        topic_terms: Subject vocabulary to draw from (default: TOPIC_TERMS)
+
+    Returns:
+        Transcript text
+    """
+    rng = random.Random(seed)
+    sentences: List[str] = []
+    count = 0
+    while count < n_words:
+        sentence = synthetic_sentence(rng, topic_terms or TOPIC_TERMS)
+        sentences.append(sentence)
+        count += len(sentence.split())
+
+        # Occasional repeated sentence, as speakers often do
+        if rng.random() < 0.03:
+            sentences.append(sentence)
+            count += len(sentence.split())
+    return ' '.join(sentences)
+
+def synthetic_notes(n_words: int, seed: int = 0) -> str:
+    """
+    Generate deterministic markdown notes of roughly n_words words
+
+    The notes mix nested headers, "**Term**: definition" lines, bullet
+    lists and prose, like the output of note generation.
+
+    Args:
+        n_words: Approximate number of words
+        seed: Random seed; the same seed always yields the same notes
+
+    Returns:
+        Markdown text
+    """
+    rng = random.Random(seed)
+    lines: List[str] = ["# OVERVIEW", synthetic_sentence(rng)]
+    count = 0
+    section = 0
+    while count < n_words:
+        section += 1
+        level = rng.choice([2, 2, 3, 3, 4])
+        lines.append(f"\n{'#' * level} {rng.choice(TOPIC_TERMS).title()} {section}")
+        for _ in range(rng.randint(2, 6)):
+            roll = rng.random()
+            if roll < 0.3:
+                line = f"**{rng.choice(TOPIC_TERMS).title()}**: {synthetic_sentence(rng)}"
+            elif roll < 0.7:
+                line = f"- {synthetic_sentence(rng)}"
+            else:
+                line = synthetic_sentence(rng)
+            lines.append(line)
+            count += len(line.split())
+    return '\n'.join(lines)
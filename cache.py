@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# Root directory for all on-disk caches (override with LECTUREAI_CACHE_DIR)
+CACHE_DIR = os.getenv("LECTUREAI_CACHE_DIR", ".cache")
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute a SHA-256 digest of a file without loading it into memory
+
+    Args:
+        path: Path to the file
+        chunk_size: Number of bytes read per iteration
+
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def make_key(*parts: Any) -> str:
+    """
+    Build a stable cache key from JSON-serializable parts
+
+    Args:
+        parts: Values that identify the cached item
+
+    Returns:
+        Hex digest usable as a cache key
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class DiskCache:
+    """
+    SQLite-backed key/value cache with size-bounded LRU eviction and TTL
+
+    Safe to share between threads and processes; every operation opens its
+    own short-lived connection. Values must be JSON-serializable.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a value and mark it as recently used
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self._count('misses')
+                return None
+
+            value, created = row
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._count('expired')
+                self._count('misses')
+                return None
+
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+
+        self._count('hits')
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        """
+        Store a value, evicting least recently used entries to stay within max_bytes
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+        """
+        payload = json.dumps(value)
+        size = len(payload.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def delete(self, key: str):
+        """Remove a single entry if present"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        # Drop expired entries first, then the least recently used until under budget
+        if self.ttl_seconds is not None:
+            expired = conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl_seconds,)).rowcount
+            if expired:
+                self._count('expired', expired)
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+
+        if evicted:
+            self._count('evictions', evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report hit/miss/eviction counters and current occupancy
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        with self._connect() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+        with self._lock:
+            counters = dict(self._counters)
+
+        lookups = counters['hits'] + counters['misses']
+        counters.update({
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hit_rate': counters['hits'] / lookups if lookups else 0.0,
+        })
+        return counters
+
+_transcript_cache = None
+_transcript_cache_lock = threading.Lock()
+
+def get_transcript_cache() -> DiskCache:
+    """
+    Return the process-wide transcript cache
+
+    Size and TTL are configured with LECTUREAI_TRANSCRIPT_CACHE_MB and
+    LECTUREAI_TRANSCRIPT_CACHE_TTL (seconds, 0 disables expiry).
+    """
+    global _transcript_cache
+    with _transcript_cache_lock:
+        if _transcript_cache is None:
+            max_mb = float(os.getenv("LECTUREAI_TRANSCRIPT_CACHE_MB", "256"))
+            ttl = float(os.getenv("LECTUREAI_TRANSCRIPT_CACHE_TTL", str(30 * 24 * 3600)))
+            _transcript_cache = DiskCache(
+                os.path.join(CACHE_DIR, "transcripts.sqlite3"),
+                max_bytes=int(max_mb * 1024 * 1024),
+                ttl_seconds=ttl or None,
+            )
+        return _transcript_cache
+
+def transcript_cache_key(audio_path: str, settings: Dict[str, Any], digest: Optional[str] = None) -> str:
+    """
+    Content-addressed key for a transcript
+
+    Args:
+        audio_path: Path to the audio file
+        settings: Transcription settings that affect the output
+        digest: file_digest of the audio if already known (e.g. from the
+            upload spool), saving a second pass over the file
+
+    Returns:
+        Cache key combining the audio digest and the settings
+    """
+    return make_key("transcript", digest or file_digest(audio_path), settings)
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> DiskCache:
+    """
+    Return the process-wide LLM response cache
+
+    Size and TTL are configured with LECTUREAI_LLM_CACHE_MB and
+    LECTUREAI_LLM_CACHE_TTL (seconds, 0 disables expiry).
+    """
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            max_mb = float(os.getenv("LECTUREAI_LLM_CACHE_MB", "64"))
+            ttl = float(os.getenv("LECTUREAI_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+            _response_cache = DiskCache(
+                os.path.join(CACHE_DIR, "llm_responses.sqlite3"),
+                max_bytes=int(max_mb * 1024 * 1024),
+                ttl_seconds=ttl or None,
+            )
+        return _response_cache
+
+def response_cache_key(model: str, messages: Any, temperature: Optional[float] = None,
+                       max_tokens: Optional[int] = None, top_p: Optional[float] = None) -> str:
+    """
+    Key for an LLM response: everything in the request that affects the output
+
+    Args:
+        model: Model name
+        messages: Chat messages
+        temperature: Sampling temperature
+        max_tokens: Completion token limit
+        top_p: Nucleus sampling parameter
+
+    Returns:
+        Cache key
+    """
+    return make_key("llm_response", model, messages, temperature, max_tokens, top_p)
@@ -0,0 +1,75 @@
+import re
+from typing import List
+
+# Sentence boundary: terminal punctuation followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences on terminal punctuation
+
+    Args:
+        text: Input text
+
+    Returns:
+        List of non-empty sentences
+    """
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s.strip()]
+
+def chunk_text(text: str, max_chars: int = 12000, overlap_chars: int = 500) -> List[str]:
+    """
+    Split text into chunks on sentence boundaries with overlapping context
+
+    Each chunk holds whole sentences up to max_chars; the last sentences of a
+    chunk (up to overlap_chars) are repeated at the start of the next one so
+    ideas spanning a boundary are not lost. A single sentence longer than
+    max_chars is hard-split.
+
+    Args:
+        text: Input text
+        max_chars: Maximum characters per chunk
+        overlap_chars: Characters of trailing context carried into the next chunk
+
+    Returns:
+        List of chunks in order
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    sentences = []
+    for sentence in split_sentences(text):
+        if len(sentence) > max_chars:
+            sentences.extend(sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars))
+        else:
+            sentences.append(sentence)
+
+    chunks = []
+    current: List[str] = []
+    current_len = 0
+
+    for sentence in sentences:
+        if current and current_len + len(sentence) + 1 > max_chars:
+            chunks.append(' '.join(current))
+
+            # Carry trailing sentences forward as overlap
+            overlap: List[str] = []
+            overlap_len = 0
+            for prev in reversed(current):
+                if overlap_len + len(prev) + 1 > overlap_chars:
+                    break
+                overlap.insert(0, prev)
+                overlap_len += len(prev) + 1
+
+            # Never let the overlap alone push the next chunk past the limit
+            if overlap_len + len(sentence) + 1 > max_chars:
+                overlap, overlap_len = [], 0
+
+            current, current_len = overlap, overlap_len
+
+        current.append(sentence)
+        current_len += len(sentence) + 1
+
+    if current:
+        chunks.append(' '.join(current))
+
+    return chunks
@@ -0,0 +1,266 @@
+"""
+Corpus-level keyword statistics over many lectures
+
+Builds one sparse term-document count matrix for a whole course (or the
+whole lecture store) and derives TF-IDF weights, per-lecture top terms and
+lecture-to-lecture cosine similarity from it with NumPy/SciPy operations,
+instead of running a Counter per transcript.
+
+Terms are the content words used by keyword_utils (lowercased, no stop
+words, longer than three characters) and, optionally, adjacent pairs of
+them. The vocabulary is either built from the corpus, given up front, or
+replaced by feature hashing, which keeps the matrix width fixed however
+many distinct terms a very large corpus has.
+"""
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+from keyword_utils import STOP_WORDS
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SENTENCE_PATTERN = re.compile(r'[.!?]+')
+
+# Default number of hash buckets when hashing is requested
+HASH_FEATURES = 2 ** 20
+
+def tokenize(text: str, bigrams: bool = True) -> List[str]:
+    """
+    Content-word terms of a text
+
+    Args:
+        text: Input text
+        bigrams: Also emit pairs of adjacent content words within a sentence
+
+    Returns:
+        Terms in order of occurrence
+    """
+    terms = []
+    for sentence in SENTENCE_PATTERN.split(text.lower()):
+        words = [w for w in TOKEN_PATTERN.findall(sentence) if len(w) > 3 and w not in STOP_WORDS]
+        terms.extend(words)
+        if bigrams:
+            terms.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return terms
+
+def _hash_term(term: str, n_features: int) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(term.encode('utf-8')) % n_features
+
+class CorpusAnalysis:
+    """
+    Term-document matrix of a corpus with vectorized statistics
+
+    Attributes:
+        names: Document names, in row order
+        counts: CSR matrix of term counts, documents x terms
+        terms: Term of every column (with hashing, the first term seen in
+            each bucket, or '' for unused buckets)
+    """
+
+    def __init__(self, names: List[str], counts: sparse.csr_matrix, terms: List[str]):
+        self.names = names
+        self.counts = counts
+        self.terms = terms
+        self._tfidf: Optional[sparse.csr_matrix] = None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.counts.shape
+
+    def document_frequencies(self) -> np.ndarray:
+        """Number of documents containing each term"""
+        return np.bincount(self.counts.indices, minlength=self.counts.shape[1])
+
+    def idf(self) -> np.ndarray:
+        """Smoothed inverse document frequency of each term"""
+        n_documents = self.counts.shape[0]
+        return np.log((1 + n_documents) / (1 + self.document_frequencies())) + 1
+
+    def tfidf(self, sublinear_tf: bool = True) -> sparse.csr_matrix:
+        """
+        L2-normalized TF-IDF matrix, documents x terms
+
+        Args:
+            sublinear_tf: Use 1 + log(count) instead of raw counts
+
+        Returns:
+            CSR matrix whose rows have unit length (empty documents stay zero)
+        """
+        if self._tfidf is not None and sublinear_tf:
+            return self._tfidf
+
+        weights = self.counts.astype(np.float64)
+        if sublinear_tf:
+            weights.data = 1 + np.log(weights.data)
+        weights = weights.multiply(self.idf()).tocsr()
+
+        norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        weights = sparse.diags(1 / norms) @ weights
+
+        weights = weights.tocsr()
+        if sublinear_tf:
+            self._tfidf = weights
+        return weights
+
+    def top_terms(self, n: int = 10) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Highest TF-IDF terms of every document
+
+        Args:
+            n: Terms per document
+
+        Returns:
+            Mapping of document name to (term, weight) pairs, best first
+        """
+        matrix = self.tfidf()
+        result = {}
+        for row, name in enumerate(self.names):
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            data, columns = matrix.data[start:end], matrix.indices[start:end]
+            if len(data) > n:
+                best = np.argpartition(-data, n)[:n]
+            else:
+                best = np.arange(len(data))
+            best = best[np.argsort(-data[best], kind='stable')]
+            result[name] = [(self.terms[columns[i]], float(data[i])) for i in best]
+        return result
+
+    def corpus_top_terms(self, n: int = 20) -> List[Tuple[str, float]]:
+        """
+        Terms with the highest total TF-IDF across the corpus
+
+        Args:
+            n: Number of terms
+
+        Returns:
+            (term, summed weight) pairs, best first
+        """
+        totals = np.asarray(self.tfidf().sum(axis=0)).ravel()
+        n = min(n, len(totals))
+        best = np.argpartition(-totals, n - 1)[:n] if n < len(totals) else np.arange(len(totals))
+        best = best[np.argsort(-totals[best], kind='stable')]
+        return [(self.terms[i], float(totals[i])) for i in best if totals[i] > 0]
+
+    def similarity(self) -> np.ndarray:
+        """
+        Cosine similarity between every pair of documents
+
+        Returns:
+            Dense documents x documents array
+        """
+        matrix = self.tfidf()
+        return (matrix @ matrix.T).toarray()
+
+    def most_similar(self, name: str, n: int = 5) -> List[Tuple[str, float]]:
+        """
+        Documents most similar to one document
+
+        Args:
+            name: Document name
+            n: Number of results
+
+        Returns:
+            (document name, cosine similarity) pairs, best first, excluding the document itself
+        """
+        matrix = self.tfidf()
+        row = self.names.index(name)
+        scores = (matrix @ matrix[row].T).toarray().ravel()
+        scores[row] = -1.0
+        order = np.argsort(-scores, kind='stable')[:n]
+        return [(self.names[i], float(scores[i])) for i in order if scores[i] >= 0]
+
+def build_corpus(texts: Iterable[str], names: Optional[Sequence[str]] = None,
+                 vocabulary: Optional[Sequence[str]] = None, hash_features: Optional[int] = None,
+                 bigrams: bool = True, min_df: int = 1) -> CorpusAnalysis:
+    """
+    Tokenize every document once and build the sparse term-document matrix
+
+    Args:
+        texts: Document texts
+        names: Document names (default: "0", "1", ...)
+        vocabulary: Fixed list of terms; other terms are ignored
+        hash_features: Hash terms into this many columns (e.g. HASH_FEATURES)
+            instead of keeping a vocabulary
+        bigrams: Include adjacent content-word pairs as terms
+        min_df: Drop terms occurring in fewer documents (built vocabularies only)
+
+    Returns:
+        CorpusAnalysis over the documents
+    """
+    if vocabulary is not None and hash_features:
+        raise ValueError("Pass either a vocabulary or hash_features, not both")
+
+    term_ids: Dict[str, int] = {term: i for i, term in enumerate(vocabulary)} if vocabulary is not None else {}
+    fixed = vocabulary is not None
+    bucket_terms: Dict[int, str] = {}
+
+    indptr = [0]
+    indices: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    doc_names: List[str] = []
+
+    for position, text in enumerate(texts):
+        terms = tokenize(text, bigrams)
+        if hash_features:
+            # Buckets are memoized per document only, so memory does not grow
+            # with the corpus vocabulary; a label per used bucket is all that is kept
+            buckets = {term: _hash_term(term, hash_features) for term in dict.fromkeys(terms)}
+            ids = [buckets[term] for term in terms]
+            for term, i in buckets.items():
+                bucket_terms.setdefault(i, term)
+        elif fixed:
+            ids = [term_ids[term] for term in terms if term in term_ids]
+        else:
+            ids = [term_ids.setdefault(term, len(term_ids)) for term in terms]
+
+        columns, counts = np.unique(np.asarray(ids, dtype=np.int64), return_counts=True)
+        indices.append(columns)
+        values.append(counts)
+        indptr.append(indptr[-1] + len(columns))
+        doc_names.append(names[position] if names is not None else str(position))
+
+    n_columns = hash_features or len(term_ids)
+    counts_matrix = sparse.csr_matrix(
+        (np.concatenate(values) if values else np.zeros(0, dtype=np.int64),
+         np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+         np.asarray(indptr)),
+        shape=(len(doc_names), n_columns),
+    )
+
+    if hash_features:
+        terms = [''] * hash_features
+        for i, term in bucket_terms.items():
+            terms[i] = term
+    else:
+        terms = [''] * len(term_ids)
+        for term, i in term_ids.items():
+            terms[i] = term
+
+    if min_df > 1 and not hash_features:
+        keep = np.flatnonzero(np.bincount(counts_matrix.indices, minlength=n_columns) >= min_df)
+        counts_matrix = counts_matrix[:, keep].tocsr()
+        terms = [terms[i] for i in keep]
+
+    return CorpusAnalysis(doc_names, counts_matrix, terms)
+
+def analyze_lecture_store(**kwargs) -> CorpusAnalysis:
+    """
+    Build the corpus from every lecture in the lecture store
+
+    Args:
+        **kwargs: Passed to build_corpus (db_path selects another store)
+
+    Returns:
+        CorpusAnalysis with one document per stored lecture, named "<id>: <name>"
+    """
+    from lecture_store import iter_lectures, STORE_DB_PATH
+
+    db_path = kwargs.pop('db_path', STORE_DB_PATH)
+    names, texts = [], []
+    for lecture in iter_lectures(db_path):
+        names.append(f"{lecture['id']}: {lecture['name']}")
+        texts.append(lecture['transcript'])
+    return build_corpus(texts, names=names, **kwargs)
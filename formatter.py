@@ -1,5 +1,122 @@
 import re
-from typing import List, Dict
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Dict, Tuple, Union
+from highlighter import highlight
+
+# "**Term**: definition" lines used for flashcards
+DEFINITION_PATTERN = re.compile(r'\*\*([^*]+)\*\*:\s*(.+?)(?=\n|$)')
+
+PAGE_BREAK = '\n<div style="page-break-after: always;"></div>\n'
+
+class Section:
+    """
+    One header and the body that follows it, as character offsets into the notes
+
+    The implicit section before the first header has level 0 and the title
+    "Introduction". has_body is False when no line follows the header before
+    the next one.
+    """
+
+    __slots__ = ('level', 'title', 'anchor', 'header_start', 'header_end',
+                 'body_start', 'body_end', 'has_body', 'definitions', 'children')
+
+    def __init__(self, level: int, title: str, header_start: int, header_end: int, body_start: int):
+        self.level = level
+        self.title = title
+        self.anchor = title.lower().replace(' ', '-')
+        self.header_start = header_start
+        self.header_end = header_end
+        self.body_start = body_start
+        self.body_end = body_start
+        self.has_body = False
+        self.definitions: List[Tuple[str, str]] = []
+        self.children: List['Section'] = []
+
+class NoteTree:
+    """
+    Parsed notes: sections in document order plus their nesting by header level
+
+    Built by parse_notes in one pass over the text.
+    """
+
+    def __init__(self, notes: str, sections: List[Section], roots: List[Section]):
+        self.notes = notes
+        self.sections = sections
+        self.roots = roots
+
+    @property
+    def headers(self) -> List[Section]:
+        """Sections introduced by an actual markdown header"""
+        return [section for section in self.sections if section.level > 0]
+
+    def body(self, section: Section) -> str:
+        """Body text of a section, without surrounding whitespace"""
+        return self.notes[section.body_start:section.body_end].strip()
+
+def build_note_tree(notes: str) -> NoteTree:
+    """
+    Parse notes into a section tree in a single pass, without memoization
+
+    Use parse_notes unless the text is transient (e.g. partially streamed notes).
+
+    Args:
+        notes: Formatted notes
+
+    Returns:
+        NoteTree with header levels, titles, anchors, body spans and definitions
+    """
+    current = Section(0, "Introduction", 0, 0, 0)
+    sections = [current]
+    roots = [current]
+    stack: List[Section] = []
+    pos = 0
+
+    for line in notes.split('\n'):
+        line_start, line_end = pos, pos + len(line)
+        pos = line_end + 1
+
+        stripped = line.strip()
+        if stripped.startswith('#'):
+            level = len(stripped) - len(stripped.lstrip('#'))
+            current = Section(level, stripped.lstrip('#').strip(), line_start, line_end, pos)
+            sections.append(current)
+
+            # Nest under the closest preceding header of a lower level
+            while stack and stack[-1].level >= level:
+                stack.pop()
+            (stack[-1].children if stack else roots).append(current)
+            stack.append(current)
+        else:
+            current.has_body = True
+            current.body_end = line_end
+
+    # Attach each definition to the section it appears in
+    starts = [section.header_start for section in sections]
+    for match in DEFINITION_PATTERN.finditer(notes):
+        owner = sections[bisect_right(starts, match.start()) - 1]
+        owner.definitions.append((match.group(1).strip(), match.group(2).strip()))
+
+    return NoteTree(notes, sections, roots)
+
+@lru_cache(maxsize=16)
+def parse_notes(notes: str) -> NoteTree:
+    """
+    Parse notes into a section tree, memoized by content
+
+    Repeated formatting of the same notes (e.g. on every Streamlit rerun)
+    parses them only once.
+
+    Args:
+        notes: Formatted notes
+
+    Returns:
+        NoteTree for the notes
+    """
+    return build_note_tree(notes)
+
+def _as_tree(notes: Union[str, NoteTree]) -> NoteTree:
+    return notes if isinstance(notes, NoteTree) else parse_notes(notes)
 
 def format_notes(notes: str) -> str:
     """
@@ -22,7 +139,7 @@ def format_notes(notes: str) -> str:
     
     return notes.strip()
 
-def extract_sections(notes: str) -> Dict[str, str]:
+def extract_sections(notes: Union[str, NoteTree]) -> Dict[str, str]:
     """
     Extract different sections from structured notes
     
@@ -32,32 +149,17 @@ def extract_sections(notes: str) -> Dict[str, str]:
     Returns:
         Dictionary with section names as keys and content as values
     """
-    sections = {}
-    current_section = "Introduction"
-    current_content = []
-    
-    lines = notes.split('\n')
-    
-    for line in lines:
-        # Check if line is a header
-        if line.strip().startswith('#'):
-            # Save previous section
-            if current_content:
-                sections[current_section] = '\n'.join(current_content).strip()
-            
-            # Start new section
-            current_section = line.strip().lstrip('#').strip()
-            current_content = []
-        else:
-            current_content.append(line)
+    tree = _as_tree(notes)
     
-    # Save last section
-    if current_content:
-        sections[current_section] = '\n'.join(current_content).strip()
+    sections = {}
+    for section in tree.sections:
+        if section.has_body:
+            sections[section.title] = tree.body(section)
     
     return sections
 
-def create_table_of_contents(notes: str) -> str:
+
+def create_table_of_contents(notes: Union[str, NoteTree]) -> str:
     """
     Generate a table of contents from headers in notes
     
@@ -69,24 +171,14 @@ def create_table_of_contents(notes: str) -> str:
     """
     toc = ["## Table of Contents\n"]
     
-    lines = notes.split('\n')
-    for line in lines:
-        if line.strip().startswith('#'):
-            # Count header level
-            level = len(re.match(r'^#+', line.strip()).group())
-            
-            # Extract header text
-            header_text = line.strip().lstrip('#').strip()
-            
-            # Create anchor link
-            anchor = header_text.lower().replace(' ', '-').replace('[^a-z0-9-]', '')
-            
-            # Add to TOC with proper indentation
-            indent = '  ' * (level - 1)
-            toc.append(f"{indent}- [{header_text}](#{anchor})")
+    for section in _as_tree(notes).headers:
+        # Add to TOC with proper indentation
+        indent = '  ' * (section.level - 1)
+        toc.append(f"{indent}- [{section.title}](#{section.anchor})")
     
     return '\n'.join(toc) + '\n\n'
 
+
 def highlight_keywords(text: str, keywords: List[str]) -> str:
     """
     Highlight keywords in text using markdown bold
@@ -98,12 +190,8 @@ def highlight_keywords(text: str, keywords: List[str]) -> str:
     Returns:
         Text with highlighted keywords
     """
-    for keyword in keywords:
-        # Use word boundaries to match whole words
-        pattern = r'\b' + re.escape(keyword) + r'\b'
-        text = re.sub(pattern, f"**{keyword}**", text, flags=re.IGNORECASE)
-    
-    return text
+    # One pass over the text with all keywords (longest first), matching whole words
+    return highlight(text, keywords, whole_words=True)
 
 def create_summary_box(summary: str) -> str:
     """
@@ -139,7 +227,7 @@ def format_bullet_list(items: List[str], ordered: bool = False) -> str:
     else:
         return '\n'.join([f"- {item}" for item in items])
 
-def add_page_breaks(notes: str, every_n_sections: int = 3) -> str:
+def add_page_breaks(notes: Union[str, NoteTree], every_n_sections: int = 3) -> str:
     """
     Add page break markers for printing
     
@@ -150,21 +238,23 @@ def add_page_breaks(notes: str, every_n_sections: int = 3) -> str:
     Returns:
         Notes with page break markers
     """
-    lines = notes.split('\n')
+    tree = _as_tree(notes)
+    text = tree.notes
     result = []
-    section_count = 0
+    last = 0
     
-    for line in lines:
-        result.append(line)
-        
-        if line.strip().startswith('#'):
-            section_count += 1
-            if section_count % every_n_sections == 0:
-                result.append('\n<div style="page-break-after: always;"></div>\n')
+    # Insert a break after every Nth header line
+    for count, section in enumerate(tree.headers, start=1):
+        if count % every_n_sections == 0:
+            result.append(text[last:section.header_end])
+            result.append('\n' + PAGE_BREAK)
+            last = section.header_end
     
-    return '\n'.join(result)
+    result.append(text[last:])
+    return ''.join(result)
 
-def create_flashcards(notes: str) -> List[Dict[str, str]]:
+
+def create_flashcards(notes: Union[str, NoteTree]) -> List[Dict[str, str]]:
     """
     Extract potential flashcard Q&A pairs from notes
     
@@ -174,22 +264,13 @@ def create_flashcards(notes: str) -> List[Dict[str, str]]:
     Returns:
         List of dictionaries with 'question' and 'answer' keys
     """
-    flashcards = []
-    
-    # Look for definition patterns
-    definition_pattern = r'\*\*([^*]+)\*\*:\s*(.+?)(?=\n|$)'
-    matches = re.finditer(definition_pattern, notes)
-    
-    for match in matches:
-        term = match.group(1).strip()
-        definition = match.group(2).strip()
-        
-        flashcards.append({
-            'question': f"What is {term}?",
-            'answer': definition
-        })
-    
-    return flashcards
+    # Definition patterns were collected per section while parsing
+    return [
+        {'question': f"What is {term}?", 'answer': definition}
+        for section in _as_tree(notes).sections
+        for term, definition in section.definitions
+    ]
+
 
 def export_to_anki_format(flashcards: List[Dict[str, str]]) -> str:
     """
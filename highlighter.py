@@ -0,0 +1,69 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Pattern, Tuple
+
+@lru_cache(maxsize=64)
+def compile_keywords(keywords: Tuple[str, ...], whole_words: bool = True) -> Tuple[Optional[Pattern], Dict[str, str]]:
+    """
+    Build one case-insensitive pattern matching any of the keywords
+
+    Alternatives are ordered longest first, so at any position the longest
+    keyword wins and overlapping keywords ("learning" inside "machine
+    learning") are resolved deterministically. Compiled patterns are cached
+    per keyword set.
+
+    Args:
+        keywords: Keywords to match
+        whole_words: Only match at word boundaries
+
+    Returns:
+        Tuple of (compiled pattern or None if there are no keywords, mapping
+        of lowercased keyword to the keyword as given)
+    """
+    display: Dict[str, str] = {}
+    for keyword in keywords:
+        if keyword and keyword.lower() not in display:
+            display[keyword.lower()] = keyword
+
+    if not display:
+        return None, display
+
+    alternatives = '|'.join(re.escape(k) for k in sorted(display, key=lambda k: (-len(k), k)))
+    if whole_words:
+        alternatives = r'\b(?:' + alternatives + r')\b'
+
+    return re.compile(alternatives, re.IGNORECASE), display
+
+def highlight(text: str, keywords: List[str], whole_words: bool = True) -> str:
+    """
+    Wrap every keyword occurrence in markdown bold in a single pass
+
+    Args:
+        text: Input text
+        keywords: Keywords to highlight
+        whole_words: Only match at word boundaries
+
+    Returns:
+        Text with each match replaced by **keyword**
+    """
+    pattern, display = compile_keywords(tuple(keywords), whole_words)
+    if pattern is None:
+        return text
+
+    return pattern.sub(lambda m: f"**{display.get(m.group(0).lower(), m.group(0))}**", text)
+
+def first_match(text: str, keywords: List[str], whole_words: bool = False) -> int:
+    """
+    Position of the earliest occurrence of any keyword
+
+    Args:
+        text: Input text
+        keywords: Keywords to look for
+        whole_words: Only match at word boundaries
+
+    Returns:
+        Character offset, or -1 if no keyword occurs
+    """
+    pattern, _ = compile_keywords(tuple(keywords), whole_words)
+    match = pattern.search(text) if pattern is not None else None
+    return match.start() if match else -1
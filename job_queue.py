@@ -0,0 +1,335 @@
+"""
+SQLite-backed background job queue for the lecture pipeline
+
+The Streamlit app enqueues a job and polls it; separate worker processes
+claim queued jobs and run transcription, keyword extraction and note
+generation, recording per-stage progress (including partially streamed
+notes) in the database. Jobs therefore survive reruns, refreshes and
+disconnects, and any session can reattach to a job by its ID.
+
+Run workers alongside the app (the app also starts them itself):
+    python job_queue.py --workers 4
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import sqlite3
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+DATA_DIR = os.getenv("LECTUREAI_DATA_DIR", ".data")
+JOB_DB_PATH = os.getenv("LECTUREAI_JOB_DB", os.path.join(DATA_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("LECTUREAI_JOB_WORKERS", "2"))
+
+# Seconds between queue polls when idle, and between partial-notes writes
+POLL_INTERVAL = 1.0
+PARTIAL_NOTES_INTERVAL = 1.0
+
+# Progress reported at the start of each stage
+STAGE_PROGRESS = {
+    'queued': 0.0,
+    'transcribing': 0.05,
+    'analyzing': 0.5,
+    'done': 1.0,
+}
+
+@contextmanager
+def _connect(db_path: str = JOB_DB_PATH) -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def init_db(db_path: str = JOB_DB_PATH):
+    """Create the jobs table if needed"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with _connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                audio_path TEXT NOT NULL,
+                name TEXT NOT NULL,
+                transcript TEXT,
+                keywords TEXT,
+                notes TEXT,
+                partial_notes TEXT,
+                file_hash TEXT,
+                error TEXT,
+                worker_pid INTEGER,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+def enqueue_job(audio_path: str, name: str, file_hash: Optional[str] = None, db_path: str = JOB_DB_PATH) -> str:
+    """
+    Add a lecture to the queue
+
+    Args:
+        audio_path: Path to the uploaded file; the worker deletes it when finished
+        name: Original file name for display
+        file_hash: SHA-256 of the file if already known (spool_upload
+            returns it); otherwise the worker computes it
+
+    Returns:
+        Job ID
+    """
+    init_db(db_path)
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, status, stage, progress, audio_path, name, file_hash, created, updated) "
+            "VALUES (?, 'queued', 'queued', 0, ?, ?, ?, ?, ?)",
+            (job_id, audio_path, name, file_hash, now, now)
+        )
+    return job_id
+
+def get_job(job_id: str, db_path: str = JOB_DB_PATH) -> Optional[Dict[str, Any]]:
+    """
+    Look up a job and its progress
+
+    Args:
+        job_id: Job ID
+
+    Returns:
+        Job as a dictionary (keywords decoded to a list) or None if unknown
+    """
+    init_db(db_path)
+    with _connect(db_path) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    if row is None:
+        return None
+
+    job = dict(row)
+    job['keywords'] = json.loads(job['keywords']) if job['keywords'] else []
+    return job
+
+def update_job(job_id: str, db_path: str = JOB_DB_PATH, **fields):
+    """Update columns of a job and bump its timestamp"""
+    if 'keywords' in fields:
+        fields['keywords'] = json.dumps(fields['keywords'])
+    fields['updated'] = time.time()
+
+    assignments = ', '.join(f"{column} = ?" for column in fields)
+    with _connect(db_path) as conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+def claim_next_job(db_path: str = JOB_DB_PATH) -> Optional[Dict[str, Any]]:
+    """
+    Atomically take the oldest queued job for this process
+
+    Returns:
+        The claimed job or None if the queue is empty
+    """
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+
+        conn.execute(
+            "UPDATE jobs SET status = 'running', worker_pid = ?, updated = ? WHERE id = ?",
+            (os.getpid(), time.time(), row['id'])
+        )
+        conn.execute("COMMIT")
+
+        job = dict(row)
+        job['status'] = 'running'
+        return job
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def active_audio_paths(db_path: str = JOB_DB_PATH) -> Set[str]:
+    """
+    Absolute paths of the uploads that queued or running jobs still need
+
+    Returns:
+        Set of paths (empty if no job database exists yet)
+    """
+    if not os.path.exists(db_path):
+        return set()
+    with _connect(db_path) as conn:
+        rows = conn.execute("SELECT audio_path FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+    return {os.path.abspath(row['audio_path']) for row in rows}
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def requeue_orphaned_jobs(db_path: str = JOB_DB_PATH) -> int:
+    """
+    Put running jobs whose worker process has died back on the queue
+
+    Returns:
+        Number of jobs requeued
+    """
+    init_db(db_path)
+    with _connect(db_path) as conn:
+        running = conn.execute("SELECT id, worker_pid FROM jobs WHERE status = 'running'").fetchall()
+        orphaned = [row['id'] for row in running if not _pid_alive(row['worker_pid'])]
+        for job_id in orphaned:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', stage = 'queued', progress = 0, "
+                "partial_notes = NULL, worker_pid = NULL, updated = ? WHERE id = ?",
+                (time.time(), job_id)
+            )
+    return len(orphaned)
+
+def run_job(job: Dict[str, Any], db_path: str = JOB_DB_PATH):
+    """
+    Run the full pipeline for one claimed job, recording progress as it goes
+
+    Args:
+        job: Job claimed with claim_next_job
+    """
+    # Imported here so enqueueing and polling do not load the API clients
+    from api_models import transcribe_audio, extract_keywords, stream_notes, STREAM_RESET
+    from lecture_store import save_lecture
+    from cache import file_digest
+    from tracing import span, attach
+    from spool import discard
+
+    job_id = job['id']
+    try:
+        file_size = os.path.getsize(job['audio_path'])
+        with span("job", job_id=job_id, file_bytes=file_size) as job_span:
+            # The spool hashed the upload while writing it; only older or hand-made jobs need a pass
+            file_hash = job['file_hash'] or file_digest(job['audio_path'])
+            update_job(job_id, db_path, stage='transcribing', progress=STAGE_PROGRESS['transcribing'], file_hash=file_hash)
+            transcript = transcribe_audio(job['audio_path'], file_hash=file_hash)
+            if not transcript:
+                raise Exception("Transcription returned no text")
+
+            update_job(job_id, db_path, stage='analyzing', progress=STAGE_PROGRESS['analyzing'], transcript=transcript)
+
+            # Keywords run next to the streamed notes; partial notes are saved periodically
+            with span("job.analyze") as analyze_span, ThreadPoolExecutor(max_workers=1) as executor:
+                def keywords_task():
+                    with attach(analyze_span):
+                        return extract_keywords(transcript)
+
+                keywords_future = executor.submit(keywords_task)
+
+                buffer = ""
+                last_write = time.monotonic()
+                for delta in stream_notes(transcript):
+                    if delta is STREAM_RESET:
+                        buffer = ""
+                        continue
+                    buffer += delta
+                    if time.monotonic() - last_write > PARTIAL_NOTES_INTERVAL:
+                        last_write = time.monotonic()
+                        # Notes are usually a few thousand tokens; treat ~12k chars as nearly complete
+                        progress = STAGE_PROGRESS['analyzing'] + min(0.45, len(buffer) / 12000 * 0.45)
+                        update_job(job_id, db_path, partial_notes=buffer, progress=progress)
+
+                keywords = keywords_future.result()
+
+            with span("job.save"):
+                save_lecture(job['name'], transcript, buffer, keywords, file_hash=file_hash, file_size=file_size)
+                update_job(job_id, db_path, status='done', stage='done', progress=STAGE_PROGRESS['done'],
+                           notes=buffer, partial_notes=None, keywords=keywords)
+            job_span.set(words=len(transcript.split()))
+    except Exception as e:
+        print(f"Job {job_id} failed: {str(e)}")
+        update_job(job_id, db_path, status='failed', error=str(e))
+    finally:
+        discard(job['audio_path'])
+
+def worker_loop(db_path: str = JOB_DB_PATH, poll_interval: float = POLL_INTERVAL,
+                parent_pid: Optional[int] = None):
+    """Claim and run jobs until terminated, or until parent_pid (if given) exits"""
+    init_db(db_path)
+    print(f"Job worker {os.getpid()} started")
+    while True:
+        if parent_pid and not _pid_alive(parent_pid):
+            print(f"Job worker {os.getpid()} exiting: parent process is gone")
+            return
+
+        job = claim_next_job(db_path)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(job, db_path)
+
+def start_workers(count: int = JOB_WORKERS, db_path: str = JOB_DB_PATH) -> List[subprocess.Popen]:
+    """
+    Launch worker processes running worker_loop
+
+    Separate interpreters are used instead of fork, which is unsafe in the
+    multi-threaded Streamlit server.
+
+    Args:
+        count: Number of worker processes
+
+    Returns:
+        The started processes
+    """
+    requeue_orphaned_jobs(db_path)
+    script = os.path.abspath(__file__)
+    return [
+        subprocess.Popen([sys.executable, script, "--workers", "1", "--db", db_path,
+                          "--parent-pid", str(os.getpid())])
+        for _ in range(count)
+    ]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run background workers for queued lecture jobs")
+    parser.add_argument('--workers', type=int, default=JOB_WORKERS, help=f"Worker processes (default: {JOB_WORKERS})")
+    parser.add_argument('--db', default=JOB_DB_PATH, help=f"Job database (default: {JOB_DB_PATH})")
+    parser.add_argument('--parent-pid', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.workers == 1:
+        worker_loop(args.db, parent_pid=args.parent_pid)
+        return 0
+
+    processes = start_workers(args.workers, args.db)
+
+    def stop(signum, frame):
+        for process in processes:
+            process.terminate()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for process in processes:
+        process.wait()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
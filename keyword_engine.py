@@ -0,0 +1,319 @@
+"""
+Local keyword extraction: TF-IDF against a persisted corpus plus TextRank
+
+Candidates are the content words of a transcript and its repeated 2-3 word
+phrases (keyword_utils.extract_noun_phrases). Each candidate is scored by
+
+- TF-IDF, with document frequencies taken from every transcript processed
+  so far (stored in SQLite and shared by every process, so terms common to
+  all lectures sink over time)
+- TextRank, i.e. PageRank over a co-occurrence graph of content words,
+  with phrases scoring the mean of their words
+
+and the two normalized scores are averaged. No network access is needed.
+"""
+import os
+import json
+import math
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from keyword_utils import STOP_WORDS, PUNCTUATION_TABLE, TextAnalysis, analyze, extract_noun_phrases
+
+DATA_DIR = os.getenv("LECTUREAI_DATA_DIR", ".data")
+DF_PATH = os.getenv("LECTUREAI_KEYWORD_DF", os.path.join(DATA_DIR, "keyword_df.sqlite3"))
+
+# Table written by earlier versions; imported into an empty database
+LEGACY_DF_PATH = os.path.join(DATA_DIR, "keyword_df.json")
+
+DF_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (digest TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL);
+"""
+
+# Terms per lookup query, below SQLite's bound-parameter limit
+LOOKUP_BATCH = 500
+
+# Words frequent in any lecture regardless of topic, and function words
+# longer than the three characters keyword_utils already filters
+LECTURE_STOP_WORDS = {
+    'about', 'actually', 'also', 'answer', 'basically', 'because', 'could', 'example',
+    'going', 'important', 'just', 'know', 'like', 'okay', 'people', 'point', 'question',
+    'really', 'right', 'something', 'there', 'these', 'thing', 'things', 'think', 'those',
+    'today', 'well', 'would', 'yeah', 'want', 'look', 'mean', 'here', 'them', 'then',
+    'into', 'through', 'over', 'under', 'after', 'before', 'during', 'while', 'were',
+    'been', 'being', 'does', 'done', 'much', 'many', 'than', 'upon', 'onto', 'within',
+    'without', 'between', 'across', 'even', 'ever', 'still', 'again', 'maybe', 'might',
+    'must', 'shall', 'whose', 'whom', 'said', 'says', 'make', 'makes', 'made',
+}
+
+# TextRank settings
+WINDOW_SIZE = 4
+DAMPING = 0.85
+ITERATIONS = 30
+
+# Minimum share of its most frequent word's occurrences a phrase must cover
+MIN_PHRASE_COHESION = 0.1
+
+# Weight of TF-IDF against TextRank in the combined score
+TFIDF_WEIGHT = 0.5
+
+class DocumentFrequencies:
+    """
+    Corpus document-frequency table stored in SQLite
+
+    The app, job workers and batch runs share one table: counts are
+    incremented in place within a transaction, so concurrent processes do
+    not overwrite each other, and lookups always see the current counts.
+    Documents are identified by a digest of their text, so processing the
+    same transcript again does not skew the counts.
+    """
+
+    def __init__(self, path: str = DF_PATH, legacy_path: Optional[str] = LEGACY_DF_PATH):
+        self.path = path
+        self._initialized = False
+        self._lock = threading.Lock()
+        if legacy_path and os.path.exists(legacy_path):
+            self._import_json(legacy_path)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._initialized:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._initialized:
+                with self._lock:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(DF_SCHEMA)
+                    self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _import_json(self, legacy_path: str):
+        with open(legacy_path, encoding='utf-8') as f:
+            data = json.load(f)
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM documents LIMIT 1").fetchone():
+                return
+            conn.executemany("INSERT OR IGNORE INTO documents (digest) VALUES (?)",
+                             ((d,) for d in data.get('documents', [])))
+            conn.executemany("INSERT OR IGNORE INTO terms (term, df) VALUES (?, ?)", data.get('df', {}).items())
+
+    @property
+    def size(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def idf(self, term: str) -> float:
+        """Smoothed inverse document frequency (1.0 for an empty corpus)"""
+        return self.idfs([term])[term]
+
+    def idfs(self, terms: Iterable[str]) -> Dict[str, float]:
+        """
+        Smoothed inverse document frequencies of many terms in one read
+
+        Args:
+            terms: Terms to look up
+
+        Returns:
+            Dictionary of term to IDF
+        """
+        terms = list(dict.fromkeys(terms))
+        counts: Dict[str, int] = {}
+        with self._connect() as conn:
+            size = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            for i in range(0, len(terms), LOOKUP_BATCH):
+                batch = terms[i:i + LOOKUP_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                counts.update(conn.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})", batch))
+        return {term: math.log((size + 1) / (counts.get(term, 0) + 1)) + 1 for term in terms}
+
+    def add_document(self, text: str, terms: Iterable[str]) -> bool:
+        """
+        Count a document's distinct terms
+
+        Args:
+            text: Document text, used to recognize repeats
+            terms: Terms occurring in the document
+
+        Returns:
+            False if the document had already been counted
+        """
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+        with self._connect() as conn:
+            if conn.execute("INSERT OR IGNORE INTO documents (digest) VALUES (?)", (digest,)).rowcount == 0:
+                return False
+            conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                ((term,) for term in set(terms)),
+            )
+        return True
+
+_tables: Dict[str, DocumentFrequencies] = {}
+_tables_lock = threading.Lock()
+
+def get_document_frequencies(path: str = DF_PATH) -> DocumentFrequencies:
+    """Return the shared document-frequency table stored at path"""
+    with _tables_lock:
+        if path not in _tables:
+            _tables[path] = DocumentFrequencies(path)
+        return _tables[path]
+
+def _is_content_word(word: str) -> bool:
+    return len(word) > 3 and word not in STOP_WORDS and word not in LECTURE_STOP_WORDS and not word.isdigit()
+
+def content_sentences(analysis: TextAnalysis) -> List[List[str]]:
+    """
+    Content words of each sentence, punctuation removed, in order
+
+    Short words are dropped like elsewhere in keyword_utils, except for
+    acronyms that recur in the text ("DNA", "CPU").
+    """
+    acronyms = {term.lower() for term, count in analysis.technical_term_counts.items()
+                if term.isupper() and count > 1}
+    sentences = []
+    for words in analysis.sentences:
+        stripped = (w.translate(PUNCTUATION_TABLE) for w in words)
+        sentences.append([w for w in stripped if w in acronyms or _is_content_word(w)])
+    return sentences
+
+def textrank(sentences: List[List[str]], window_size: int = WINDOW_SIZE,
+             damping: float = DAMPING, iterations: int = ITERATIONS) -> Dict[str, float]:
+    """
+    Rank words by PageRank over their co-occurrence graph
+
+    Args:
+        sentences: Content words of each sentence
+        window_size: Words within this distance in a sentence are linked
+        damping: PageRank damping factor
+        iterations: Power iterations
+
+    Returns:
+        Score of every word
+    """
+    neighbours: Dict[str, Counter] = defaultdict(Counter)
+    for words in sentences:
+        for i, word in enumerate(words):
+            for other in words[i + 1:i + window_size]:
+                if other != word:
+                    neighbours[word][other] += 1
+                    neighbours[other][word] += 1
+
+    if not neighbours:
+        return {}
+
+    out_weight = {word: sum(links.values()) for word, links in neighbours.items()}
+    scores = dict.fromkeys(neighbours, 1.0)
+    for _ in range(iterations):
+        scores = {
+            word: (1 - damping) + damping * sum(scores[other] * weight / out_weight[other]
+                                                for other, weight in links.items())
+            for word, links in neighbours.items()
+        }
+    return scores
+
+def _surface_form(keyword: str, analysis: TextAnalysis) -> str:
+    # Keep acronyms and proper nouns as written, when that is how the word usually appears
+    if ' ' not in keyword:
+        occurrences = analysis.content_word_counts.get(keyword, 0)
+        for form in (keyword.upper(), keyword.capitalize()):
+            if analysis.technical_term_counts.get(form, 0) * 2 > occurrences:
+                return form
+    return keyword
+
+def rank_keywords(text: Union[str, TextAnalysis], df: Optional[DocumentFrequencies] = None,
+                  tfidf_weight: float = TFIDF_WEIGHT) -> List[tuple]:
+    """
+    Score every keyword candidate of a text
+
+    Args:
+        text: Input text
+        df: Corpus document frequencies (default: the shared table)
+        tfidf_weight: Share of TF-IDF in the combined score, the rest is TextRank
+
+    Returns:
+        List of (candidate, score) sorted best first
+    """
+    analysis = text if isinstance(text, TextAnalysis) else analyze(text)
+    df = df or get_document_frequencies()
+
+    sentences = content_sentences(analysis)
+    word_counts = Counter(w for words in sentences for w in words)
+    total = sum(word_counts.values())
+    if not total:
+        return []
+
+    # Phrase tokens may carry commas and the like; merge such variants
+    phrase_counts: Counter = Counter()
+    for phrase in extract_noun_phrases(analysis):
+        cleaned = ' '.join(phrase.translate(PUNCTUATION_TABLE).split())
+        if len(cleaned.split()) > 1 and all(w not in LECTURE_STOP_WORDS for w in cleaned.split()):
+            phrase_counts[cleaned] += analysis.phrase_counts[phrase]
+    # Keep cohesive phrases only: a phrase that accounts for a small share of
+    # its words' occurrences is two terms that happened to be adjacent
+    for phrase in list(phrase_counts):
+        member_counts = [word_counts[w] for w in phrase.split() if w in word_counts]
+        if member_counts and phrase_counts[phrase] < MIN_PHRASE_COHESION * max(member_counts):
+            del phrase_counts[phrase]
+    phrases = list(phrase_counts)
+    ranks = textrank(sentences)
+
+    idfs = df.idfs(list(word_counts) + phrases)
+    tfidf = {word: count / total * idfs[word] for word, count in word_counts.items()}
+    graph = dict(ranks)
+    for phrase in phrases:
+        members = phrase.split()
+        # Phrases are rarer than their words; weight by length to compensate
+        tfidf[phrase] = phrase_counts[phrase] / total * idfs[phrase] * len(members)
+        graph[phrase] = sum(ranks.get(w, 0.0) for w in members) / len(members)
+
+    max_tfidf = max(tfidf.values()) or 1.0
+    max_rank = max(graph.values(), default=0.0) or 1.0
+    scores = {
+        term: tfidf_weight * tfidf[term] / max_tfidf + (1 - tfidf_weight) * graph.get(term, 0.0) / max_rank
+        for term in tfidf
+    }
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+def extract_keywords_local(text: str, max_keywords: int = 10, update_corpus: bool = True,
+                           df: Optional[DocumentFrequencies] = None) -> List[str]:
+    """
+    Extract keywords without an API call
+
+    Args:
+        text: Input text
+        max_keywords: Maximum number of keywords to return
+        update_corpus: Add the text to the document-frequency table afterwards
+        df: Corpus document frequencies (default: the shared table)
+
+    Returns:
+        List of keywords, best first
+    """
+    analysis = analyze(text)
+    df = df or get_document_frequencies()
+    ranked = rank_keywords(analysis, df)
+
+    selected: List[str] = []
+    for term, _ in ranked:
+        words = set(term.split())
+        # Skip words already covered by a chosen phrase; a phrase replaces its chosen words
+        if any(words <= set(s.split()) for s in selected):
+            continue
+        selected = [s for s in selected if not set(s.split()) <= words]
+        selected.append(term)
+        if len(selected) >= max_keywords:
+            break
+
+    if update_corpus:
+        df.add_document(text, [term for term, _ in ranked])
+
+    return [_surface_form(term, analysis) for term in selected]
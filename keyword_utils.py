@@ -1,7 +1,11 @@
 import re
+import heapq
+from bisect import bisect_left
 from collections import Counter
-from typing import List, Set, Dict
+from functools import cached_property, lru_cache
+from typing import List, Set, Dict, Union
 import string
+from highlighter import highlight, first_match
 
 # Common English stop words
 STOP_WORDS = {
@@ -14,7 +18,234 @@ STOP_WORDS = {
     'can', 'just', 'should', 'now', 'i', 'you', 'we', 'our', 'your', 'their'
 }
 
-def extract_keywords_statistical(text: str, top_n: int = 20) -> List[str]:
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+class InvertedIndex:
+    """
+    Positional inverted index over the lowercased tokens of a text
+
+    Maps every distinct token to its sorted token positions and keeps a
+    sorted vocabulary for prefix (binary search) and substring (one scan of
+    the vocabulary, memoized) lookups. Once a term is resolved, frequency
+    and co-occurrence queries cost time proportional to its occurrences.
+    """
+
+    def __init__(self, words: List[str], postings: Dict[str, List[int]]):
+        self.words = words
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        self._substring_terms: Dict[str, List[str]] = {}
+        self._suffix_terms: Dict[str, List[str]] = {}
+
+    def prefix_terms(self, prefix: str) -> List[str]:
+        """Vocabulary terms starting with prefix"""
+        start = bisect_left(self.vocabulary, prefix)
+        end = start
+        while end < len(self.vocabulary) and self.vocabulary[end].startswith(prefix):
+            end += 1
+        return self.vocabulary[start:end]
+
+    def substring_terms(self, fragment: str) -> List[str]:
+        """Vocabulary terms containing fragment"""
+        if fragment not in self._substring_terms:
+            self._substring_terms[fragment] = [term for term in self.vocabulary if fragment in term]
+        return self._substring_terms[fragment]
+
+    def suffix_terms(self, suffix: str) -> List[str]:
+        """Vocabulary terms ending with suffix"""
+        if suffix not in self._suffix_terms:
+            self._suffix_terms[suffix] = [term for term in self.substring_terms(suffix) if term.endswith(suffix)]
+        return self._suffix_terms[suffix]
+
+    def positions(self, term: str, match: str = "substring") -> List[int]:
+        """
+        Sorted positions of tokens matching a single-token term
+
+        Args:
+            term: Lowercased term
+            match: "exact", "prefix" or "substring"
+
+        Returns:
+            Sorted token positions
+        """
+        if match == "exact":
+            return list(self.postings.get(term, []))
+        terms = self.prefix_terms(term) if match == "prefix" else self.substring_terms(term)
+        return list(heapq.merge(*(self.postings[t] for t in terms)))
+
+    def phrase_positions(self, phrase: str) -> List[int]:
+        """
+        Start positions of a multi-word phrase, matched like a substring
+
+        The first token must end with the first phrase word, the last token
+        must start with the last phrase word and the ones between must match
+        exactly, mirroring a substring search over single-spaced text.
+
+        Args:
+            phrase: Lowercased phrase
+
+        Returns:
+            Sorted token positions where the phrase starts
+        """
+        parts = phrase.split()
+        if len(parts) < 2:
+            return self.positions(phrase)
+
+        words = self.words
+        last = len(parts) - 1
+        starts = heapq.merge(*(self.postings[t] for t in self.suffix_terms(parts[0])))
+        return [
+            i for i in starts
+            if i + last < len(words)
+            and words[i + last].startswith(parts[-1])
+            and all(words[i + k] == parts[k] for k in range(1, last))
+        ]
+
+    def count(self, keyword: str) -> int:
+        """
+        Number of occurrences of a keyword, as a substring of the lowercased text
+
+        Args:
+            keyword: Keyword (any case)
+
+        Returns:
+            Occurrence count
+        """
+        keyword_lower = keyword.lower()
+        if not keyword_lower.split():
+            return 0
+        if len(keyword_lower.split()) > 1:
+            return len(self.phrase_positions(keyword_lower))
+        return sum(term.count(keyword_lower) * len(self.postings[term]) for term in self.substring_terms(keyword_lower))
+
+    def cooccurrences(self, keyword: str, window_size: int = 20) -> Counter:
+        """
+        Count tokens within window_size positions of tokens containing keyword
+
+        Args:
+            keyword: Keyword (any case)
+            window_size: Number of tokens on each side of an occurrence
+
+        Returns:
+            Counter of surrounding tokens, in order of first occurrence
+        """
+        words = self.words
+        related = []
+        for i in self.positions(keyword.lower()):
+            start = max(0, i - window_size)
+            end = min(len(words), i + window_size + 1)
+            related.extend(words[start:i])
+            related.extend(words[i + 1:end])
+        return Counter(related)
+
+class TextAnalysis:
+    """
+    Shared, lazily computed views of one text
+
+    Each view (lowercased text, tokens, sentences, n-gram counts, positions,
+    regex matches) is computed on first access and memoized, so the keyword
+    functions below can all work from a single tokenization. Those functions
+    accept either a string or a TextAnalysis.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+    @cached_property
+    def lower(self) -> str:
+        return self.text.lower()
+
+    @cached_property
+    def words(self) -> List[str]:
+        """Lowercased whitespace tokens, punctuation kept"""
+        return self.lower.split()
+
+    @cached_property
+    def stripped_words(self) -> List[str]:
+        """Lowercased tokens with punctuation removed"""
+        return self.lower.translate(PUNCTUATION_TABLE).split()
+
+    @cached_property
+    def content_word_counts(self) -> Counter:
+        """Frequencies of stripped tokens that are not stop words and longer than 3 characters"""
+        return Counter(word for word in self.stripped_words if word not in STOP_WORDS and len(word) > 3)
+
+    @cached_property
+    def sentences(self) -> List[List[str]]:
+        """Tokens of each sentence, split on terminal punctuation"""
+        return [sentence.split() for sentence in re.split(r'[.!?]+', self.lower)]
+
+    @cached_property
+    def phrase_counts(self) -> Counter:
+        """Frequencies of valid 2-3 word phrases within sentences, in order of first occurrence"""
+        # The is_valid_phrase rules, with each word's flags computed once
+        phrases = []
+        for words in self.sentences:
+            ends = [w not in STOP_WORDS for w in words]
+            long = [len(w) > 3 for w in words]
+            for i in range(len(words) - 1):
+                if not ends[i]:
+                    continue
+
+                # 2-word phrase
+                if ends[i + 1] and (long[i] or long[i + 1]):
+                    phrases.append(f"{words[i]} {words[i+1]}")
+
+                # 3-word phrase
+                if i < len(words) - 2 and ends[i + 2] and (long[i] or long[i + 1] or long[i + 2]):
+                    phrases.append(f"{words[i]} {words[i+1]} {words[i+2]}")
+        return Counter(phrases)
+
+    @cached_property
+    def word_positions(self) -> Dict[str, List[int]]:
+        """Token indices (into words) of every distinct lowercased token"""
+        positions: Dict[str, List[int]] = {}
+        for i, word in enumerate(self.words):
+            positions.setdefault(word, []).append(i)
+        return positions
+
+    @cached_property
+    def index(self) -> InvertedIndex:
+        """Positional inverted index over words"""
+        return InvertedIndex(self.words, self.word_positions)
+
+    @cached_property
+    def technical_term_counts(self) -> Counter:
+        """Frequencies of acronyms followed by capitalized words not at a sentence start"""
+        terms = re.findall(r'\b[A-Z]{2,}\b', self.text)
+        terms.extend(re.findall(r'(?<!^)(?<!\. )\b[A-Z][a-z]+\b', self.text))
+        return Counter(terms)
+
+    @cached_property
+    def numbers_and_stats(self) -> Dict[str, List[str]]:
+        """Percentages, large numbers, years and measurements found in the text"""
+        return {
+            'percentages': list(set(re.findall(r'\d+\.?\d*\s*%', self.text))),
+            'numbers': list(set(re.findall(r'\d+\.?\d*\s+(?:million|billion|thousand|hundred)', self.text, re.IGNORECASE))),
+            'dates': list(set(re.findall(r'\b(19|20)\d{2}\b', self.text))),
+            'measurements': list(set(re.findall(r'\d+\.?\d*\s*(?:kg|g|m|cm|km|ml|l|°C|°F)', self.text))),
+        }
+
+@lru_cache(maxsize=8)
+def analyze(text: str) -> TextAnalysis:
+    """
+    Get the shared TextAnalysis for a text
+
+    Repeated calls with the same transcript return the same object, so
+    every keyword function reuses one tokenization.
+
+    Args:
+        text: Input text
+
+    Returns:
+        TextAnalysis for the text
+    """
+    return TextAnalysis(text)
+
+def _as_analysis(text: Union[str, TextAnalysis]) -> TextAnalysis:
+    return text if isinstance(text, TextAnalysis) else analyze(text)
+
+def extract_keywords_statistical(text: Union[str, TextAnalysis], top_n: int = 20) -> List[str]:
     """
     Extract keywords using statistical frequency analysis
     
@@ -25,31 +256,13 @@ def extract_keywords_statistical(text: str, top_n: int = 20) -> List[str]:
     Returns:
         List of keywords sorted by importance
     """
-    # Convert to lowercase and tokenize
-    text = text.lower()
-    
-    # Remove punctuation
-    translator = str.maketrans('', '', string.punctuation)
-    text = text.translate(translator)
-    
-    # Split into words
-    words = text.split()
-    
-    # Filter out stop words and short words
-    filtered_words = [
-        word for word in words 
-        if word not in STOP_WORDS and len(word) > 3
-    ]
-    
-    # Count frequencies
-    word_freq = Counter(filtered_words)
+    word_freq = _as_analysis(text).content_word_counts
     
     # Get top N keywords
-    keywords = [word for word, _ in word_freq.most_common(top_n)]
-    
-    return keywords
+    return [word for word, _ in word_freq.most_common(top_n)]
 
-def extract_noun_phrases(text: str) -> List[str]:
+
+def extract_noun_phrases(text: Union[str, TextAnalysis]) -> List[str]:
     """
     Extract potential noun phrases (2-3 word combinations)
     
@@ -61,34 +274,12 @@ def extract_noun_phrases(text: str) -> List[str]:
     """
     # Simple pattern: Adjective + Noun or Noun + Noun
     # This is a basic implementation; a full NLP library would be better
+    phrase_freq = _as_analysis(text).phrase_counts
     
-    text = text.lower()
-    
-    # Split into sentences
-    sentences = re.split(r'[.!?]+', text)
-    
-    phrases = []
-    
-    for sentence in sentences:
-        words = sentence.split()
-        
-        # Look for 2-3 word phrases
-        for i in range(len(words) - 1):
-            # 2-word phrase
-            phrase = f"{words[i]} {words[i+1]}"
-            if is_valid_phrase(phrase):
-                phrases.append(phrase)
-            
-            # 3-word phrase
-            if i < len(words) - 2:
-                phrase = f"{words[i]} {words[i+1]} {words[i+2]}"
-                if is_valid_phrase(phrase):
-                    phrases.append(phrase)
-    
-    # Count and return most common
-    phrase_freq = Counter(phrases)
+    # Return most common phrases that repeat
     return [phrase for phrase, count in phrase_freq.most_common(15) if count > 1]
 
+
 def is_valid_phrase(phrase: str) -> bool:
     """
     Check if a phrase is a valid keyword phrase
@@ -115,7 +306,7 @@ def is_valid_phrase(phrase: str) -> bool:
     
     return True
 
-def identify_technical_terms(text: str) -> List[str]:
+def identify_technical_terms(text: Union[str, TextAnalysis]) -> List[str]:
     """
     Identify potential technical terms (capitalized words, acronyms, etc.)
     
@@ -125,21 +316,12 @@ def identify_technical_terms(text: str) -> List[str]:
     Returns:
         List of technical terms
     """
-    terms = []
-    
-    # Find all-caps words (acronyms)
-    acronyms = re.findall(r'\b[A-Z]{2,}\b', text)
-    terms.extend(acronyms)
-    
-    # Find capitalized words (not at sentence start)
-    capitalized = re.findall(r'(?<!^)(?<!\. )\b[A-Z][a-z]+\b', text)
-    terms.extend(capitalized)
-    
-    # Count and return unique terms that appear multiple times
-    term_freq = Counter(terms)
+    # Acronyms and capitalized words (not at sentence start) that appear multiple times
+    term_freq = _as_analysis(text).technical_term_counts
     return [term for term, count in term_freq.items() if count > 1]
 
-def extract_numbers_and_stats(text: str) -> Dict[str, List[str]]:
+
+def extract_numbers_and_stats(text: Union[str, TextAnalysis]) -> Dict[str, List[str]]:
     """
     Extract numbers, percentages, and statistics from text
     
@@ -149,32 +331,11 @@ def extract_numbers_and_stats(text: str) -> Dict[str, List[str]]:
     Returns:
         Dictionary with categories of numerical data
     """
-    data = {
-        'percentages': [],
-        'numbers': [],
-        'dates': [],
-        'measurements': []
-    }
-    
-    # Percentages
-    percentages = re.findall(r'\d+\.?\d*\s*%', text)
-    data['percentages'] = list(set(percentages))
-    
-    # Numbers with context
-    numbers = re.findall(r'\d+\.?\d*\s+(?:million|billion|thousand|hundred)', text, re.IGNORECASE)
-    data['numbers'] = list(set(numbers))
-    
-    # Years
-    years = re.findall(r'\b(19|20)\d{2}\b', text)
-    data['dates'] = list(set(years))
-    
-    # Measurements
-    measurements = re.findall(r'\d+\.?\d*\s*(?:kg|g|m|cm|km|ml|l|°C|°F)', text)
-    data['measurements'] = list(set(measurements))
-    
-    return data
+    # Copy so callers cannot modify the memoized lists
+    return {category: list(values) for category, values in _as_analysis(text).numbers_and_stats.items()}
+
 
-def create_keyword_cloud_data(keywords: List[str], text: str) -> Dict[str, int]:
+def create_keyword_cloud_data(keywords: List[str], text: Union[str, TextAnalysis]) -> Dict[str, int]:
     """
     Create data for a word cloud with keyword frequencies
     
@@ -185,17 +346,17 @@ def create_keyword_cloud_data(keywords: List[str], text: str) -> Dict[str, int]:
     Returns:
         Dictionary with keyword: frequency pairs
     """
-    text_lower = text.lower()
+    index = _as_analysis(text).index
     
     keyword_freq = {}
     for keyword in keywords:
-        count = text_lower.count(keyword.lower())
+        count = index.count(keyword)
         if count > 0:
             keyword_freq[keyword] = count
     
     return keyword_freq
 
-def find_related_terms(keyword: str, text: str, window_size: int = 20) -> List[str]:
+def find_related_terms(keyword: str, text: Union[str, TextAnalysis], window_size: int = 20) -> List[str]:
     """
     Find terms that frequently appear near a keyword
     
@@ -207,25 +368,11 @@ def find_related_terms(keyword: str, text: str, window_size: int = 20) -> List[s
     Returns:
         List of related terms
     """
-    text_lower = text.lower()
-    keyword_lower = keyword.lower()
-    
-    # Find all occurrences
-    words = text_lower.split()
-    related = []
-    
-    for i, word in enumerate(words):
-        if keyword_lower in word:
-            # Get surrounding words
-            start = max(0, i - window_size)
-            end = min(len(words), i + window_size + 1)
-            
-            context_words = words[start:i] + words[i+1:end]
-            related.extend(context_words)
+    # Counts of surrounding words for every token containing the keyword
+    context_freq = _as_analysis(text).index.cooccurrences(keyword, window_size)
     
     # Filter and count
-    filtered = [w for w in related if w not in STOP_WORDS and len(w) > 3]
-    word_freq = Counter(filtered)
+    word_freq = Counter({w: n for w, n in context_freq.items() if w not in STOP_WORDS and len(w) > 3})
     
     return [word for word, _ in word_freq.most_common(10)]
 
@@ -279,23 +426,17 @@ def highlight_keywords_in_text(text: str, keywords: List[str], max_length: int =
         Text snippet with highlighted keywords
     """
     # Find first occurrence of any keyword
-    text_lower = text.lower()
-    first_pos = len(text)
-    
-    for keyword in keywords:
-        pos = text_lower.find(keyword.lower())
-        if pos != -1 and pos < first_pos:
-            first_pos = pos
+    first_pos = first_match(text, keywords)
+    if first_pos == -1:
+        first_pos = len(text)
     
     # Extract snippet around first keyword
     start = max(0, first_pos - 100)
     end = min(len(text), start + max_length)
     snippet = text[start:end]
     
-    # Highlight keywords
-    for keyword in keywords:
-        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-        snippet = pattern.sub(f"**{keyword}**", snippet)
+    # Highlight all keywords in one pass
+    snippet = highlight(snippet, keywords, whole_words=False)
     
     if start > 0:
         snippet = "..." + snippet
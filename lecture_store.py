@@ -0,0 +1,196 @@
+import os
+import re
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from keyword_utils import highlight_keywords_in_text
+
+DATA_DIR = os.getenv("LECTUREAI_DATA_DIR", ".data")
+STORE_DB_PATH = os.getenv("LECTUREAI_STORE_DB", os.path.join(DATA_DIR, "lectures.sqlite3"))
+
+# bm25 column weights for lectures_fts(name, keywords, notes, transcript)
+RANK_WEIGHTS = (5.0, 3.0, 2.0, 1.0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lectures (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    file_hash TEXT,
+    file_size INTEGER,
+    created REAL NOT NULL,
+    keywords TEXT NOT NULL,
+    notes TEXT NOT NULL,
+    transcript TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lectures_file_hash ON lectures (file_hash);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS lectures_fts USING fts5(
+    name, keywords, notes, transcript,
+    content='lectures', content_rowid='id', tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS lectures_ai AFTER INSERT ON lectures BEGIN
+    INSERT INTO lectures_fts (rowid, name, keywords, notes, transcript)
+    VALUES (new.id, new.name, new.keywords, new.notes, new.transcript);
+END;
+CREATE TRIGGER IF NOT EXISTS lectures_ad AFTER DELETE ON lectures BEGIN
+    INSERT INTO lectures_fts (lectures_fts, rowid, name, keywords, notes, transcript)
+    VALUES ('delete', old.id, old.name, old.keywords, old.notes, old.transcript);
+END;
+CREATE TRIGGER IF NOT EXISTS lectures_au AFTER UPDATE ON lectures BEGIN
+    INSERT INTO lectures_fts (lectures_fts, rowid, name, keywords, notes, transcript)
+    VALUES ('delete', old.id, old.name, old.keywords, old.notes, old.transcript);
+    INSERT INTO lectures_fts (rowid, name, keywords, notes, transcript)
+    VALUES (new.id, new.name, new.keywords, new.notes, new.transcript);
+END;
+"""
+
+_initialized = set()
+
+@contextmanager
+def _connect(db_path: str = STORE_DB_PATH) -> Iterator[sqlite3.Connection]:
+    if db_path not in _initialized:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        if db_path not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            _initialized.add(db_path)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _row_to_lecture(row: sqlite3.Row) -> Dict[str, Any]:
+    lecture = dict(row)
+    lecture['keywords'] = json.loads(lecture['keywords'])
+    return lecture
+
+def save_lecture(name: str, transcript: str, notes: str, keywords: List[str],
+                 file_hash: Optional[str] = None, file_size: Optional[int] = None,
+                 db_path: str = STORE_DB_PATH) -> int:
+    """
+    Persist a processed lecture and index it for search
+
+    A lecture with the same file hash is replaced rather than duplicated.
+
+    Args:
+        name: Original file name
+        transcript: Transcript text
+        notes: Generated notes
+        keywords: Extracted keywords
+        file_hash: Content hash of the recording, if known
+        file_size: Size of the recording in bytes, if known
+
+    Returns:
+        Lecture ID
+    """
+    with _connect(db_path) as conn:
+        if file_hash:
+            conn.execute("DELETE FROM lectures WHERE file_hash = ?", (file_hash,))
+        cursor = conn.execute(
+            "INSERT INTO lectures (name, file_hash, file_size, created, keywords, notes, transcript) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name, file_hash, file_size, time.time(), json.dumps(keywords), notes, transcript)
+        )
+        return cursor.lastrowid
+
+def get_lecture(lecture_id: int, db_path: str = STORE_DB_PATH) -> Optional[Dict[str, Any]]:
+    """Load a stored lecture by ID"""
+    with _connect(db_path) as conn:
+        row = conn.execute("SELECT * FROM lectures WHERE id = ?", (lecture_id,)).fetchone()
+    return _row_to_lecture(row) if row else None
+
+def find_by_hash(file_hash: str, db_path: str = STORE_DB_PATH) -> Optional[Dict[str, Any]]:
+    """Load the stored lecture for a recording, so it is not processed twice"""
+    with _connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT * FROM lectures WHERE file_hash = ? ORDER BY created DESC LIMIT 1", (file_hash,)
+        ).fetchone()
+    return _row_to_lecture(row) if row else None
+
+def iter_lectures(db_path: str = STORE_DB_PATH) -> Iterator[Dict[str, Any]]:
+    """Yield every stored lecture (id, name, created, transcript), oldest first"""
+    with _connect(db_path) as conn:
+        for row in conn.execute("SELECT id, name, created, transcript FROM lectures ORDER BY id"):
+            yield dict(row)
+
+def query_terms(query: str) -> List[str]:
+    """Search terms of a free-text query"""
+    return re.findall(r'\w+', query)
+
+def to_fts_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every term required, prefix matched
+
+    Args:
+        query: User input
+
+    Returns:
+        FTS5 MATCH expression, empty if the query has no terms
+    """
+    return ' '.join(f'"{term}"*' for term in query_terms(query))
+
+def search_lectures(query: str, limit: int = 20, snippet_length: int = 300,
+                    db_path: str = STORE_DB_PATH) -> List[Dict[str, Any]]:
+    """
+    Full-text search across names, keywords, notes and transcripts
+
+    Args:
+        query: Free-text query
+        limit: Maximum number of results
+        snippet_length: Maximum characters per snippet
+
+    Returns:
+        Best matches first, each with 'id', 'name', 'created', 'keywords',
+        'score' (lower is better) and a highlighted 'snippet'
+    """
+    fts_query = to_fts_query(query)
+    if not fts_query:
+        return []
+
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    with _connect(db_path) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT l.id, l.name, l.created, l.keywords, l.notes, l.transcript, m.score
+            FROM (
+                SELECT rowid, bm25(lectures_fts, {weights}) AS score
+                FROM lectures_fts
+                WHERE lectures_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+            ) m
+            JOIN lectures l ON l.id = m.rowid
+            ORDER BY m.score
+            """,
+            (fts_query, limit)
+        ).fetchall()
+
+    terms = query_terms(query)
+    results = []
+    for row in rows:
+        # Show the transcript passage if it mentions a term, else the notes
+        transcript_lower = row['transcript'].lower()
+        text = row['transcript'] if any(t.lower() in transcript_lower for t in terms) else row['notes']
+        results.append({
+            'id': row['id'],
+            'name': row['name'],
+            'created': row['created'],
+            'keywords': json.loads(row['keywords']),
+            'score': row['score'],
+            'snippet': highlight_keywords_in_text(text, terms, max_length=snippet_length),
+        })
+    return results
+
+def count_lectures(db_path: str = STORE_DB_PATH) -> int:
+    """Number of stored lectures"""
+    with _connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM lectures").fetchone()[0]
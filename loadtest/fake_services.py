@@ -0,0 +1,353 @@
+"""
+Local stand-ins for the AssemblyAI and Groq HTTP APIs
+
+Serves the endpoints the app uses, on one port:
+    POST /v2/upload                      -> {"upload_url": ...}
+    POST /v2/transcript                  -> {"id": ..., "status": "queued"}
+    GET  /v2/transcript/<id>             -> processing ... completed + text
+    POST /openai/v1/chat/completions     -> completion, or SSE chunks if "stream"
+
+Latency (log-normal, given as median and p95), error rates, random 429s
+and an optional requests-per-minute limit are configurable, so the
+pipeline can be load-tested offline. Point the app at it with
+ASSEMBLYAI_BASE_URL and GROQ_BASE_URL:
+
+    python -m loadtest.fake_services --port 8765 --chat-rate-limit-rate 0.05
+"""
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from benchmarks.synthetic import synthetic_transcript, synthetic_notes, TOPIC_TERMS
+
+@dataclass
+class Latency:
+    """Log-normal latency given by its median and 95th percentile in milliseconds"""
+    median_ms: float
+    p95_ms: float
+
+    def sample(self, rng: random.Random) -> float:
+        """Seconds to wait"""
+        if self.median_ms <= 0:
+            return 0.0
+        sigma = math.log(max(self.p95_ms, self.median_ms) / self.median_ms) / 1.645
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+@dataclass
+class FakeConfig:
+    upload: Latency = field(default_factory=lambda: Latency(200, 800))
+    # Time from submission until a transcript completes, plus per-MB processing time
+    transcribe: Latency = field(default_factory=lambda: Latency(2000, 6000))
+    transcribe_seconds_per_mb: float = 0.5
+    words_per_mb: int = 150
+    transcribe_error_rate: float = 0.0
+    # Time to first token, then a delay per streamed chunk
+    chat_first_token: Latency = field(default_factory=lambda: Latency(400, 1500))
+    chat_chunk_ms: float = 5.0
+    chat_error_rate: float = 0.0
+    chat_rate_limit_rate: float = 0.0
+    chat_requests_per_minute: int = 0
+    retry_after_seconds: float = 2.0
+    upload_error_rate: float = 0.0
+    seed: int = 0
+
+class FakeState:
+    """Uploads, transcripts, counters and the rate-limit window, shared by handler threads"""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.uploads: Dict[str, int] = {}
+        self.transcripts: Dict[str, Dict[str, Any]] = {}
+        self.chat_window: deque = deque()
+        self.counters: Dict[str, int] = {}
+
+    def count(self, name: str):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def chance(self, rate: float) -> bool:
+        with self.lock:
+            return self.rng.random() < rate
+
+    def sample(self, latency: Latency) -> float:
+        with self.lock:
+            return latency.sample(self.rng)
+
+    def over_rpm(self) -> bool:
+        """Record a chat request; True if it exceeds the per-minute limit"""
+        limit = self.config.chat_requests_per_minute
+        if not limit:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.chat_window and now - self.chat_window[0] > 60:
+                self.chat_window.popleft()
+            if len(self.chat_window) >= limit:
+                return True
+            self.chat_window.append(now)
+            return False
+
+def _seed_for(text: str) -> int:
+    return int(hashlib.sha1(text.encode('utf-8')).hexdigest()[:8], 16)
+
+def _completion_text(prompt: str, max_tokens: int) -> str:
+    seed = _seed_for(prompt)
+    if 'comma-separated' in prompt:
+        return ', '.join(random.Random(seed).sample(TOPIC_TERMS, 10))
+    # Roughly 0.75 words per token, capped to keep responses realistic
+    return synthetic_notes(min(1500, int(max_tokens * 0.75)), seed=seed)
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: FakeState = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path == '/v2/upload':
+            self._upload()
+        elif self.path == '/v2/transcript':
+            self._create_transcript()
+        elif self.path.endswith('/chat/completions'):
+            self._chat()
+        else:
+            self._read_body()
+            self._send_json(404, {'error': f'Unknown endpoint {self.path}'})
+
+    def do_GET(self):
+        if self.path.startswith('/v2/transcript/'):
+            self._get_transcript(self.path.rsplit('/', 1)[-1])
+        elif self.path == '/stats':
+            with self.state.lock:
+                counters = dict(self.state.counters)
+            self._send_json(200, {'counters': counters, 'config': asdict(self.state.config)})
+        else:
+            self._send_json(404, {'error': f'Unknown endpoint {self.path}'})
+
+    def _upload(self):
+        state = self.state
+        size = len(self._read_body())
+        time.sleep(state.sample(state.config.upload))
+        if state.chance(state.config.upload_error_rate):
+            state.count('upload_errors')
+            self._send_json(500, {'error': 'Simulated upload failure'})
+            return
+
+        upload_id = uuid.uuid4().hex
+        with state.lock:
+            state.uploads[upload_id] = size
+        state.count('uploads')
+        host = self.headers.get('Host', 'localhost')
+        self._send_json(200, {'upload_url': f"http://{host}/uploads/{upload_id}"})
+
+    def _create_transcript(self):
+        state = self.state
+        request = json.loads(self._read_body() or b'{}')
+        audio_url = request.get('audio_url', '')
+        with state.lock:
+            size = state.uploads.pop(audio_url.rsplit('/', 1)[-1], 0)
+
+        transcript_id = uuid.uuid4().hex
+        megabytes = size / 1e6
+        seconds = state.sample(state.config.transcribe) + megabytes * state.config.transcribe_seconds_per_mb
+        with state.lock:
+            state.transcripts[transcript_id] = {
+                'audio_url': audio_url,
+                'ready_at': time.monotonic() + seconds,
+                'words': max(20, int(megabytes * state.config.words_per_mb)),
+                'fail': state.rng.random() < state.config.transcribe_error_rate,
+            }
+        state.count('transcripts')
+        self._send_json(200, {'id': transcript_id, 'audio_url': audio_url, 'status': 'queued'})
+
+    def _get_transcript(self, transcript_id: str):
+        state = self.state
+        with state.lock:
+            job = state.transcripts.get(transcript_id)
+        if job is None:
+            self._send_json(404, {'error': 'Transcript not found'})
+            return
+
+        state.count('transcript_polls')
+        response = {'id': transcript_id, 'audio_url': job['audio_url']}
+        if time.monotonic() < job['ready_at']:
+            response['status'] = 'processing'
+        elif job['fail']:
+            response.update(status='error', error='Simulated transcription failure')
+        else:
+            response.update(status='completed', text=synthetic_transcript(job['words'], seed=_seed_for(transcript_id)))
+            with state.lock:
+                state.transcripts.pop(transcript_id, None)
+        self._send_json(200, response)
+
+    def _chat(self):
+        state = self.state
+        config = state.config
+        request = json.loads(self._read_body() or b'{}')
+        state.count('chat_requests')
+
+        if state.over_rpm() or state.chance(config.chat_rate_limit_rate):
+            state.count('chat_429')
+            self._send_json(429, {'error': {'message': 'Rate limit reached (simulated)', 'type': 'rate_limit_exceeded'}},
+                            headers={'Retry-After': str(config.retry_after_seconds)})
+            return
+
+        time.sleep(state.sample(config.chat_first_token))
+        if state.chance(config.chat_error_rate):
+            state.count('chat_errors')
+            self._send_json(500, {'error': {'message': 'Simulated server error', 'type': 'internal_error'}})
+            return
+
+        prompt = '\n'.join(m.get('content', '') for m in request.get('messages', []))
+        text = _completion_text(prompt, int(request.get('max_tokens') or 1024))
+        usage = {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(text) // 4}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        base = {'id': f"chatcmpl-{uuid.uuid4().hex}", 'created': int(time.time()), 'model': request.get('model')}
+
+        if request.get('stream'):
+            self._stream(base, text, usage)
+        else:
+            self._send_json(200, {
+                **base,
+                'object': 'chat.completion',
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+
+    def _stream(self, base: Dict[str, Any], text: str, usage: Dict[str, int]):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def send_event(payload: str):
+            data = f"data: {payload}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        chunk_size = 24
+        for start in range(0, len(text), chunk_size):
+            send_event(json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [
+                {'index': 0, 'delta': {'content': text[start:start + chunk_size]}, 'finish_reason': None}]}))
+            time.sleep(self.state.config.chat_chunk_ms / 1000)
+        send_event(json.dumps({**base, 'object': 'chat.completion.chunk',
+                               'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                               'x_groq': {'usage': usage}}))
+        send_event('[DONE]')
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def make_server(config: FakeConfig, host: str = '127.0.0.1', port: int = 0) -> Tuple[ThreadingHTTPServer, FakeState]:
+    """
+    Create (but do not start) a fake API server
+
+    Args:
+        config: Latency and error settings
+        host: Interface to bind
+        port: Port to bind, 0 picks a free one
+
+    Returns:
+        Tuple of (server, shared state); the bound port is server.server_address[1]
+    """
+    state = FakeState(config)
+    handler = type('BoundFakeHandler', (FakeHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, state
+
+def start_in_background(config: FakeConfig, host: str = '127.0.0.1', port: int = 0) -> Tuple[ThreadingHTTPServer, FakeState, str]:
+    """
+    Start a fake API server on a daemon thread
+
+    Returns:
+        Tuple of (server, shared state, base URL)
+    """
+    server, state = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, name="fake-services", daemon=True).start()
+    return server, state, f"http://{host}:{server.server_address[1]}"
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Command-line options for every FakeConfig field"""
+    defaults = FakeConfig()
+    group = parser.add_argument_group('fake service behaviour')
+    group.add_argument('--upload-ms', type=float, nargs=2, metavar=('MEDIAN', 'P95'),
+                       default=[defaults.upload.median_ms, defaults.upload.p95_ms])
+    group.add_argument('--transcribe-ms', type=float, nargs=2, metavar=('MEDIAN', 'P95'),
+                       default=[defaults.transcribe.median_ms, defaults.transcribe.p95_ms])
+    group.add_argument('--transcribe-seconds-per-mb', type=float, default=defaults.transcribe_seconds_per_mb)
+    group.add_argument('--words-per-mb', type=int, default=defaults.words_per_mb)
+    group.add_argument('--chat-first-token-ms', type=float, nargs=2, metavar=('MEDIAN', 'P95'),
+                       default=[defaults.chat_first_token.median_ms, defaults.chat_first_token.p95_ms])
+    group.add_argument('--chat-chunk-ms', type=float, default=defaults.chat_chunk_ms)
+    group.add_argument('--upload-error-rate', type=float, default=defaults.upload_error_rate)
+    group.add_argument('--transcribe-error-rate', type=float, default=defaults.transcribe_error_rate)
+    group.add_argument('--chat-error-rate', type=float, default=defaults.chat_error_rate)
+    group.add_argument('--chat-rate-limit-rate', type=float, default=defaults.chat_rate_limit_rate,
+                       help="Share of chat requests answered with 429")
+    group.add_argument('--chat-rpm', type=int, default=defaults.chat_requests_per_minute,
+                       help="Answer 429 above this many chat requests per minute (0: unlimited)")
+    group.add_argument('--retry-after', type=float, default=defaults.retry_after_seconds)
+    group.add_argument('--seed', type=int, default=defaults.seed)
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        upload=Latency(*args.upload_ms),
+        transcribe=Latency(*args.transcribe_ms),
+        transcribe_seconds_per_mb=args.transcribe_seconds_per_mb,
+        words_per_mb=args.words_per_mb,
+        transcribe_error_rate=args.transcribe_error_rate,
+        chat_first_token=Latency(*args.chat_first_token_ms),
+        chat_chunk_ms=args.chat_chunk_ms,
+        chat_error_rate=args.chat_error_rate,
+        chat_rate_limit_rate=args.chat_rate_limit_rate,
+        chat_requests_per_minute=args.chat_rpm,
+        retry_after_seconds=args.retry_after,
+        upload_error_rate=args.upload_error_rate,
+        seed=args.seed,
+    )
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve fake AssemblyAI and Groq endpoints for load testing")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server, _ = make_server(config_from_args(args), args.host, args.port)
+    base_url = f"http://{args.host}:{server.server_address[1]}"
+    print(f"Fake services listening on {base_url}")
+    print(f"  ASSEMBLYAI_BASE_URL={base_url} GROQ_BASE_URL={base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Drive simulated users through the lecture pipeline against fake services
+
+Each user repeatedly uploads a recording and runs the same stages as the
+app: transcription, then keyword extraction next to streamed notes. By
+default the fake AssemblyAI/Groq services are started in-process, so the
+whole run is offline:
+
+    python -m loadtest.load_generator --users 20 --lectures-per-user 3
+    python -m loadtest.load_generator --users 50 --chat-rpm 300 --chat-rate-limit-rate 0.02 --output load.json
+
+Pass --base-url to target fake services started separately with
+python -m loadtest.fake_services.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from loadtest.fake_services import add_config_arguments, config_from_args, start_in_background
+
+STAGES = ['transcribe', 'keywords', 'notes_first_token', 'notes', 'total']
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class LoadRun:
+    """Collects per-stage timings and errors from all simulated users"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.attempts: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self.errors: Dict[str, List[str]] = {stage: [] for stage in STAGES}
+
+    def record(self, stage: str, seconds: float = None, error: str = None):
+        with self.lock:
+            self.attempts[stage] += 1
+            if error is not None:
+                self.errors[stage].append(error)
+            else:
+                self.timings[stage].append(seconds)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        stages = {}
+        for stage in STAGES:
+            values = self.timings[stage]
+            attempts = self.attempts[stage]
+            stages[stage] = {
+                'count': len(values),
+                'errors': len(self.errors[stage]),
+                'error_rate': len(self.errors[stage]) / attempts if attempts else 0.0,
+                'p50': percentile(values, 50) if values else None,
+                'p95': percentile(values, 95) if values else None,
+                'p99': percentile(values, 99) if values else None,
+                'sample_errors': sorted(set(self.errors[stage]))[:5],
+            }
+        completed = stages['total']['count']
+        return {
+            'seconds': elapsed,
+            'lectures_completed': completed,
+            'lectures_per_minute': completed / elapsed * 60 if elapsed else 0.0,
+            'stages': stages,
+        }
+
+def make_recordings(directory: str, count: int, min_mb: float, max_mb: float, seed: int) -> List[str]:
+    """Write random-byte files standing in for uploads (the fake service only looks at their size)"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"recording_{i}.mp3")
+        with open(path, 'wb') as f:
+            f.write(rng.randbytes(int(rng.uniform(min_mb, max_mb) * 1e6)))
+        paths.append(path)
+    return paths
+
+def simulate_user(run: LoadRun, recordings: List[str], lectures: int, user: int):
+    # Imported after main() has pointed the API endpoints at the fake services
+    from api_models import transcribe_audio, extract_keywords, stream_notes, STREAM_RESET
+
+    rng = random.Random(user)
+    for _ in range(lectures):
+        lecture_start = time.perf_counter()
+        try:
+            start = time.perf_counter()
+            transcript = transcribe_audio(rng.choice(recordings), use_cache=False, preprocess=False, segmented=False)
+            if not transcript:
+                raise Exception("Transcription returned no text")
+            run.record('transcribe', time.perf_counter() - start)
+        except Exception as e:
+            run.record('transcribe', error=str(e))
+            run.record('total', error=f"transcribe: {str(e)}")
+            continue
+
+        failed = None
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            start = time.perf_counter()
+
+            def timed_keywords():
+                keywords = extract_keywords(transcript, engine="llm", use_cache=False)
+                # extract_keywords reports failures as an empty list
+                if not keywords:
+                    raise Exception("No keywords returned")
+                return time.perf_counter() - start
+
+            keywords_future = executor.submit(timed_keywords)
+
+            try:
+                first_token = None
+                for delta in stream_notes(transcript, use_cache=False):
+                    if first_token is None and delta is not STREAM_RESET:
+                        first_token = time.perf_counter() - start
+                        run.record('notes_first_token', first_token)
+                run.record('notes', time.perf_counter() - start)
+            except Exception as e:
+                run.record('notes', error=str(e))
+                failed = f"notes: {str(e)}"
+
+            try:
+                run.record('keywords', keywords_future.result())
+            except Exception as e:
+                run.record('keywords', error=str(e))
+                failed = failed or f"keywords: {str(e)}"
+
+        if failed:
+            run.record('total', error=failed)
+        else:
+            run.record('total', time.perf_counter() - lecture_start)
+
+def print_report(summary: Dict[str, Any]):
+    print(f"\n{summary['lectures_completed']} lectures in {summary['seconds']:.1f}s "
+          f"({summary['lectures_per_minute']:.1f} lectures/min)")
+    print(f"{'stage':18} {'count':>6} {'errors':>7} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8}")
+    for stage, stats in summary['stages'].items():
+        def fmt(value):
+            return f"{value:8.2f}" if value is not None else f"{'-':>8}"
+        print(f"{stage:18} {stats['count']:6d} {stats['error_rate'] * 100:6.1f}% "
+              f"{fmt(stats['p50'])} {fmt(stats['p95'])} {fmt(stats['p99'])}")
+        for error in stats['sample_errors']:
+            print(f"    {error[:120]}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the lecture pipeline against fake API services")
+    parser.add_argument('--users', type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument('--lectures-per-user', type=int, default=2)
+    parser.add_argument('--ramp-up', type=float, default=5.0, help="Seconds over which users start")
+    parser.add_argument('--recording-mb', type=float, nargs=2, default=[2.0, 20.0], metavar=('MIN', 'MAX'),
+                        help="Size range of simulated uploads")
+    parser.add_argument('--poll-interval', type=float, default=0.5, help="Shortest AssemblyAI polling interval in seconds")
+    parser.add_argument('--groq-rpm', type=float, default=100000, help="Client-side Groq request budget")
+    parser.add_argument('--groq-tpm', type=float, default=100000000, help="Client-side Groq token budget")
+    parser.add_argument('--base-url', help="Use fake services already running at this URL")
+    parser.add_argument('--output', '-o', help="Write the summary as JSON to this file")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = state = None
+    base_url = args.base_url
+    if not base_url:
+        server, state, base_url = start_in_background(config_from_args(args))
+        print(f"Fake services on {base_url}")
+
+    work_dir = tempfile.mkdtemp(prefix="lectureai-load-")
+    # Must be set before api_models (and the rate limiter) are imported
+    os.environ.update({
+        'ASSEMBLYAI_BASE_URL': base_url,
+        'GROQ_BASE_URL': base_url,
+        'GROQ_RPM': str(args.groq_rpm),
+        'GROQ_TPM': str(args.groq_tpm),
+        'LECTUREAI_POLL_MIN_SECONDS': str(args.poll_interval),
+        'LECTUREAI_CACHE_DIR': os.path.join(work_dir, 'cache'),
+        'LECTUREAI_RATE_LIMIT_DB': os.path.join(work_dir, 'rate_limits.sqlite3'),
+    })
+    os.environ.setdefault('ASSEMBLYAI_API_KEY', 'fake-assemblyai-key')
+    os.environ.setdefault('GROQ_API_KEY', 'fake-groq-key')
+
+    from api_models import rate_limit_stats
+
+    recordings = make_recordings(work_dir, min(args.users, 8), *args.recording_mb, seed=args.seed)
+    run = LoadRun()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users, thread_name_prefix="load-user") as executor:
+        futures = []
+        for user in range(args.users):
+            futures.append(executor.submit(simulate_user, run, recordings, args.lectures_per_user, user))
+            time.sleep(args.ramp_up / max(1, args.users))
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    summary = run.summary(elapsed)
+    summary['users'] = args.users
+    summary['rate_limiter'] = rate_limit_stats()
+    if state is not None:
+        with state.lock:
+            summary['fake_services'] = dict(state.counters)
+
+    print_report(summary)
+    limiter = summary['rate_limiter']
+    print(f"\nRate limiter: {limiter['total_wait']:.1f}s waited, max queue depth {limiter['max_queue_depth']}, "
+          f"{limiter['rate_limited']} 429 pauses")
+    if 'fake_services' in summary:
+        print(f"Fake services: {summary['fake_services']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+    if server is not None:
+        server.shutdown()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
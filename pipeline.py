@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional
+from api_models import generate_notes, extract_keywords, summarize_text, KEYWORD_ENGINE
+from rate_limiter import current_priority, priority
+from tracing import span, attach, current_span
+
+# Default per-task time budgets in seconds
+DEFAULT_TIMEOUTS = {
+    'keywords': 60,
+    'notes': 300,
+    'summary': 120,
+}
+
+def run_concurrently(tasks: Dict[str, Callable[[], Any]], timeouts: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Run independent tasks in parallel and collect whatever finishes in time
+
+    Args:
+        tasks: Mapping of task name to a zero-argument callable
+        timeouts: Per-task time budget in seconds, measured from submission
+
+    Returns:
+        Dictionary with 'results', 'errors' and 'timings' keyed by task name
+    """
+    timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+    results, errors, timings = {}, {}, {}
+
+    # Worker threads do not inherit the caller's context, so carry its priority and span over
+    level = current_priority()
+    parent = current_span()
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        try:
+            with priority(level), attach(parent):
+                return fn()
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    executor = ThreadPoolExecutor(max_workers=max(1, len(tasks)), thread_name_prefix="post-transcription")
+    started = time.monotonic()
+    pending = {executor.submit(timed, name, fn): name for name, fn in tasks.items()}
+    deadlines = {name: started + timeouts.get(name, max(DEFAULT_TIMEOUTS.values())) for name in tasks}
+
+    try:
+        while pending:
+            now = time.monotonic()
+
+            # Give up on tasks whose budget is spent; their threads finish in the background
+            for future, name in list(pending.items()):
+                if not future.done() and now >= deadlines[name]:
+                    future.cancel()
+                    errors[name] = f"Timed out after {timeouts.get(name)}s"
+                    del pending[future]
+
+            if not pending:
+                break
+
+            next_deadline = min(deadlines[name] for name in pending.values())
+            done, _ = wait(list(pending), timeout=max(0, next_deadline - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"Post-transcription task '{name}' failed: {str(e)}")
+                    errors[name] = str(e)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return {'results': results, 'errors': errors, 'timings': timings}
+
+def run_post_transcription(transcript: str, include_summary: bool = False, include_notes: bool = True,
+                           timeouts: Optional[Dict[str, float]] = None,
+                           keyword_engine: str = KEYWORD_ENGINE) -> Dict[str, Any]:
+    """
+    Fan out keyword extraction, note generation and (optionally) summarization
+
+    Args:
+        transcript: The transcribed text
+        include_summary: Also produce a short summary
+        include_notes: Generate notes here; disable when notes are streamed separately
+        timeouts: Per-task time budget overrides in seconds
+        keyword_engine: "llm" or "local" (see api_models.extract_keywords)
+
+    Returns:
+        Dictionary with 'keywords', 'notes', 'summary', 'errors' and 'timings';
+        a task that failed or timed out leaves its value as None
+    """
+    tasks = {'keywords': lambda: extract_keywords(transcript, engine=keyword_engine)}
+    if include_notes:
+        tasks['notes'] = lambda: generate_notes(transcript)
+    if include_summary:
+        tasks['summary'] = lambda: summarize_text(transcript)
+
+    with span("post_transcription", tasks=",".join(tasks)) as stage_span:
+        outcome = run_concurrently(tasks, timeouts)
+        stage_span.set(failed=",".join(outcome['errors']))
+    results = outcome['results']
+
+    return {
+        'keywords': results.get('keywords'),
+        'notes': results.get('notes'),
+        'summary': results.get('summary'),
+        'errors': outcome['errors'],
+        'timings': outcome['timings'],
+    }
@@ -0,0 +1,213 @@
+import os
+import re
+import time
+import difflib
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List
+from chunking import split_sentences
+
+# Set LECTUREAI_PROMPT_COMPRESSION=0 to send transcripts unmodified
+PROMPT_COMPRESSION = os.getenv("LECTUREAI_PROMPT_COMPRESSION", "1") != "0"
+
+# Sentences whose word sequence matches a recent sentence's at least this
+# closely (difflib ratio, word order included) are treated as restatements
+# and dropped
+NEAR_DUPLICATE_THRESHOLD = 0.8
+NEAR_DUPLICATE_WINDOW = 12
+NEAR_DUPLICATE_MIN_WORDS = 4
+
+# Hesitations and verbal tics that carry no content. "so", "actually" and
+# similar words are only removed when followed by a comma, and "like" only
+# between commas or opening a sentence ("Like, ..."), since they are often
+# meaningful ("Things I like, such as ...").
+FILLER_PATTERN = re.compile(
+    r"(?:,\s*)?\b(?:u+m+|u+h+m*|e+r+m+|a+h+|hmm+|mm+-?hmm+)\b,?"
+    r"|(?:,\s*)?(?:^|(?<=[\s,]))(?:you know|i mean|sort of|kind of|basically|actually|literally|okay so|right so|so yeah),\s*"
+    r"|,\s*like,\s*|(?:^|(?<=[.!?]\s))like,\s*",
+    re.IGNORECASE
+)
+
+# Immediate repetitions of alphabetic words ("the the", "I I think").
+# Only the short function words speakers trip over are collapsed; numbers,
+# identifiers and deliberate repeats ("very very", "no no") are kept, as
+# are grammatical doubles like "that that" and "had had".
+STUTTER_PATTERN = re.compile(r"\b([^\W\d_]+)(?:\s+\1\b)+", re.IGNORECASE)
+STUTTER_WORDS = frozenset({
+    'a', 'an', 'the', 'i', 'we', 'you', 'he', 'she', 'it', 'they', 'is', 'are', 'was', 'to', 'of',
+    'in', 'on', 'at', 'for', 'and', 'but', 'or', 'if', 'this', 'my', 'our', 'your', 'what', 'when',
+})
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Numbers, single letters (variables) and math symbols: sentences differing
+# in any of these are never merged, however similar the rest is
+EXACT_TOKEN_PATTERN = re.compile(r"\d+(?:[.,]\d+)*|(?<!\w)[^\W\d_](?!\w)|[-+*/=<>^%$€£]")
+
+_stats_lock = threading.Lock()
+_stats = {'calls': 0, 'input_tokens': 0, 'output_tokens': 0}
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the LLM token count of English text
+
+    Counts words and punctuation marks, with one extra token for every
+    eight characters of long words, which tracks BPE tokenizers closely
+    enough for budgeting without loading one.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Estimated number of tokens (at least 1)
+    """
+    tokens = 0
+    for piece in TOKEN_PATTERN.findall(text):
+        tokens += 1 + (len(piece) - 1) // 8
+    return max(1, tokens)
+
+def remove_fillers(text: str) -> str:
+    """Remove filler words and stuttered repetitions"""
+    text = FILLER_PATTERN.sub(' ', text)
+    return STUTTER_PATTERN.sub(_collapse_stutter, text)
+
+def _collapse_stutter(match: re.Match) -> str:
+    word = match.group(1)
+    return word if word.lower() in STUTTER_WORDS else match.group(0)
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of whitespace and tidy spacing around punctuation"""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s+([,.!?;:])', r'\1', text)
+    text = re.sub(r'([,;:])(?:\s*[,;:])+', r'\1', text)
+    text = re.sub(r'([.!?])([A-Z])', r'\1 \2', text)
+    return text.strip()
+
+def _sentence_words(sentence: str) -> List[str]:
+    return re.findall(r'\w+', sentence.lower())
+
+def _near_duplicate(words: List[str], word_set: set, exact: List[str], other: tuple) -> bool:
+    other_words, other_set, other_exact = other
+    if exact != other_exact:
+        return False
+    # Cheap bag-of-words check first; word order decides
+    if len(word_set & other_set) / len(word_set | other_set) < NEAR_DUPLICATE_THRESHOLD:
+        return False
+    return difflib.SequenceMatcher(None, words, other_words, autojunk=False).ratio() >= NEAR_DUPLICATE_THRESHOLD
+
+def dedupe_sentences(sentences: List[str]) -> List[str]:
+    """
+    Drop repeated and near-duplicate sentences, keeping the first occurrence
+
+    Exact repeats (ignoring case and punctuation, but not symbols) are
+    dropped anywhere in the text; near duplicates only within the last
+    NEAR_DUPLICATE_WINDOW kept sentences, where speakers restate what they
+    just said. Near duplicates must match in word order and have the same
+    numbers, single-letter variables and symbols, so "3 not 4" never
+    replaces "4 not 3".
+
+    Args:
+        sentences: Sentences in order
+
+    Returns:
+        Sentences that are not restatements, in order
+    """
+    seen = set()
+    recent: List[tuple] = []
+    kept = []
+
+    for sentence in sentences:
+        words = _sentence_words(sentence)
+        if not words:
+            continue
+
+        exact = EXACT_TOKEN_PATTERN.findall(sentence.lower())
+        key = (' '.join(words), tuple(exact))
+        if key in seen:
+            continue
+
+        word_set = set(words)
+        if len(word_set) >= NEAR_DUPLICATE_MIN_WORDS and any(
+            _near_duplicate(words, word_set, exact, other) for other in recent
+        ):
+            continue
+
+        seen.add(key)
+        kept.append(sentence)
+        recent.append((words, word_set, exact))
+        if len(recent) > NEAR_DUPLICATE_WINDOW:
+            recent.pop(0)
+
+    return kept
+
+@lru_cache(maxsize=8)
+def compress_text(text: str) -> str:
+    """
+    Shrink a transcript before it is sent to an LLM
+
+    Removes fillers and false starts, drops repeated and near-duplicate
+    sentences and normalizes whitespace. Memoized, since keywords, notes and
+    summary usually compress the same transcript.
+
+    Args:
+        text: Raw transcript
+
+    Returns:
+        Compressed transcript
+    """
+    sentences = [_clean_sentence(s) for s in split_sentences(normalize_whitespace(text))]
+    return normalize_whitespace(' '.join(dedupe_sentences(sentences)))
+
+def _clean_sentence(sentence: str) -> str:
+    """Remove fillers from one sentence, keeping its casing"""
+    cleaned = normalize_whitespace(remove_fillers(sentence))
+    # A removed leading filler ("Um, the ...") takes the sentence's capital with it
+    if cleaned and sentence[0].isupper() and cleaned[0].islower() \
+            and sentence.split(None, 1)[0] != cleaned.split(None, 1)[0]:
+        cleaned = cleaned[0].upper() + cleaned[1:]
+    return cleaned
+
+def compress_prompt(text: str, label: str = "Prompt", enabled: bool = PROMPT_COMPRESSION) -> Dict[str, Any]:
+    """
+    Compress text for one LLM call and report the token savings
+
+    Args:
+        text: Text to be sent
+        label: Name of the call, used in the log line
+        enabled: Pass the text through unchanged when False
+
+    Returns:
+        Dictionary with 'text', 'input_tokens', 'output_tokens' and 'seconds'
+    """
+    start = time.perf_counter()
+    compressed = compress_text(text) if enabled else text
+
+    result = {
+        'text': compressed,
+        'input_tokens': estimate_tokens(text),
+        'output_tokens': estimate_tokens(compressed),
+        'seconds': time.perf_counter() - start,
+    }
+
+    with _stats_lock:
+        _stats['calls'] += 1
+        _stats['input_tokens'] += result['input_tokens']
+        _stats['output_tokens'] += result['output_tokens']
+
+    if enabled:
+        print(f"{label} compression: {result['input_tokens']} -> {result['output_tokens']} tokens "
+              f"in {result['seconds'] * 1000:.0f}ms")
+    return result
+
+def compression_stats() -> Dict[str, Any]:
+    """
+    Totals over all compress_prompt calls in this process
+
+    Returns:
+        Dictionary with call count, input/output token totals and the ratio saved
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['tokens_saved'] = stats['input_tokens'] - stats['output_tokens']
+    stats['saved_ratio'] = stats['tokens_saved'] / stats['input_tokens'] if stats['input_tokens'] else 0.0
+    return stats
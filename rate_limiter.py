@@ -0,0 +1,440 @@
+import os
+import time
+import heapq
+import sqlite3
+import asyncio
+import random
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+# Lower value = served first
+INTERACTIVE = 0
+BATCH = 1
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch'}
+
+# Account-wide Groq budgets (override to match your plan)
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_RPM", "30"))
+GROQ_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TPM", "30000"))
+
+# Processes sharing a data directory (the app, job workers, batch runs) draw
+# on one budget kept in this SQLite file; set it to "" for per-process budgets
+RATE_LIMIT_DB_PATH = os.getenv("LECTUREAI_RATE_LIMIT_DB",
+                               os.path.join(os.getenv("LECTUREAI_DATA_DIR", ".data"), "rate_limits.sqlite3"))
+
+# How often async callers waiting behind another request recheck the queue
+ASYNC_POLL_SECONDS = 0.05
+
+# Longest a caller sleeps before rechecking a budget other processes also draw on
+SHARED_POLL_SECONDS = 0.5
+
+# How long a waiting interactive request holds back batch requests in other processes
+PRIORITY_HOLD_SECONDS = 2.0
+
+_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+def current_priority() -> int:
+    """Priority of requests made from the current context"""
+    return _priority.get()
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """
+    Run the enclosed API calls at the given priority
+
+    Context variables do not flow into thread pools, so code that fans out
+    work must re-enter this context inside each worker.
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """
+    Exponential backoff with full jitter
+
+    Args:
+        attempt: Zero-based attempt number that just failed
+        base: Delay scale in seconds
+        cap: Maximum delay in seconds
+
+    Returns:
+        Seconds to wait before the next attempt
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read the Retry-After header from an HTTP error, if it has one
+
+    Args:
+        error: Exception raised by an API client
+
+    Returns:
+        Seconds to wait, or None if the server did not say
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    value = headers.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+def is_rate_limited(error: Exception) -> bool:
+    """Whether an API error is an HTTP 429"""
+    response = getattr(error, 'response', None)
+    return getattr(error, 'status_code', None) == 429 or getattr(response, 'status_code', None) == 429
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying: the server's Retry-After if given, else jittered backoff"""
+    retry_after = retry_after_seconds(error)
+    return retry_after if retry_after is not None else backoff_delay(attempt)
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at rate_per_minute
+
+    The balance may go negative when actual usage turns out higher than
+    reserved; later requests then wait for the debt to be repaid.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (requests larger than capacity need a full bucket)"""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= amount
+
+class LocalBudget:
+    """Requests and tokens buckets plus the 429 pause, private to this process"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+
+    def reserve(self, estimated_tokens: float, level: int) -> float:
+        """Take one request and the estimated tokens if both are available; otherwise seconds to wait"""
+        now = time.monotonic()
+        wait = max(
+            self.paused_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(estimated_tokens, now),
+        )
+        if wait <= 0:
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+        return wait
+
+    def adjust(self, tokens: float):
+        self.tokens.take(tokens)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def state(self) -> Dict[str, float]:
+        return {
+            'paused_for': max(0.0, self.paused_until - time.monotonic()),
+            'tokens_available': self.tokens.tokens,
+        }
+
+class SharedBudget:
+    """
+    The same buckets and pause kept in SQLite, shared by every process using the file
+
+    Each reservation is a single IMMEDIATE transaction, so concurrent
+    processes never spend the same tokens. Priority also holds across
+    processes: an interactive request that has to wait records a hold, and
+    batch requests elsewhere wait until no other process holds one.
+    """
+
+    def __init__(self, db_path: str, name: str, requests_per_minute: float, tokens_per_minute: float):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS budgets (
+                name TEXT PRIMARY KEY,
+                requests REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                paused_until REAL NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS priority_holds (
+                name TEXT NOT NULL,
+                pid INTEGER NOT NULL,
+                until REAL NOT NULL,
+                PRIMARY KEY (name, pid)
+            )
+        """)
+
+    @contextmanager
+    def _buckets(self) -> Iterator[Dict[str, Any]]:
+        """Lock the budget row and refill it; changes to the buckets and pause are written back"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT requests, tokens, updated, paused_until FROM budgets WHERE name = ?",
+                                         (self.name,)).fetchone()
+                requests = TokenBucket(self.requests_per_minute)
+                tokens = TokenBucket(self.tokens_per_minute)
+                requests.updated = tokens.updated = now
+                paused_until = 0.0
+                if row is not None:
+                    requests.tokens, tokens.tokens, updated, paused_until = row
+                    requests.updated = tokens.updated = min(updated, now)
+
+                state = {'now': now, 'requests': requests, 'tokens': tokens, 'paused_until': paused_until}
+                yield state
+
+                requests._refill(now)
+                tokens._refill(now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO budgets (name, requests, tokens, updated, paused_until) VALUES (?, ?, ?, ?, ?)",
+                    (self.name, requests.tokens, tokens.tokens, now, state['paused_until'])
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def reserve(self, estimated_tokens: float, level: int) -> float:
+        """Take one request and the estimated tokens if both are available; otherwise seconds to wait"""
+        pid = os.getpid()
+        with self._buckets() as state:
+            now = state['now']
+            wait = max(
+                state['paused_until'] - now,
+                state['requests'].wait_time(1, now),
+                state['tokens'].wait_time(estimated_tokens, now),
+            )
+            if level > INTERACTIVE:
+                held_until = self._conn.execute(
+                    "SELECT MAX(until) FROM priority_holds WHERE name = ? AND pid != ?", (self.name, pid)
+                ).fetchone()[0]
+                if held_until is not None:
+                    wait = max(wait, held_until - now)
+
+            if wait <= 0:
+                state['requests'].take(1)
+                state['tokens'].take(estimated_tokens)
+                self._conn.execute("DELETE FROM priority_holds WHERE name = ? AND (pid = ? OR until < ?)",
+                                   (self.name, pid, now))
+                return wait
+
+            if level == INTERACTIVE:
+                self._conn.execute("INSERT OR REPLACE INTO priority_holds (name, pid, until) VALUES (?, ?, ?)",
+                                   (self.name, pid, now + PRIORITY_HOLD_SECONDS))
+            # Other processes may free budget or drop their holds sooner
+            return min(wait, SHARED_POLL_SECONDS)
+
+    def adjust(self, tokens: float):
+        with self._buckets() as state:
+            state['tokens'].take(tokens)
+
+    def pause(self, seconds: float):
+        with self._buckets() as state:
+            state['paused_until'] = max(state['paused_until'], state['now'] + seconds)
+
+    def state(self) -> Dict[str, float]:
+        with self._buckets() as state:
+            state['tokens']._refill(state['now'])
+            return {
+                'paused_for': max(0.0, state['paused_until'] - state['now']),
+                'tokens_available': state['tokens'].tokens,
+            }
+
+class RequestScheduler:
+    """
+    Process-wide admission control for one API key
+
+    Callers block in acquire() until both the requests-per-minute and
+    tokens-per-minute buckets allow their request. Waiting callers are
+    served strictly by priority, then arrival order, so interactive
+    requests overtake queued batch work. A 429 pauses everyone until the
+    server's Retry-After has passed. The buckets live in a LocalBudget, or
+    in a SharedBudget when several processes use the same key.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, budget=None):
+        self.budget = budget or LocalBudget(requests_per_minute, tokens_per_minute)
+        self._condition = threading.Condition()
+        self._waiting: list = []
+        self._sequence = itertools.count()
+        self._stats = {
+            'requests': 0,
+            'throttled': 0,
+            'rate_limited': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0,
+            'max_queue_depth': 0,
+            'by_priority': {name: {'requests': 0, 'total_wait': 0.0} for name in PRIORITY_NAMES.values()},
+        }
+
+    def acquire(self, estimated_tokens: float, level: Optional[int] = None) -> float:
+        """
+        Block until a request may be sent, then reserve its budget
+
+        Args:
+            estimated_tokens: Expected prompt + completion tokens
+            level: Priority (defaults to the current context's priority)
+
+        Returns:
+            Seconds spent waiting
+        """
+        level = current_priority() if level is None else level
+        ticket = (level, next(self._sequence))
+        start = time.monotonic()
+
+        with self._condition:
+            self._enqueue(ticket)
+            while True:
+                wait = self._wait_for_turn(ticket, estimated_tokens)
+                if wait is not None and wait <= 0:
+                    break
+                # Not our turn when wait is None; woken when the head changes
+                self._condition.wait(timeout=wait)
+            return self._grant(ticket, estimated_tokens, start)
+
+    async def acquire_async(self, estimated_tokens: float, level: Optional[int] = None) -> float:
+        """
+        Like acquire, but sleeps without blocking the event loop
+
+        Async callers share the queue with blocking callers. They cannot be
+        woken by the condition, so while another request is at the head they
+        recheck every ASYNC_POLL_SECONDS. Cancelling the caller gives up its
+        place in the queue.
+        """
+        level = current_priority() if level is None else level
+        ticket = (level, next(self._sequence))
+        start = time.monotonic()
+
+        with self._condition:
+            self._enqueue(ticket)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._wait_for_turn(ticket, estimated_tokens)
+                    if wait is not None and wait <= 0:
+                        return self._grant(ticket, estimated_tokens, start)
+                await asyncio.sleep(ASYNC_POLL_SECONDS if wait is None else wait)
+        except BaseException:
+            with self._condition:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._condition.notify_all()
+            raise
+
+    def _enqueue(self, ticket: tuple):
+        heapq.heappush(self._waiting, ticket)
+        self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], len(self._waiting))
+
+    def _wait_for_turn(self, ticket: tuple, estimated_tokens: float) -> Optional[float]:
+        """
+        Seconds the head of the queue must still wait, or None if ticket is not the head
+
+        At 0 or less the budget has been reserved and the ticket must be granted.
+        """
+        if self._waiting[0] != ticket:
+            return None
+        return self.budget.reserve(estimated_tokens, ticket[0])
+
+    def _grant(self, ticket: tuple, estimated_tokens: float, start: float) -> float:
+        """Dequeue the head ticket whose budget was reserved; the condition must be held"""
+        heapq.heappop(self._waiting)
+
+        level = ticket[0]
+        waited = time.monotonic() - start
+        name = PRIORITY_NAMES.get(level, str(level))
+        self._stats['requests'] += 1
+        self._stats['total_wait'] += waited
+        self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+        if waited > 0.01:
+            self._stats['throttled'] += 1
+        by_priority = self._stats['by_priority'].setdefault(name, {'requests': 0, 'total_wait': 0.0})
+        by_priority['requests'] += 1
+        by_priority['total_wait'] += waited
+
+        self._condition.notify_all()
+        return waited
+
+    def record_usage(self, estimated_tokens: float, actual_tokens: float):
+        """Correct the token bucket once the real usage of a request is known"""
+        with self._condition:
+            self.budget.adjust(actual_tokens - estimated_tokens)
+
+    def pause(self, seconds: float):
+        """Hold all requests for the given time, e.g. after a 429"""
+        with self._condition:
+            self._stats['rate_limited'] += 1
+            self.budget.pause(seconds)
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report queue depth, wait times and throttling
+
+        Returns:
+            Dictionary of scheduler statistics
+        """
+        with self._condition:
+            stats = {**self._stats, 'by_priority': {k: dict(v) for k, v in self._stats['by_priority'].items()}}
+            stats['queue_depth'] = len(self._waiting)
+            stats.update(self.budget.state())
+        stats['avg_wait'] = stats['total_wait'] / stats['requests'] if stats['requests'] else 0.0
+        for entry in stats['by_priority'].values():
+            entry['avg_wait'] = entry['total_wait'] / entry['requests'] if entry['requests'] else 0.0
+        return stats
+
+_groq_scheduler = None
+_groq_scheduler_lock = threading.Lock()
+
+def get_groq_scheduler() -> RequestScheduler:
+    """Return the process-wide scheduler for Groq requests, drawing on the shared budget if configured"""
+    global _groq_scheduler
+    with _groq_scheduler_lock:
+        if _groq_scheduler is None:
+            budget = None
+            if RATE_LIMIT_DB_PATH:
+                try:
+                    budget = SharedBudget(RATE_LIMIT_DB_PATH, "groq", GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE)
+                except sqlite3.Error as e:
+                    print(f"Shared rate limit budget unavailable, limiting per process: {str(e)}")
+            _groq_scheduler = RequestScheduler(GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE, budget)
+        return _groq_scheduler
@@ -0,0 +1,300 @@
+import os
+import re
+import time
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from rate_limiter import retry_delay
+
+# Aim for segments of about this length, never longer than the maximum
+SEGMENT_TARGET_SECONDS = 600
+SEGMENT_MAX_SECONDS = 900
+
+# Audio shared by neighbouring segments when no silence is found near a boundary
+SEGMENT_OVERLAP_SECONDS = 2.0
+
+# What counts as a pause worth splitting at
+SILENCE_NOISE = "-35dB"
+SILENCE_MIN_SECONDS = 0.5
+
+SILENCE_START = re.compile(r'silence_start:\s*(-?[\d.]+)')
+SILENCE_END = re.compile(r'silence_end:\s*(-?[\d.]+)')
+
+def probe_duration(audio_path: str) -> float:
+    """
+    Get the duration of a media file in seconds using ffprobe
+
+    Args:
+        audio_path: Path to the media file
+
+    Returns:
+        Duration in seconds
+    """
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", audio_path],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip())
+
+def detect_silences(audio_path: str, noise: str = SILENCE_NOISE,
+                    min_duration: float = SILENCE_MIN_SECONDS) -> List[Tuple[float, float]]:
+    """
+    Find silent stretches with ffmpeg's silencedetect filter
+
+    Args:
+        audio_path: Path to the media file
+        noise: Level below which audio counts as silence
+        min_duration: Minimum length of a silent stretch in seconds
+
+    Returns:
+        List of (start, end) times in seconds
+    """
+    stderr = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", audio_path, "-vn",
+         "-af", f"silencedetect=noise={noise}:d={min_duration}", "-f", "null", "-"],
+        check=True, capture_output=True, text=True
+    ).stderr
+
+    starts = [float(m) for m in SILENCE_START.findall(stderr)]
+    ends = [float(m) for m in SILENCE_END.findall(stderr)]
+    return list(zip(starts, ends))
+
+def plan_segments(duration: float, silences: List[Tuple[float, float]],
+                  target_seconds: float = SEGMENT_TARGET_SECONDS,
+                  max_seconds: float = SEGMENT_MAX_SECONDS,
+                  overlap_seconds: float = SEGMENT_OVERLAP_SECONDS) -> List[Tuple[float, float]]:
+    """
+    Choose segment boundaries, preferring the middle of a silence
+
+    For each boundary the silence closest to start + target_seconds (and
+    before start + max_seconds) is used. Without a suitable silence the
+    audio is hard-split at max_seconds and neighbours overlap by
+    overlap_seconds so no words are cut in half.
+
+    Args:
+        duration: Total duration in seconds
+        silences: Silent stretches as (start, end) pairs
+        target_seconds: Preferred segment length
+        max_seconds: Maximum segment length
+        overlap_seconds: Overlap used for hard splits
+
+    Returns:
+        List of (start, end) times in order
+    """
+    midpoints = sorted((start + end) / 2 for start, end in silences)
+    segments = []
+    start = 0.0
+
+    while duration - start > max_seconds:
+        target = start + target_seconds
+        candidates = [m for m in midpoints if start + target_seconds / 2 <= m <= start + max_seconds]
+
+        if candidates:
+            split = min(candidates, key=lambda m: abs(m - target))
+            segments.append((start, split))
+            start = split
+        else:
+            split = start + max_seconds
+            segments.append((start, split))
+            start = split - overlap_seconds
+
+    segments.append((start, duration))
+    return segments
+
+def cut_segment(audio_path: str, start: float, end: float, output_path: str):
+    """
+    Extract one segment of audio with ffmpeg
+
+    Args:
+        audio_path: Source media file
+        start: Segment start in seconds
+        end: Segment end in seconds
+        output_path: Destination file
+    """
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+         "-ss", f"{start:.3f}", "-to", f"{end:.3f}", "-i", audio_path,
+         "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "24k", output_path],
+        check=True, capture_output=True, text=True
+    )
+
+def overlap_flags(segments: List[Tuple[float, float]]) -> List[bool]:
+    """Whether each segment shares audio with the one before it (hard splits only)"""
+    return [i > 0 and start < segments[i - 1][1] for i, (start, _) in enumerate(segments)]
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r'[^\w]', '', word.lower())
+
+def _drop_words(text: str, count: int) -> str:
+    """Remove the first count words, keeping the rest of the text's whitespace"""
+    match = re.match(r'\s*(?:\S+\s*){%d}' % count, text)
+    return text[match.end():] if match else ''
+
+def stitch_transcripts(texts: List[str], overlaps: List[bool], max_overlap_words: int = 30,
+                       min_overlap_words: int = 2) -> str:
+    """
+    Join segment transcripts, removing words repeated across overlapping boundaries
+
+    Overlapping audio yields the same words at the end of one segment and the
+    start of the next; at those boundaries the longest such run (compared
+    case- and punctuation-insensitively) is dropped from the later segment.
+    Segments split at a silence share no audio and are joined as they are,
+    so speech that really repeats at the cut is kept. Line breaks within a
+    segment are preserved.
+
+    Args:
+        texts: Segment transcripts in order
+        overlaps: For each segment, whether it overlaps the previous one
+            (see overlap_flags)
+        max_overlap_words: Longest run of repeated words to look for
+        min_overlap_words: Shortest run treated as a real overlap
+
+    Returns:
+        Combined transcript
+    """
+    result: List[str] = []
+
+    for text, overlapping in zip(texts, overlaps):
+        text = text.strip()
+        if not text:
+            continue
+
+        if overlapping and result:
+            tail = [_normalize_word(w) for w in result[-1].split()[-max_overlap_words:]]
+            head = [_normalize_word(w) for w in text.split()[:max_overlap_words]]
+
+            for k in range(min(len(tail), len(head)), min_overlap_words - 1, -1):
+                if tail[-k:] == head[:k]:
+                    text = _drop_words(text, k)
+                    break
+
+        if text:
+            result.append(text)
+
+    return ' '.join(result)
+
+def transcribe_segments(segment_paths: List[str], transcribe_fn: Callable[[str], Optional[str]],
+                        max_workers: int = 4, max_retries: int = 3) -> List[str]:
+    """
+    Transcribe segments concurrently, retrying only the ones that failed
+
+    Args:
+        segment_paths: Segment files in order
+        transcribe_fn: Function mapping a file path to its transcript
+        max_workers: Maximum concurrent transcriptions
+        max_retries: Maximum attempts per segment
+
+    Returns:
+        Segment transcripts in order
+    """
+    texts: Dict[int, str] = {}
+    pending = list(range(len(segment_paths)))
+    errors: Dict[int, Exception] = {}
+
+    def run(index: int) -> Tuple[int, Optional[str], Optional[Exception]]:
+        try:
+            text = transcribe_fn(segment_paths[index])
+            if text is None:
+                return index, None, Exception("Transcription returned no text")
+            return index, text, None
+        except Exception as e:
+            return index, None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for attempt in range(max_retries):
+            errors = {}
+            for index, text, error in executor.map(run, pending):
+                if error is None:
+                    texts[index] = text
+                else:
+                    errors[index] = error
+
+            pending = sorted(errors)
+            if not pending:
+                break
+            time.sleep(segment_retry_wait(errors, attempt, max_retries))
+
+    return [texts[i] for i in range(len(segment_paths))]
+
+def segment_retry_wait(errors: Dict[int, Exception], attempt: int, max_retries: int) -> float:
+    """
+    Log the segments that failed on an attempt and return the delay before retrying them
+
+    Args:
+        errors: Error of each failed segment, by segment index
+        attempt: Zero-based attempt that just finished
+        max_retries: Maximum attempts per segment
+
+    Raises:
+        Exception: Listing every failed segment once no attempts are left
+    """
+    pending = sorted(errors)
+    if attempt >= max_retries - 1:
+        details = '; '.join(f"segment {i + 1}: {errors[i]}" for i in pending)
+        raise Exception(f"Segmented transcription failed after {max_retries} attempts ({details})")
+
+    wait_time = max(retry_delay(errors[i], attempt) for i in pending)
+    print(f"{len(pending)} segment(s) failed on attempt {attempt + 1}. Retrying in {wait_time:.1f}s...")
+    return wait_time
+
+def join_segments(texts: List[str], overlaps: List[bool]) -> str:
+    """A single segment's transcript as it is, several stitched together"""
+    return texts[0] if len(texts) == 1 else stitch_transcripts(texts, overlaps)
+
+def transcribe_segmented(audio_path: str, transcribe_fn: Callable[[str], Optional[str]],
+                         max_workers: int = 4, max_retries: int = 3,
+                         target_seconds: float = SEGMENT_TARGET_SECONDS,
+                         max_seconds: float = SEGMENT_MAX_SECONDS) -> str:
+    """
+    Split a long recording at silences and transcribe the pieces in parallel
+
+    Args:
+        audio_path: Path to the audio file
+        transcribe_fn: Function mapping a file path to its transcript
+        max_workers: Maximum concurrent transcriptions
+        max_retries: Maximum attempts per segment
+        target_seconds: Preferred segment length
+        max_seconds: Maximum segment length
+
+    Returns:
+        Stitched transcript
+    """
+    workdir = tempfile.mkdtemp(prefix="lectureai-segments-")
+    try:
+        paths, overlaps = split_recording(audio_path, workdir, target_seconds, max_seconds)
+        texts = transcribe_segments(paths, transcribe_fn, min(max_workers, len(paths)), max_retries)
+        return join_segments(texts, overlaps)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def split_recording(audio_path: str, workdir: str, target_seconds: float = SEGMENT_TARGET_SECONDS,
+                    max_seconds: float = SEGMENT_MAX_SECONDS) -> Tuple[List[str], List[bool]]:
+    """
+    Cut a recording into segments at silences
+
+    Args:
+        audio_path: Path to the audio file
+        workdir: Directory for the segment files (owned by the caller)
+        target_seconds: Preferred segment length
+        max_seconds: Maximum segment length
+
+    Returns:
+        Tuple of (segment paths in order, or just audio_path if it needs no
+        splitting; overlap flag of each segment for stitch_transcripts)
+    """
+    duration = probe_duration(audio_path)
+    silences = detect_silences(audio_path)
+    segments = plan_segments(duration, silences, target_seconds, max_seconds)
+
+    if len(segments) == 1:
+        return [audio_path], [False]
+
+    paths = []
+    for i, (start, end) in enumerate(segments):
+        path = os.path.join(workdir, f"segment_{i:04d}.ogg")
+        cut_segment(audio_path, start, end, path)
+        paths.append(path)
+    return paths, overlap_flags(segments)
@@ -0,0 +1,204 @@
+"""
+Disk spool for uploaded recordings
+
+Uploads are copied to the spool directory through a fixed-size buffer and
+hashed in the same pass, so memory use per upload stays constant however
+large the recording is. The spool has a size quota and keeps a minimum of
+free disk space; files older than the maximum age (left behind by crashed
+processes or abandoned jobs) are swept before new uploads are admitted,
+except uploads that queued or running jobs still refer to.
+"""
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+from job_queue import active_audio_paths
+
+SPOOL_DIR = os.getenv("LECTUREAI_SPOOL_DIR", os.path.join(os.getenv("LECTUREAI_DATA_DIR", ".data"), "uploads"))
+SPOOL_MAX_BYTES = int(float(os.getenv("LECTUREAI_SPOOL_MAX_MB", "4096")) * 1024 * 1024)
+SPOOL_MIN_FREE_BYTES = int(float(os.getenv("LECTUREAI_SPOOL_MIN_FREE_MB", "1024")) * 1024 * 1024)
+# Uploads of queued and running jobs are never swept, whatever their age
+SPOOL_MAX_AGE = float(os.getenv("LECTUREAI_SPOOL_MAX_AGE_HOURS", "24")) * 3600
+
+# Bytes copied per read; the only upload-sized memory the spool uses
+COPY_BUFFER_BYTES = 1024 * 1024
+
+# Bytes written beyond the announced size between quota rechecks
+QUOTA_CHECK_BYTES = 64 * COPY_BUFFER_BYTES
+
+# Suffix of files still being written
+PARTIAL_SUFFIX = ".part"
+
+# Seconds between routine sweeps of the spool directory
+SWEEP_INTERVAL = 600
+
+_sweep_lock = threading.Lock()
+_last_sweep: Dict[str, float] = {}
+
+class SpoolFullError(Exception):
+    """Raised when an upload does not fit in the spool quota or on disk"""
+
+def spool_usage(directory: str = SPOOL_DIR) -> Dict[str, int]:
+    """
+    Report how much the spool holds and how much disk is left
+
+    Args:
+        directory: Spool directory
+
+    Returns:
+        Dictionary with 'files', 'bytes' and 'free_bytes'
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = used = 0
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    files += 1
+                    used += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+    return {'files': files, 'bytes': used, 'free_bytes': _free_bytes(directory)}
+
+def _free_bytes(directory: str) -> int:
+    stats = os.statvfs(directory)
+    return stats.f_bavail * stats.f_frsize
+
+def sweep_spool(directory: str = SPOOL_DIR, max_age: float = SPOOL_MAX_AGE) -> Dict[str, int]:
+    """
+    Delete spooled files older than max_age that no queued or running job refers to
+
+    Args:
+        directory: Spool directory
+        max_age: Age in seconds (by modification time) after which files go
+
+    Returns:
+        Dictionary with 'removed' files and 'bytes' freed
+    """
+    cutoff = time.time() - max_age
+    removed = freed = 0
+    if not os.path.isdir(directory):
+        return {'removed': 0, 'bytes': 0}
+
+    try:
+        live = active_audio_paths()
+    except Exception as e:
+        # Without the job list nothing can be proven stale
+        print(f"Upload spool: not sweeping, could not read the job queue: {str(e)}")
+        return {'removed': 0, 'bytes': 0}
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                stat = entry.stat()
+                if entry.is_file() and stat.st_mtime < cutoff and os.path.abspath(entry.path) not in live:
+                    os.remove(entry.path)
+                    removed += 1
+                    freed += stat.st_size
+            except FileNotFoundError:
+                # Removed by its owner in the meantime
+                continue
+
+    with _sweep_lock:
+        _last_sweep[directory] = time.monotonic()
+    if removed:
+        print(f"Upload spool: swept {removed} stale files ({freed} bytes)")
+    return {'removed': removed, 'bytes': freed}
+
+def _sweep_if_due(directory: str, max_age: float):
+    with _sweep_lock:
+        due = time.monotonic() - _last_sweep.get(directory, float('-inf')) > SWEEP_INTERVAL
+    if due:
+        sweep_spool(directory, max_age)
+
+def _check_capacity(directory: str, incoming: int, max_bytes: int, min_free: int):
+    usage = spool_usage(directory)
+    if usage['bytes'] + incoming > max_bytes:
+        raise SpoolFullError(f"Upload spool is full ({usage['bytes'] // 2**20} MB of "
+                             f"{max_bytes // 2**20} MB used); try again later")
+    if usage['free_bytes'] - incoming < min_free:
+        raise SpoolFullError(f"Not enough free disk space for a {incoming // 2**20} MB upload")
+
+def spool_upload(source: BinaryIO, name: str, size: Optional[int] = None, directory: str = SPOOL_DIR,
+                 max_bytes: int = SPOOL_MAX_BYTES, min_free: int = SPOOL_MIN_FREE_BYTES,
+                 max_age: float = SPOOL_MAX_AGE) -> Tuple[str, str]:
+    """
+    Copy an upload into the spool with a fixed-size buffer
+
+    The file is written under a temporary name and renamed once complete, so
+    a spooled path never refers to a partial upload; a failed copy leaves
+    nothing behind.
+
+    Args:
+        source: Readable binary file object (e.g. a Streamlit UploadedFile)
+        name: Original file name; its extension is kept
+        size: Size in bytes if known up front, checked against the quota
+            before copying
+        directory: Spool directory
+        max_bytes: Spool quota in bytes
+        min_free: Free disk space to leave in bytes
+        max_age: Age in seconds after which spooled files are swept
+
+    Returns:
+        Tuple of (spooled path, SHA-256 hex digest of the contents), the
+        digest matching cache.file_digest
+
+    Raises:
+        SpoolFullError: If the upload does not fit
+    """
+    os.makedirs(directory, exist_ok=True)
+    _sweep_if_due(directory, max_age)
+
+    incoming = size or 0
+    try:
+        _check_capacity(directory, incoming, max_bytes, min_free)
+    except SpoolFullError:
+        # Stale files may be all that stands in the way
+        sweep_spool(directory, max_age)
+        _check_capacity(directory, incoming, max_bytes, min_free)
+
+    suffix = Path(name).suffix
+    fd, partial_path = tempfile.mkstemp(suffix=suffix + PARTIAL_SUFFIX, dir=directory)
+    digest = hashlib.sha256()
+    buffer = bytearray(COPY_BUFFER_BYTES)
+    view = memoryview(buffer)
+    written = 0
+    next_check = incoming + QUOTA_CHECK_BYTES
+
+    try:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                n = source.readinto(buffer)
+                if not n:
+                    break
+                digest.update(view[:n])
+                out.write(view[:n])
+                written += n
+                if written > next_check:
+                    # Size was unknown or understated; recheck the quota as the file grows
+                    _check_capacity(directory, 0, max_bytes, min_free)
+                    next_check = written + QUOTA_CHECK_BYTES
+
+        path = partial_path[:-len(PARTIAL_SUFFIX)]
+        os.replace(partial_path, path)
+    except BaseException:
+        discard(partial_path)
+        raise
+
+    return path, digest.hexdigest()
+
+def discard(path: Optional[str]):
+    """Delete a spooled file if it still exists"""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Could not remove spooled file {path}: {str(e)}")
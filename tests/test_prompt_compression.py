@@ -0,0 +1,46 @@
+from prompt_compression import compress_text, remove_fillers
+
+def test_numbers_are_not_collapsed():
+    assert compress_text("The matrix is 1 1 0 and 0 1 1.") == "The matrix is 1 1 0 and 0 1 1."
+
+def test_code_like_tokens_are_not_collapsed():
+    text = "Set x x to 0 0. Call foo foo_bar with v2 v2."
+    assert compress_text(text) == text
+
+def test_deliberate_repeats_are_kept():
+    assert remove_fillers("It is very very important, no no.") == "It is very very important, no no."
+
+def test_stutters_are_collapsed():
+    assert remove_fillers("The the cat and I I think we we know") == "The cat and I think we know"
+
+def test_grammatical_doubles_are_kept():
+    assert remove_fillers("He had had enough of that that morning") == "He had had enough of that that morning"
+
+def test_sentence_casing_is_preserved():
+    assert compress_text("The iPhone is new. e.g. this one works.") == "The iPhone is new. e.g. this one works."
+
+def test_capital_restored_after_leading_filler():
+    assert compress_text("Um, the model converges. So yeah, we stop.") == "The model converges. We stop."
+
+def test_reordered_numbers_are_not_merged():
+    text = "The answer is 3 not 4. The answer is 4 not 3."
+    assert compress_text(text) == text
+
+def test_swapped_variables_are_not_merged():
+    text = "Set a equal to b minus c. Set b equal to a minus c."
+    assert compress_text(text) == text
+
+def test_different_symbols_are_not_merged():
+    text = "So x = 2 + 3 here. So x = 2 - 3 here."
+    assert compress_text(text) == text
+
+def test_restatements_are_dropped():
+    text = "The gradient points uphill here. The gradient points uphill right here."
+    assert compress_text(text) == "The gradient points uphill here."
+
+def test_like_as_a_verb_is_kept():
+    text = "Things I like, such as pizza, are great."
+    assert compress_text(text) == text
+
+def test_like_as_a_filler_is_removed():
+    assert compress_text("Like, the model is, like, simple.") == "The model is simple."
@@ -0,0 +1,41 @@
+import os
+import rate_limiter
+from rate_limiter import SharedBudget, RequestScheduler, INTERACTIVE, BATCH
+
+def test_shared_budget_is_spent_once_across_processes(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    first = SharedBudget(path, "groq", 2, 100000)
+    second = SharedBudget(path, "groq", 2, 100000)
+
+    assert first.reserve(10, INTERACTIVE) <= 0
+    assert second.reserve(10, INTERACTIVE) <= 0
+    assert first.reserve(10, INTERACTIVE) > 0
+    assert second.reserve(10, INTERACTIVE) > 0
+
+def test_shared_pause_and_usage_reach_other_processes(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    first = RequestScheduler(60, 1000, SharedBudget(path, "groq", 60, 1000))
+    second = RequestScheduler(60, 1000, SharedBudget(path, "groq", 60, 1000))
+
+    first.pause(30)
+    assert second.stats()['paused_for'] > 29
+
+    second.record_usage(0, 400)
+    assert first.stats()['tokens_available'] < 601
+
+def test_waiting_interactive_request_holds_back_batch_elsewhere(tmp_path, monkeypatch):
+    path = str(tmp_path / "limits.sqlite3")
+    batch = SharedBudget(path, "groq", 1, 100000)
+    interactive = SharedBudget(path, "groq", 1, 100000)
+
+    assert batch.reserve(10, BATCH) <= 0
+    pid = os.getpid()
+    monkeypatch.setattr(rate_limiter.os, 'getpid', lambda: pid + 1)
+    assert interactive.reserve(10, INTERACTIVE) > 0
+    monkeypatch.undo()
+
+    # Even with budget to spare, batch waits while the other process holds priority
+    with batch._buckets() as state:
+        state['requests'].tokens = 1
+    assert batch.reserve(10, BATCH) > 0
+    assert batch.reserve(10, INTERACTIVE) <= 0
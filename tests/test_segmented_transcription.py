@@ -0,0 +1,52 @@
+import pytest
+import segmented_transcription as seg
+
+# A synthetic lecture: word i is spoken during [i, i + 0.5) seconds and
+# followed by half a second of silence
+WORDS = [f"w{i}" for i in range(60)]
+WORDS[18:22] = ["no", "no", "no", "no"]
+
+@pytest.fixture
+def fake_ffmpeg(monkeypatch):
+    """Stand in for ffprobe/ffmpeg: segment files just record their time range"""
+    silences = [(i + 0.5, i + 1.0) for i in range(len(WORDS))]
+
+    def cut_segment(audio_path, start, end, output_path):
+        with open(output_path, 'w') as f:
+            f.write(f"{start} {end}")
+
+    monkeypatch.setattr(seg, 'probe_duration', lambda path: float(len(WORDS)))
+    monkeypatch.setattr(seg, 'cut_segment', cut_segment)
+    return silences
+
+def fake_transcriber(path):
+    """Local stand-in for AssemblyAI: the words spoken within the segment"""
+    with open(path) as f:
+        start, end = map(float, f.read().split())
+    return ' '.join(w for i, w in enumerate(WORDS) if start <= i < end)
+
+def transcribe(tmp_path, monkeypatch, silences, **limits):
+    monkeypatch.setattr(seg, 'detect_silences', lambda path: silences)
+    paths, overlaps = seg.split_recording("lecture.mp3", str(tmp_path), **limits)
+    texts = seg.transcribe_segments(paths, fake_transcriber, max_workers=2, max_retries=1)
+    return seg.stitch_transcripts(texts, overlaps), overlaps
+
+def test_silence_splits_keep_repeated_words(tmp_path, monkeypatch, fake_ffmpeg):
+    # The cut closest to 20s falls at 19.75, between the "no"s
+    text, overlaps = transcribe(tmp_path, monkeypatch, fake_ffmpeg, target_seconds=20, max_seconds=25)
+    assert not any(overlaps)
+    assert text == ' '.join(WORDS)
+
+def test_hard_splits_drop_overlapping_words(tmp_path, monkeypatch, fake_ffmpeg):
+    text, overlaps = transcribe(tmp_path, monkeypatch, [], target_seconds=20, max_seconds=25)
+    assert overlaps[1:] == [True] * (len(overlaps) - 1)
+    assert text == ' '.join(WORDS)
+
+def test_stitch_keeps_line_breaks():
+    texts = ["First part.\n\nSecond paragraph ends here", "ends here and goes on.\nDone."]
+    assert seg.stitch_transcripts(texts, [False, True]) == \
+        "First part.\n\nSecond paragraph ends here and goes on.\nDone."
+
+def test_stitch_only_dedupes_overlapping_boundaries():
+    assert seg.stitch_transcripts(["he said no no", "no no we stop"], [False, False]) == \
+        "he said no no no no we stop"
@@ -0,0 +1,25 @@
+import os
+import time
+import job_queue
+import spool
+
+def test_sweep_keeps_uploads_of_pending_jobs(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(spool, 'active_audio_paths', lambda: job_queue.active_audio_paths(db_path))
+
+    paths = {}
+    for name in ("queued", "running", "done", "orphan"):
+        paths[name] = str(uploads / f"{name}.mp3")
+        with open(paths[name], 'wb') as f:
+            f.write(b"audio")
+        old = time.time() - 7200
+        os.utime(paths[name], (old, old))
+
+    for status in ("queued", "running", "done"):
+        job_id = job_queue.enqueue_job(paths[status], status, db_path=db_path)
+        job_queue.update_job(job_id, db_path, status=status)
+
+    assert spool.sweep_spool(str(uploads), max_age=3600)['removed'] == 2
+    assert sorted(os.listdir(uploads)) == ["queued.mp3", "running.mp3"]
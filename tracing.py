@@ -0,0 +1,434 @@
+"""
+Timing spans for the lecture pipeline
+
+Every pipeline stage and API call runs inside a span that records its
+duration, outcome and attributes such as bytes uploaded, retries and token
+counts. Finished spans are appended to a JSON-lines file (shared by the app,
+job workers and batch runs) and aggregated in-process into latency
+histograms that can be scraped in the Prometheus text format.
+
+Serve metrics for everything in the span log, including other processes:
+    python tracing.py serve --port 9464
+Print per-stage latencies of recent spans:
+    python tracing.py summary --limit 5000
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+TRACING = os.getenv("LECTUREAI_TRACING", "1") == "1"
+DATA_DIR = os.getenv("LECTUREAI_DATA_DIR", ".data")
+TRACE_PATH = os.getenv("LECTUREAI_TRACE_PATH", os.path.join(DATA_DIR, "traces.jsonl"))
+TRACE_MAX_BYTES = int(float(os.getenv("LECTUREAI_TRACE_MAX_MB", "50")) * 1024 * 1024)
+
+# Port for the in-process /metrics endpoint; 0 leaves it off
+METRICS_PORT = int(os.getenv("LECTUREAI_METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("LECTUREAI_METRICS_HOST", "127.0.0.1")
+
+# Histogram bucket upper bounds in seconds
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# Numeric span attributes exported as running totals
+COUNTED_ATTRIBUTES = ('bytes_uploaded', 'prompt_tokens', 'completion_tokens', 'total_tokens',
+                      'input_tokens', 'output_tokens', 'retries', 'cache_hits', 'rate_limit_wait')
+
+_current: ContextVar[Optional['Span']] = ContextVar("current_span", default=None)
+_attributes_lock = threading.Lock()
+
+class Span:
+    """
+    One timed operation
+
+    Attributes:
+        name: Stage name, e.g. "groq.chat"
+        trace_id: Shared by all spans of one lecture run
+        span_id: Unique ID of this span
+        parent_id: span_id of the enclosing span, or None for a root
+        attributes: Free-form details (bytes, tokens, retries, ...)
+        status: "ok", "error" or "cancelled"
+    """
+
+    def __init__(self, name: str, parent: Optional['Span'] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self.status = 'ok'
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        """Set attributes, replacing earlier values"""
+        with _attributes_lock:
+            self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float = 1):
+        """Add to a numeric attribute (safe to call from worker threads)"""
+        with _attributes_lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def fail(self, error: BaseException):
+        """Mark the span failed without raising, for callers that swallow errors"""
+        self.status = 'error'
+        self.error = str(error)
+
+    def elapsed(self) -> float:
+        """Seconds since the span started"""
+        return time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration': self.duration,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+def current_span() -> Optional[Span]:
+    """Innermost span of the current context, if any"""
+    return _current.get()
+
+@contextmanager
+def attach(parent: Optional[Span]) -> Iterator[None]:
+    """
+    Make spans opened in the enclosed block children of parent
+
+    Context variables do not flow into thread pools, so code that fans out
+    work captures current_span() and re-enters it inside each worker.
+    """
+    token = _current.set(parent)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def span(name: str, parent: Optional[Span] = None, activate: bool = True, **attributes) -> Iterator[Span]:
+    """
+    Time the enclosed block as a span and export it when the block ends
+
+    Args:
+        name: Stage name
+        parent: Enclosing span (default: current_span())
+        activate: Make this span the parent of spans opened inside the block;
+            generators that yield inside the block should pass False and use
+            attach around their own calls, since the context is shared with
+            the consumer between yields
+        **attributes: Initial attributes
+
+    Yields:
+        The Span, for adding attributes while it runs
+    """
+    current = Span(name, parent or _current.get(), attributes)
+    token = _current.set(current) if activate else None
+    try:
+        yield current
+    except (GeneratorExit, KeyboardInterrupt, asyncio.CancelledError):
+        current.status = 'cancelled'
+        raise
+    except Exception as e:
+        current.fail(e)
+        raise
+    except BaseException as e:
+        # Control flow such as SystemExit or a Streamlit rerun ends the span normally
+        current.set(exited_by=type(e).__name__)
+        raise
+    finally:
+        if token is not None:
+            _current.reset(token)
+        current.duration = time.perf_counter() - current._started
+        if TRACING:
+            get_recorder().record(current.to_dict())
+
+def _bucket_index(seconds: float) -> int:
+    for i, bound in enumerate(DURATION_BUCKETS):
+        if seconds <= bound:
+            return i
+    return len(DURATION_BUCKETS)
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class SpanRecorder:
+    """
+    Aggregates finished spans into histograms and appends them to the span log
+
+    Args:
+        path: JSON-lines file to append spans to, or None to only aggregate
+        max_bytes: Rotate the file to <path>.1 once it grows past this size
+    """
+
+    def __init__(self, path: Optional[str] = TRACE_PATH, max_bytes: int = TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.buckets: Dict[str, List[int]] = {}
+        self.sums: Dict[str, float] = {}
+        self.errors: Dict[str, int] = {}
+        self.totals: Dict[tuple, float] = {}
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def record(self, span: Dict[str, Any]):
+        """Add one finished span (as produced by Span.to_dict)"""
+        name = span['name']
+        line = json.dumps(span, default=str) if self.path else None
+        with self.lock:
+            counts = self.buckets.setdefault(name, [0] * (len(DURATION_BUCKETS) + 1))
+            counts[_bucket_index(span['duration'])] += 1
+            self.sums[name] = self.sums.get(name, 0.0) + span['duration']
+            if span['status'] == 'error':
+                self.errors[name] = self.errors.get(name, 0) + 1
+            for key in COUNTED_ATTRIBUTES:
+                value = span['attributes'].get(key)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.totals[(name, key)] = self.totals.get((name, key), 0.0) + value
+
+            if self.path:
+                self._append(line)
+
+    def _append(self, line: str):
+        try:
+            # One short append per span keeps lines from several processes intact
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            if os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+        except OSError as e:
+            print(f"Could not write span log: {str(e)}")
+
+    def prometheus_text(self) -> str:
+        """All aggregates in the Prometheus text exposition format"""
+        lines = [
+            "# HELP lectureai_span_duration_seconds Duration of pipeline stages and API calls",
+            "# TYPE lectureai_span_duration_seconds histogram",
+        ]
+        with self.lock:
+            for name in sorted(self.buckets):
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + ('+Inf',), self.buckets[name]):
+                    cumulative += count
+                    lines.append(f'lectureai_span_duration_seconds_bucket{{span="{_label(name)}",le="{bound}"}} {cumulative}')
+                lines.append(f'lectureai_span_duration_seconds_sum{{span="{_label(name)}"}} {self.sums[name]:.6f}')
+                lines.append(f'lectureai_span_duration_seconds_count{{span="{_label(name)}"}} {cumulative}')
+
+            lines.append("# HELP lectureai_span_errors_total Spans that ended with an error")
+            lines.append("# TYPE lectureai_span_errors_total counter")
+            for name in sorted(self.buckets):
+                lines.append(f'lectureai_span_errors_total{{span="{_label(name)}"}} {self.errors.get(name, 0)}')
+
+            lines.append("# HELP lectureai_span_attribute_total Summed numeric span attributes (bytes, tokens, retries)")
+            lines.append("# TYPE lectureai_span_attribute_total counter")
+            for (name, key), value in sorted(self.totals.items()):
+                lines.append(f'lectureai_span_attribute_total{{span="{_label(name)}",attribute="{key}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+def get_recorder() -> SpanRecorder:
+    """Return the process-wide recorder writing to TRACE_PATH"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = SpanRecorder(TRACE_PATH)
+        return _recorder
+
+def read_spans(path: str = TRACE_PATH, limit: int = 2000) -> List[Dict[str, Any]]:
+    """
+    Most recent spans from a span log, oldest first
+
+    Args:
+        path: JSON-lines span log
+        limit: Maximum number of spans
+
+    Returns:
+        Span dictionaries (see Span.to_dict)
+    """
+    if not os.path.exists(path):
+        return []
+
+    # Spans are a few hundred bytes each; read only the tail of large logs
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - limit * 2048))
+        data = f.read()
+
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    if size > limit * 2048:
+        lines = lines[1:]
+
+    spans = []
+    for line in lines[-limit:]:
+        try:
+            spans.append(json.loads(line))
+        except ValueError:
+            continue
+    return spans
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def stage_latencies(spans: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Latency statistics per span name
+
+    Args:
+        spans: Span dictionaries, e.g. from read_spans
+
+    Returns:
+        Mapping of span name to count, errors, p50, p95, max, total seconds
+        and a histogram of counts per DURATION_BUCKETS bucket, ordered by
+        total time spent (largest first)
+    """
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for item in spans:
+        durations.setdefault(item['name'], []).append(item['duration'])
+        if item['status'] == 'error':
+            errors[item['name']] = errors.get(item['name'], 0) + 1
+
+    labels = [f"≤{bound}s" for bound in DURATION_BUCKETS] + [f">{DURATION_BUCKETS[-1]}s"]
+    result = {}
+    for name, values in durations.items():
+        ordered = sorted(values)
+        histogram = dict.fromkeys(labels, 0)
+        for value in ordered:
+            histogram[labels[_bucket_index(value)]] += 1
+        result[name] = {
+            'count': len(ordered),
+            'errors': errors.get(name, 0),
+            'p50': _percentile(ordered, 50),
+            'p95': _percentile(ordered, 95),
+            'max': ordered[-1],
+            'total': sum(ordered),
+            'histogram': histogram,
+        }
+    return dict(sorted(result.items(), key=lambda item: -item[1]['total']))
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics from the server's recorder"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        if getattr(self.server, 'follower', None):
+            self.server.follower.poll()
+        body = self.server.recorder.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST,
+                         recorder: Optional[SpanRecorder] = None) -> ThreadingHTTPServer:
+    """
+    Serve a recorder's aggregates at http://host:port/metrics on a daemon thread
+
+    Args:
+        port: TCP port (0 picks a free one)
+        host: Interface to bind
+        recorder: Recorder to expose (default: this process's recorder)
+
+    Returns:
+        The running server (server.server_address has the bound port)
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.recorder = recorder or get_recorder()
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+class SpanLogFollower:
+    """
+    Feeds spans appended to a span log into a recorder, across rotations
+
+    Counters stay monotonic because every line is read exactly once.
+    """
+
+    def __init__(self, path: str, recorder: SpanRecorder):
+        self.path = path
+        self.recorder = recorder
+        self.offset = 0
+        self.lock = threading.Lock()
+
+    def poll(self) -> int:
+        """Read newly appended spans; returns how many were added"""
+        added = 0
+        with self.lock:
+            if not os.path.exists(self.path):
+                return 0
+            if os.path.getsize(self.path) < self.offset:
+                # Rotated; start over on the new file
+                self.offset = 0
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Partially written; read it next time
+                        break
+                    self.offset += len(line)
+                    try:
+                        self.recorder.record(json.loads(line))
+                        added += 1
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        return added
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect the lecture pipeline span log")
+    parser.add_argument('--path', default=TRACE_PATH, help="Span log (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="Serve Prometheus metrics for the span log")
+    serve.add_argument('--host', default=METRICS_HOST)
+    serve.add_argument('--port', type=int, default=METRICS_PORT or 9464)
+
+    summary = commands.add_parser('summary', help="Print per-stage latencies of recent spans")
+    summary.add_argument('--limit', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.command == 'summary':
+        stats = stage_latencies(read_spans(args.path, args.limit))
+        print(f"{'stage':32} {'count':>6} {'errors':>6} {'p50 s':>8} {'p95 s':>8} {'max s':>8} {'total s':>9}")
+        for name, s in stats.items():
+            print(f"{name:32} {s['count']:6d} {s['errors']:6d} {s['p50']:8.2f} {s['p95']:8.2f} "
+                  f"{s['max']:8.2f} {s['total']:9.1f}")
+        return 0
+
+    recorder = SpanRecorder(path=None)
+    server = start_metrics_server(args.port, args.host, recorder)
+    server.follower = SpanLogFollower(args.path, recorder)
+    print(f"Serving metrics for {args.path} on http://{args.host}:{server.server_address[1]}/metrics")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())